@@ -0,0 +1,59 @@
+"""
+framelib benchmarks, run from repo root: python bench/bench_framelib.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filelib import filelib  # noqa: E402
+from framelib import framelib  # noqa: E402
+
+
+def timeit(name: str, func, count: int):
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    print(f'{name:<48} {seconds * 1000:9.3f} ms {count / seconds:10.1f} frames/s')
+
+
+def bench_read(count: int = 1000, width: int = 320, height: int = 240):
+    print(f' read {count} rgb565 frames {width}x{height} '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        frame = np.random.randint(0, 256, (height, width, 2), dtype=np.uint8)
+        raw_files = [f'{folder}/{i:05}.raw' for i in range(count)]
+        for raw_file in raw_files:
+            frame.tofile(raw_file)
+        store_file = f'{folder}/frames.fs'
+        timeit('framelib.pack', lambda: framelib.pack(store_file, raw_files, width, height), count)
+
+        def read_files(files, touch: bool):
+            for raw_file in files:
+                frame = np.frombuffer(filelib.file_read_binary(raw_file), dtype=np.uint8).reshape(height, width, 2)
+                if touch:
+                    frame.sum()
+
+        def read_store(indexes, touch: bool):
+            with framelib(store_file) as store:
+                for i in indexes:
+                    frame = store[i]
+                    if touch:
+                        frame.sum()
+
+        order = list(range(count))
+        shuffled = random.sample(order, count)
+        for touch in (False, True):
+            suffix = ', sum all pixels' if touch else ''
+            timeit(f'file_read_binary (sequential{suffix})', lambda: read_files(raw_files, touch), count)
+            timeit(f'framelib view (sequential{suffix})', lambda: read_store(order, touch), count)
+            timeit(f'file_read_binary (random{suffix})', lambda: read_files([raw_files[i] for i in shuffled], touch),
+                   count)
+            timeit(f'framelib view (random{suffix})', lambda: read_store(shuffled, touch), count)
+
+if __name__ == "__main__":
+    bench_read()
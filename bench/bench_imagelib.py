@@ -0,0 +1,278 @@
+"""
+imagelib benchmarks, run from repo root: python bench/bench_imagelib.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from imagelib import imagelib, imagectx, imageindex  # noqa: E402
+
+
+def bench(func, pixels: int, loop: int = 20):
+    """
+    run func loop times and return (ms per call, MP/s)
+    """
+    func()  # warm up (build tables etc.)
+    start = time.perf_counter()
+    for _ in range(loop):
+        func()
+    seconds = (time.perf_counter() - start) / loop
+    return seconds * 1000, pixels / seconds / 1e6
+
+
+def report(name: str, ms: float, mps: float, base_mps: float = None):
+    gain = f' x{mps / base_mps:0.2f}' if base_mps else ''
+    print(f'{name:<40} {ms:9.3f} ms {mps:9.1f} MP/s{gain}')
+
+
+def bench_rgb565_decode(width: int = 1920, height: int = 1080):
+    print(f' rgb565 decode {width}x{height} '.center(80, '='))
+    pixels = width * height
+    rgb565 = np.random.randint(0, 65536, pixels, dtype=np.uint16).tobytes()
+
+    ms, base = bench(lambda: imagelib.rgb5652rgb888(rgb565, width, height), pixels)
+    report('rgb5652rgb888 (shift/mask)', ms, base)
+    ms, mps = bench(lambda: imagelib.rgb5652rgb888_lut(rgb565, width, height), pixels)
+    report('rgb5652rgb888_lut (little)', ms, mps, base)
+    ms, mps = bench(lambda: imagelib.rgb5652rgb888_lut(rgb565, width, height, byteorder='big'), pixels)
+    report('rgb5652rgb888_lut (big)', ms, mps, base)
+
+    ms, base = bench(lambda: imagelib.rgb8882rgba(imagelib.rgb5652rgb888(rgb565, width, height), width, height),
+                     pixels)
+    report('rgb5652rgb888 + rgb8882rgba', ms, base)
+    ms, mps = bench(lambda: imagelib.rgb5652rgba_lut(rgb565, width, height), pixels)
+    report('rgb5652rgba_lut', ms, mps, base)
+
+
+def bench_batch(n: int = 60, width: int = 320, height: int = 240):
+    print(f' batch {n} frames {width}x{height} '.center(80, '='))
+    pixels = n * width * height
+    rgb888 = np.random.randint(0, 256, (n, height, width, 3), dtype=np.uint8)
+    rgba = np.random.randint(0, 256, (n, height, width, 4), dtype=np.uint8)
+    rgb565 = imagelib.convert_batch(rgb888, 'rgb8882rgb565')
+
+    singles = {
+        'rgb8882rgb565': lambda: [imagelib.rgb8882rgb565(f) for f in rgb888],
+        'bgr8882rgb565': lambda: [imagelib.bgr8882rgb565(f) for f in rgb888],
+        'rgb5652rgb888': lambda: [imagelib.rgb5652rgb888(f.tobytes(), width, height) for f in rgb565],
+        'rgba2rgb888': lambda: [imagelib.rgba2rgb888(f, width, height) for f in rgba],
+        'rgb8882rgba': lambda: [imagelib.rgb8882rgba(f, width, height) for f in rgb888],
+        'rgb8882yuv': lambda: [imagelib.rgb8882yuv(f) for f in rgb888],
+    }
+    inputs = {'rgb5652rgb888': rgb565, 'rgba2rgb888': rgba}
+    for conversion, single in singles.items():
+        frames = inputs.get(conversion, rgb888)
+        ms, base = bench(single, pixels, loop=5)
+        report(f'{conversion} x{n}', ms, base)
+        ms, mps = bench(lambda: imagelib.convert_batch(frames, conversion), pixels, loop=5)
+        report(f'convert_batch {conversion}', ms, mps, base)
+        ms, mps = bench(lambda: imagelib.convert_batch(frames, conversion, max_bytes=16 << 20), pixels, loop=5)
+        report(f'convert_batch {conversion} (16MB)', ms, mps, base)
+
+
+def allocated(func, loop: int = 5):
+    """
+    peak bytes allocated by one call in steady state
+    """
+    func()
+    peak = 0
+    for _ in range(loop):
+        tracemalloc.start()
+        func()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def bench_out(width: int = 1920, height: int = 1080):
+    print(f' out= / imagectx {width}x{height} '.center(80, '='))
+    pixels = width * height
+    ctx = imagectx()
+    rgb888 = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+    rgb565 = imagelib.rgb8882rgb565(rgb888)
+
+    cases = [
+        ('rgb8882rgb565 (bytes)', lambda: imagelib.rgb8882rgb565(rgb888)),
+        ('rgb8882rgb565 (view)', lambda: imagelib.rgb8882rgb565(rgb888, view=True)),
+        ('imagectx.rgb8882rgb565', lambda: ctx.rgb8882rgb565(rgb888)),
+        ('buf2rgb565 ch3', lambda: imagelib.buf2rgb565(rgb888, width, height, 3)),
+        ('imagectx.buf2rgb565 ch3', lambda: ctx.buf2rgb565(rgb888, width, height, 3)),
+        ('buf2rgba ch2', lambda: imagelib.buf2rgba(rgb565, width, height, 2)),
+        ('imagectx.buf2rgba ch2', lambda: ctx.buf2rgba(rgb565, width, height, 2)),
+        ('rgb8882yuv', lambda: imagelib.rgb8882yuv(rgb888)),
+        ('imagectx.rgb8882yuv', lambda: ctx.rgb8882yuv(rgb888)),
+    ]
+    for name, func in cases:
+        ms, mps = bench(func, pixels)
+        print(f'{name:<40} {ms:9.3f} ms {mps:9.1f} MP/s {allocated(func) / 1024:10.1f} KB/call')
+
+
+def bench_folder(count: int = 64, width: int = 1280, height: int = 960):
+    import shutil
+    import tempfile
+
+    from PIL import Image
+
+    print(f' folder_crop_resize {count} x {width}x{height} jpg '.center(80, '='))
+    folder = tempfile.mkdtemp()
+    try:
+        for i in range(count):
+            image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+            Image.fromarray(image).save(f'{folder}/{i:04}.jpg')
+        for workers in (1, max(2, os.cpu_count())):
+            shutil.rmtree(f'{folder}/convert', ignore_errors=True)
+            summary = imagelib.folder_crop_resize(folder, 'bench', 240, 240, workers=workers)
+            print(f'{f"workers={workers}":<40} {summary["seconds"]:9.3f} s {summary["fps"]:9.1f} files/s')
+        summary = imagelib.folder_crop_resize(folder, 'bench', 240, 240, workers=max(2, os.cpu_count()))
+        print(f'{"up to date rerun":<40} {summary["seconds"]:9.3f} s {summary["skipped"]:9} skipped')
+    finally:
+        shutil.rmtree(folder)
+
+
+def bench_fast_downscale(width: int = 4000, height: int = 3000, w_resize: int = 240, h_resize: int = 240):
+    import tempfile
+
+    from PIL import Image
+
+    print(f' decode + resize {width}x{height} jpg to {w_resize}x{h_resize} '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        file = f'{folder}/bench.jpg'
+        image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        Image.fromarray(image).save(file, quality=90)
+        pixels = width * height
+
+        ms, base = bench(lambda: imagelib.im2rgb565(file, w_resize, h_resize), pixels, loop=5)
+        report('im2rgb565', ms, base)
+        ms, mps = bench(lambda: imagelib.im2rgb565(file, w_resize, h_resize, fast=True), pixels, loop=5)
+        report('im2rgb565 (fast)', ms, mps, base)
+        ms, base = bench(lambda: imagelib.cv2resize(imagelib.cv2imread(file), w_resize, h_resize), pixels, loop=5)
+        report('cv2imread + cv2resize', ms, base)
+        ms, mps = bench(lambda: imagelib.cv2resize(imagelib.cv2imread(file, reduce=8), w_resize, h_resize),
+                        pixels, loop=5)
+        report('cv2imread (reduce=8) + cv2resize', ms, mps, base)
+        ms, base = bench(lambda: imagelib.file_crop_resize(file, f'{folder}/out', w_resize, h_resize), pixels,
+                         loop=5)
+        report('file_crop_resize', ms, base)
+        ms, mps = bench(lambda: imagelib.file_crop_resize(file, f'{folder}/out', w_resize, h_resize, fast=True),
+                        pixels, loop=5)
+        report('file_crop_resize (fast)', ms, mps, base)
+
+
+def bench_index(count: int = 500):
+    import tempfile
+
+    from PIL import Image
+
+    print(f' image info of {count} files '.center(80, '='))
+    with tempfile.TemporaryDirectory() as root:
+        folder = f'{root}/images'
+        os.mkdir(folder)
+        for i in range(count):
+            Image.new('RGB', (64 + i % 7, 48)).save(f'{folder}/{i:04}.jpg')
+        files = [f'{folder}/{i:04}.jpg' for i in range(count)]
+        index_file = f'{root}/index.json'
+
+        def timeit(func):
+            start = time.perf_counter()
+            func()
+            return (time.perf_counter() - start) / count * 1e6
+
+        us = timeit(lambda: [imagelib.getiminfo(file) for file in files])
+        print(f'{"getiminfo (open each file)":<40} {us:9.1f} us/file')
+        with imageindex(index_file) as index:
+            us = timeit(lambda: index.scan(folder))
+        print(f'{"imageindex.scan (cold)":<40} {us:9.1f} us/file')
+        index = imageindex(index_file)
+        us = timeit(lambda: index.scan(folder))
+        print(f'{"imageindex.scan (warm, loaded from disk)":<40} {us:9.1f} us/file')
+        us = timeit(lambda: [imagelib.getiminfo(file, index) for file in files])
+        print(f'{"getiminfo (warm index)":<40} {us:9.1f} us/file')
+
+
+def bench_integer_yuv(width: int = 1920, height: int = 1080):
+    import cv2
+
+    print(f' yuv {width}x{height} '.center(80, '='))
+    pixels = width * height
+    rgb = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+    nv12 = imagelib.rgb8882nv12(rgb)
+    yuv = imagelib.rgb8882yuv(rgb)
+
+    ms, base = bench(lambda: imagelib.rgb8882yuv(rgb), pixels, loop=5)
+    kb = allocated(lambda: imagelib.rgb8882yuv(rgb)) / 1024
+    print(f'{"rgb8882yuv (float64)":<40} {ms:9.3f} ms {base:9.1f} MP/s {kb:10.1f} KB/call')
+    for name, func in (('rgb8882nv12', lambda: imagelib.rgb8882nv12(rgb, bgr=True)),
+                       ('rgb8882i420', lambda: imagelib.rgb8882i420(rgb)),
+                       ('rgb8882yuyv', lambda: imagelib.rgb8882yuyv(rgb)),
+                       ('cv2 RGB2YUV_I420 (reference)', lambda: cv2.cvtColor(rgb, cv2.COLOR_RGB2YUV_I420))):
+        ms, mps = bench(func, pixels, loop=5)
+        print(f'{name:<40} {ms:9.3f} ms {mps:9.1f} MP/s {allocated(func) / 1024:10.1f} KB/call x{mps / base:0.2f}')
+
+    ms, base = bench(lambda: imagelib.yuv2rgb888(yuv), pixels, loop=5)
+    print(f'{"yuv2rgb888 (float64)":<40} {ms:9.3f} ms {base:9.1f} MP/s')
+    for name, func in (('nv122rgb888', lambda: imagelib.nv122rgb888(nv12, width, height)),
+                       ('cv2 YUV2RGB_NV12 (reference)', lambda: cv2.cvtColor(nv12, cv2.COLOR_YUV2RGB_NV12))):
+        ms, mps = bench(func, pixels, loop=5)
+        report(name, ms, mps, base)
+
+
+def bench_stream(width: int = 6000, height: int = 4000, rows: int = 256):
+    import subprocess
+    import tempfile
+
+    from PIL import Image
+
+    print(f' im2stream {width}x{height} (peak RSS growth, mapped file pages included) '.center(80, '='))
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    with tempfile.TemporaryDirectory() as folder:
+        image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        for ext in ('bmp', 'jpg'):
+            Image.fromarray(image).save(f'{folder}/big.{ext}')
+        del image
+
+        cases = [
+            ('im2rgb565 + file_write_binary',
+             "b = imagelib.im2rgb565(src)[4]; filelib.file_write_binary(b, dst)"),
+            ('im2stream rgb565', "imagelib.im2stream(src, dst, 'rgb565', rows=ROWS)"),
+            ('im2rgb888 + rgb8882nv12', "w, h, _, _, b = imagelib.im2rgb888(src); "
+                                        "filelib.file_write_binary(imagelib.rgb8882nv12("
+                                        "np.frombuffer(b, np.uint8).reshape(h, w, 3)).tobytes(), dst)"),
+            ('im2stream nv12', "imagelib.im2stream(src, dst, 'nv12', rows=ROWS)"),
+        ]
+        for ext in ('bmp', 'jpg'):
+            for name, code in cases:
+                # ru_maxrss is inherited from this (big) process across fork, so reset and read VmHWM (linux)
+                script = (f"import sys, time; sys.path.insert(0, {root!r}); import numpy as np; "
+                          f"from imagelib import imagelib; from filelib import filelib; import PIL.Image; "
+                          f"PIL.Image.init(); "
+                          f"imagelib.slogger.setlevel(40); filelib.slogger.setlevel(40); "
+                          f"hwm = lambda: int([l for l in open('/proc/self/status') if l.startswith('VmHWM')][0].split()[1]); "
+                          f"open('/proc/self/clear_refs', 'w').write('5'); "
+                          f"src, dst, ROWS = {folder + '/big.' + ext!r}, {folder + '/out.raw'!r}, {rows}; "
+                          f"base = hwm(); "
+                          f"start = time.perf_counter(); {code}; seconds = time.perf_counter() - start; "
+                          f"print(seconds * 1000, (hwm() - base) / 1024)")
+                result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+                if result.returncode or os.path.getsize(f'{folder}/out.raw') == 0:
+                    print(f'{ext + " " + name:<40} FAIL {result.stderr.strip()[-200:]}')
+                    continue
+                os.remove(f'{folder}/out.raw')
+                ms, mb = map(float, result.stdout.split()[-2:])
+                print(f'{ext + " " + name:<40} {ms:9.3f} ms {mb:9.1f} MB peak')
+
+
+if __name__ == "__main__":
+    bench_rgb565_decode(320, 240)
+    bench_rgb565_decode()
+    bench_batch()
+    bench_out()
+    bench_folder()
+    bench_fast_downscale()
+    bench_index()
+    bench_integer_yuv()
+    bench_stream()
@@ -0,0 +1,77 @@
+"""
+import time benchmarks, run from repo root: python bench/bench_import.py
+
+each module is imported in a fresh interpreter with -X importtime, exit status is 1 when a module goes over
+its budget or loads a heavy dependency at import.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# module: import time budget (ms, cumulative incl. loglib/printlib)
+BUDGETS = {
+    'loglib': 100,
+    'filelib': 100,
+    'ctypeslib': 100,
+    'framelib': 100,
+    'imagelib': 100,
+    'vslib': 100,
+    'serlib': 100,
+    'pipelib': 100,
+    'jlinklib.pyjlink': 100,
+}
+# must not be imported until used
+HEAVY = ('cv2', 'numpy', 'PIL', 'serial', 'pylink')
+
+
+def importtime(module: str, loop: int = 5):
+    """
+    import module in fresh interpreters, return (best cumulative ms, heavy modules loaded), ms is None if import fails
+    """
+    script = f"import sys; import {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    best, heavy = None, []
+    for _ in range(loop):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=ROOT,
+                                capture_output=True, text=True)
+        if result.returncode:
+            return None, [result.stderr.strip().splitlines()[-1]]
+        # "import time: self [us] | cumulative | imported package", top level names have one leading space
+        names = [name.strip() for name in module.split(',')]
+        us = 0
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if not line.startswith('import time:') or len(fields) != 3 or fields[2][1:2] == ' ':
+                continue
+            name = fields[2].strip()
+            if any(n == name or n.startswith(name + '.') for n in names):
+                us += int(fields[1])
+        best = us if best is None else min(best, us)
+        heavy = result.stdout.split()
+    return best / 1000, heavy
+
+
+def bench_import():
+    print(' import time (fresh interpreter, best of 5) '.center(80, '='))
+    ok = True
+    for module, budget in BUDGETS.items():
+        ms, heavy = importtime(module)
+        if ms is None:
+            ok = False
+            print(f'{module:<32} FAIL {heavy[0]}')
+            continue
+        over = ms > budget or heavy
+        ok = ok and not over
+        print(f'{module:<32} {ms:9.3f} ms (budget {budget} ms) {"OVER" if over else "ok"}'
+              f'{" heavy: " + ", ".join(heavy) if heavy else ""}')
+
+    # reference: what every module paid before lazy loading
+    ms, _ = importtime('cv2, numpy, PIL.Image, serial')
+    if ms is not None:
+        print(f'{"cv2, numpy, PIL.Image, serial":<32} {ms:9.3f} ms (eager reference)')
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_import() else 1)
@@ -0,0 +1,152 @@
+"""
+loglib benchmarks, run from repo root: python bench/bench_loglib.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from loglib import loglib  # noqa: E402
+from printlib import logclock, printlib  # noqa: E402
+
+
+class slowstream:
+    """
+    console like stream, every 50th write stalls (terminal scroll, pipe full, disk flush)
+    """
+
+    def __init__(self, stall: float = 0.002):
+        self.stall = stall
+        self.count = 0
+
+    def write(self, text: str):
+        self.count += 1
+        if self.count % 50 == 0:
+            time.sleep(self.stall)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def latency(name: str, log, count: int):
+    """
+    per call latency of log(msg) in caller thread
+    """
+    times = np.empty(count)
+    for i in range(count):
+        start = time.perf_counter()
+        log(f'write 64 bytes: {i}')
+        times[i] = time.perf_counter() - start
+    print(f'{name:<40} avg {times.mean() * 1e6:8.1f} us p99 {np.percentile(times, 99) * 1e6:8.1f} us '
+          f'max {times.max() * 1e6:8.1f} us')
+
+
+def bench_async(count: int = 2000):
+    print(f' log call latency {count} calls, console (stalls) + file '.center(80, '='))
+    stdout = sys.stdout
+    with tempfile.TemporaryDirectory() as folder:
+        for mode in ('sync', 'async'):
+            sys.stdout = slowstream()
+            logger = loglib(f'bench_loglib_{mode}')
+            logger.start_log(f'{folder}/{mode}.log')
+            logger.init_console()
+            sys.stdout = stdout
+            if mode == 'async':
+                loglib.start_async()
+            for method in ('i', 'info'):
+                latency(f'{mode} {method}()', getattr(logger, method), count)
+            start = time.perf_counter()
+            loglib.flush()
+            flush = time.perf_counter() - start
+            loglib.stop_async()
+            logger.close_log()
+            logger.close_console()
+            if mode == 'async':
+                print(f'{"async flush()":<40} {flush * 1000:8.1f} ms, dropped {loglib.dropped}')
+
+
+def stack_caller_info(level: int = 1):
+    """
+    get_caller_info() before the fast path, for reference
+    """
+    import datetime
+    import inspect
+
+    stack = inspect.stack()
+    try:
+        the_class = stack[level][0].f_locals["self"].__class__.__name__
+    except KeyError:
+        the_class = None
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
+    if the_class:
+        return "{} [{}.{}#{}]".format(timestamp, the_class, stack[level][0].f_code.co_name, stack[level][0].f_lineno)
+    return "{} [{}#{}]".format(timestamp, stack[level][0].f_code.co_name, stack[level][0].f_lineno)
+
+
+def bench_caller(count: int = 2000):
+    print(f' caller info {count} calls, 20 frames deep '.center(80, '='))
+
+    def deep(depth: int, func):
+        # callers usually sit some frames below main (threads, frameworks, test runners)
+        return deep(depth - 1, func) if depth else func()
+
+    for name, func in (('inspect.stack() (before)', lambda: stack_caller_info(1)),
+                       ('printlib.get_caller_info()', lambda: printlib.get_caller_info(1)),
+                       ('printlib.caller() (no timestamp)', lambda: printlib.caller(1))):
+        start = time.perf_counter()
+        for _ in range(count):
+            deep(20, func)
+        seconds = time.perf_counter() - start
+        print(f'{name:<40} {seconds * 1e6 / count:8.1f} us/call')
+
+
+def bench_gated(count: int = 20000):
+    import logging
+
+    print(f' disabled level (INFO, logger at WARNING) {count} calls '.center(80, '='))
+    logger = loglib('bench_loglib_gated')
+    logger.setlevel(logging.WARNING)
+    data = bytes(range(256)) * 4
+
+    def before():
+        # eager message and caller info, dropped by logging afterwards
+        logging.getLogger('bench_loglib_gated').info('I/{} {}'.format(printlib.get_caller_info(1), f'READ <<< {data}'))
+
+    for name, func in (('eager f-string + caller info (before)', before),
+                       ('info(f-string)', lambda: logger.info(f'READ <<< {data}')),
+                       ("info('%s', data)", lambda: logger.info('READ <<< %s', data)),
+                       ('info(callable)', lambda: logger.info(lambda: f'READ <<< {data.hex()}'))):
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        seconds = time.perf_counter() - start
+        print(f'{name:<40} {seconds * 1e6 / count:8.2f} us/call')
+
+
+def bench_clock(count: int = 100000):
+    import datetime
+
+    print(f' log timestamp {count} calls '.center(80, '='))
+    for name, func, monotonic in (('datetime.now().strftime() (before)',
+                                   lambda: datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3], False),
+                                  ('logclock.now()', logclock.now, False),
+                                  ('logclock.now() monotonic', logclock.now, True)):
+        logclock.set_monotonic(monotonic)
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        seconds = time.perf_counter() - start
+        print(f'{name:<40} {seconds * 1e6 / count:8.2f} us/call')
+    logclock.set_monotonic(False)
+
+
+if __name__ == "__main__":
+    bench_clock()
+    bench_gated()
+    bench_caller()
+    bench_async()
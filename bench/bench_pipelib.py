@@ -0,0 +1,60 @@
+"""
+pipelib benchmarks, run from repo root: python bench/bench_pipelib.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filelib import filelib  # noqa: E402
+from imagelib import imagelib  # noqa: E402
+from pipelib import pipelib  # noqa: E402
+
+
+def bench_pipeline(count: int = 120, width: int = 1280, height: int = 720, fps: int = 60):
+    print(f' capture -> rgb565 -> sink {count} frames {width}x{height} @{fps}fps '.center(80, '='))
+    frame = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+    def capture():
+        # camera: a frame every 1 / fps
+        next_time = time.perf_counter()
+        for _ in range(count):
+            next_time += 1 / fps
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+            yield frame
+
+    def device(buf):
+        # e.g. serlib push, slower than capture
+        time.sleep(1.5 / fps)
+
+    with tempfile.TemporaryDirectory() as folder:
+        sinks = (('file', lambda buf: filelib.file_write_binary(buf, f'{folder}/frame.raw')), ('device', device))
+        for sink_name, sink in sinks:
+            # hand rolled loop: every stage waits for the others
+            start = time.perf_counter()
+            for image in capture():
+                sink(imagelib.bgr8882rgb565(image))
+            seconds = time.perf_counter() - start
+            print(f'{"loop " + sink_name:<32} {count / seconds:7.1f} frames/s')
+
+            for policy in ('block', 'drop_oldest'):
+                with pipelib() as pipe:
+                    pipe.add('rgb565', imagelib.bgr8882rgb565)
+                    pipe.add('sink', sink, policy=policy)
+                    pipe.start()
+                    start = time.perf_counter()
+                    pipe.feed(capture())
+                stats = pipe.getstats()
+                seconds = time.perf_counter() - start
+                sink_stats = stats['sink']
+                print(f'{"pipelib " + sink_name + " " + policy:<32} {count / seconds:7.1f} frames/s '
+                      f'written {sink_stats["out"]:4} dropped {sink_stats["dropped"]:4} '
+                      f'latency max {sink_stats["latency_max"] * 1000:7.1f} ms')
+
+
+if __name__ == "__main__":
+    bench_pipeline()
@@ -0,0 +1,422 @@
+"""
+vslib benchmarks, run from repo root: python bench/bench_vslib.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vslib import vslib, vsgroup, vspublisher, vssubscriber, vsrecorder, vssynthetic, vsclip, vschange  # noqa: E402
+
+
+def timeit(name: str, func, count: int):
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    print(f'{name:<48} {seconds * 1000 / count:9.3f} ms/frame {count / seconds:10.1f} frames/s')
+
+
+def make_video(file_name: str, count: int, width: int, height: int, fps: int = 30):
+    """
+    mjpg video of gradient, frame i has a i * 8 stripe on top so frames differ
+    """
+    writer = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    y = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+    frame = np.dstack((np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                       (x // 2 + y // 2).astype(np.uint8)))
+    for i in range(count):
+        frame[:16] = i * 8 % 256
+        writer.write(frame)
+    writer.release()
+
+
+class pacedstream:
+    """
+    cv2.VideoCapture wrapper reading at most fps frames per second, like a camera
+    """
+
+    def __init__(self, stream, fps: float):
+        self.stream = stream
+        self.period = 1 / fps
+        self.next = time.perf_counter()
+
+    def read(self, image=None):
+        return self.retrieve(image) if self.grab() else (False, None)
+
+    def grab(self):
+        self.next += self.period
+        time.sleep(max(0.0, self.next - time.perf_counter()))
+        return self.stream.grab()
+
+    def retrieve(self, image=None):
+        return self.stream.retrieve(image=image)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def bench_ring(count: int = 60, width: int = 3840, height: int = 2160):
+    print(f' ring buffer {count} frames {width}x{height} '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        video = f'{folder}/video.avi'
+        make_video(video, count, width, height)
+
+        # capture side: new frame per read vs decode into preallocated slot
+        def capture(ring: bool):
+            stream = cv2.VideoCapture(video)
+            slot = np.empty((height, width, 3), dtype=np.uint8)
+            while (stream.read(image=slot) if ring else stream.read())[0]:
+                pass
+            stream.release()
+        timeit('capture stream.read()', lambda: capture(False), count)
+        timeit('capture stream.read(image=slot)', lambda: capture(True), count)
+
+        # reader side on a still frame: lock + copy vs borrowed view
+        loop = 100
+        with vslib(video) as vs:
+            timeit('read() (lock + copy)', lambda: [vs.read() for _ in range(loop)], loop)
+        with vslib(video, slots=3) as vs:
+            def borrow():
+                for _ in range(loop):
+                    with vs.borrow() as frame:
+                        frame[0, 0]
+            timeit('borrow() (view)', borrow, loop)
+
+        # live: consumer downscales every frame it gets while capture thread decodes the file
+        for slots in (0, 3):
+            with vslib(video, slots=slots) as vs:
+                reads = 0
+                start = time.perf_counter()
+                vs.start()
+                while vs.grabbed:
+                    if slots:
+                        with vs.borrow() as frame:
+                            cv2.resize(frame, (width // 8, height // 8), interpolation=cv2.INTER_AREA)
+                    else:
+                        cv2.resize(vs.read(), (width // 8, height // 8), interpolation=cv2.INTER_AREA)
+                    reads += 1
+                seconds = time.perf_counter() - start
+                vs.stop()
+            name = 'live borrow() + resize' if slots else 'live read() + resize'
+            print(f'{name:<48} {reads / seconds:10.1f} reads/s while capturing {count / seconds:8.1f} frames/s')
+
+
+
+def bench_read_next(count: int = 120, width: int = 1280, height: int = 720, fps: int = 60):
+    print(f' read() polling vs read_next() {count} frames {width}x{height} @{fps}fps '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        video = f'{folder}/video.avi'
+        make_video(video, count, width, height, fps)
+
+        for name in ('read()', 'read_next()'):
+            with vslib(video) as vs:
+                vs.stream = pacedstream(vs.stream, fps)
+                vs.start()
+                # consumer works on every frame it gets
+                processed = 0
+                cpu = time.process_time()
+                while vs.grabbed:
+                    if name == 'read()':
+                        frame = vs.read()
+                    else:
+                        frame = vs.read_next(timeout=1)
+                        frame = frame and frame.frame
+                    if frame is not None:
+                        cv2.GaussianBlur(frame, (5, 5), 0)
+                        processed += 1
+                cpu = time.process_time() - cpu
+                vs.stop()
+                stats = vs.getstats()
+            print(f'{name:<16} processed {processed:5} duplicated {stats["duplicated"]:5} '
+                  f'dropped {stats["dropped"]:5} cpu {cpu:7.3f} s')
+
+
+
+def bench_prefetch(count: int = 120, width: int = 1920, height: int = 1080):
+    print(f' prefetch decode {count} frames {width}x{height} '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        video = f'{folder}/video.avi'
+        make_video(video, count, width, height)
+
+        def cpu_work(frame):
+            cv2.GaussianBlur(frame, (9, 9), 0)
+
+        def wait_work(frame):
+            # e.g. inference on accelerator or network, about one decode time
+            time.sleep(0.006)
+
+        def direct(work):
+            with vslib(video) as vs:
+                frame = vs.frame
+                while vs.grabbed:
+                    if work:
+                        work(frame)
+                    frame = vs._read()
+
+        def prefetch(work, depth: int = 4):
+            with vslib(video) as vs:
+                vs.prefetch(depth=depth)
+                while (frame := vs.read_prefetch()) is not None:
+                    with frame as image:
+                        if work:
+                            work(image)
+
+        print(f'cpu cores: {os.cpu_count()}, cpu work only overlaps decode with more than one core')
+        timeit('_read() (decode only)', lambda: direct(None), count)
+        timeit('prefetch (decode only)', lambda: prefetch(None), count)
+        for name, work in (('cpu work', cpu_work), ('wait work', wait_work)):
+            timeit(f'_read() + {name}', lambda: direct(work), count)
+            for depth in (1, 4):
+                timeit(f'prefetch depth {depth} + {name}', lambda: prefetch(work, depth), count)
+
+
+
+def bench_seek(count: int = 300, width: int = 1280, height: int = 720):
+    import random
+
+    print(f' seek {count} frames {width}x{height} mp4v '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        video = f'{folder}/video.mp4'
+        # inter-frame codec with keyframe every 12 frames (opencv default gop)
+        writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'mp4v'), 30, (width, height))
+        image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for i in range(count):
+            writer.write(np.roll(image, i * 4, axis=1))
+        writer.release()
+
+        with vslib(video) as vs:
+            timeit('seek_index() build (per frame)', lambda: vs.seek_index(cache=True), count)
+        with vslib(video) as vs:
+            timeit('seek_index() cached (per frame)', vs.seek_index, count)
+
+        def legacy(indexes):
+            with vslib(video) as vs:
+                for i in indexes:
+                    vs.set(cv2.CAP_PROP_POS_FRAMES, i)
+                    vs._read()
+
+        def read_at(indexes):
+            with vslib(video) as vs:
+                for i in indexes:
+                    vs.read_at(i)
+
+        def iter_frames(step: int):
+            with vslib(video) as vs:
+                for _ in vs.iter_frames(step=step):
+                    pass
+
+        shuffled = random.Random(0).sample(range(count), 50)
+        timeit('random: set(POS_FRAMES) + _read()', lambda: legacy(shuffled), len(shuffled))
+        timeit('random: read_at()', lambda: read_at(shuffled), len(shuffled))
+        for step in (2, 5, 30):
+            indexes = range(0, count, step)
+            timeit(f'every {step}: set(POS_FRAMES) + _read()', lambda: legacy(indexes), len(indexes))
+            timeit(f'every {step}: iter_frames(step={step})', lambda: iter_frames(step), len(indexes))
+
+
+
+def bench_group(sources: int = 4, count: int = 90, width: int = 640, height: int = 480, fps: int = 30):
+    print(f' {sources} sources {count} frames {width}x{height} @{fps}fps skew '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        video = f'{folder}/video.avi'
+        make_video(video, count, width, height, fps)
+
+        # independent capture threads, skew of latest frames seen by a consumer woken by source 0
+        streams = [vslib(video) for _ in range(sources)]
+        for vs in streams:
+            vs.stream = pacedstream(vs.stream, fps)
+        for vs in streams:
+            vs.start()
+        skews = []
+        while (frame := streams[0].read_next(timeout=1)) is not None:
+            times = [frame.timestamp] + [vs.timestamp for vs in streams[1:]]
+            skews.append(max(times) - min(times))
+        for vs in streams:
+            vs.stop()
+            vs.release()
+        print(f'{"vslib threads":<24} skew avg {np.mean(skews) * 1000:7.3f} ms max {np.max(skews) * 1000:7.3f} ms')
+
+        # group: grab back to back
+        streams = [vslib(video) for _ in range(sources)]
+        # same frame clock for all, like cameras triggered together
+        start = time.perf_counter()
+        for vs in streams:
+            vs.stream = pacedstream(vs.stream, fps)
+            vs.stream.next = start
+        with vsgroup(streams, max_failures=1) as group:
+            group.start()
+            while group.read_next(timeout=1) is not None:
+                pass
+            stats = group.getstats()
+        print(f'{"vsgroup":<24} skew avg {stats["skew_avg"] * 1000:7.3f} ms max {stats["skew_max"] * 1000:7.3f} ms '
+              f'{stats["sources"][0]["fps"]:5.1f} fps')
+
+
+def queue_worker(frames, results, count: int):
+    total = 0.0
+    for _ in range(count):
+        total += frames.get()[::16, ::16].mean()
+    results.put(total)
+
+
+def shm_worker(name: str, results, count: int):
+    total = 0.0
+    with vssubscriber(name) as subscriber:
+        for _ in range(count):
+            total += subscriber.read_next(timeout=10).frame[::16, ::16].mean()
+    results.put(total)
+
+
+def bench_fanout(count: int = 60, width: int = 1920, height: int = 1080):
+    import multiprocessing
+
+    print(f' fan-out {count} frames {width}x{height} to a worker process '.center(80, '='))
+    frame = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+    ctx = multiprocessing.get_context('spawn')
+
+    # pickled through multiprocessing.Queue
+    frames, results = ctx.Queue(maxsize=4), ctx.Queue()
+    worker = ctx.Process(target=queue_worker, args=(frames, results, count))
+    worker.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        frames.put(frame)
+    results.get()
+    seconds = time.perf_counter() - start
+    worker.join()
+    print(f'{"multiprocessing.Queue":<48} {seconds * 1000 / count:9.3f} ms/frame {count / seconds:10.1f} frames/s')
+
+    # shared memory ring big enough for all frames (no backpressure needed here)
+    with vspublisher(width, height, slots=count + 1) as publisher:
+        results = ctx.Queue()
+        worker = ctx.Process(target=shm_worker, args=(publisher.name, results, count))
+        worker.start()
+        # wait for worker to attach, so both paths time the same work
+        time.sleep(1)
+        start = time.perf_counter()
+        for _ in range(count):
+            publisher.publish(frame)
+        results.get()
+        seconds = time.perf_counter() - start
+        worker.join()
+    print(f'{"vspublisher/vssubscriber":<48} {seconds * 1000 / count:9.3f} ms/frame {count / seconds:10.1f} frames/s')
+
+
+def bench_record(count: int = 150, width: int = 1920, height: int = 1080, fps: int = 30):
+    print(f' record {count} frames {width}x{height} @{fps}fps mjpg '.center(80, '='))
+    with tempfile.TemporaryDirectory() as folder:
+        video = f'{folder}/video.avi'
+        make_video(video, count, width, height, fps)
+
+        def record(name: str, write):
+            # capture loop of a camera, a frame is late when it is read a period after it was due
+            stream = pacedstream(cv2.VideoCapture(video), fps)
+            late, gap, last = 0, 0.0, time.perf_counter()
+            while (frame := stream.read()[1]) is not None:
+                now = time.perf_counter()
+                late += now - stream.next > 1 / fps
+                gap = max(gap, now - last)
+                last = now
+                write(frame)
+            stream.release()
+            return f'{name:<24} late {late:4} max gap {gap * 1000:7.1f} ms'
+
+        print(f'cpu cores: {os.cpu_count()}, encode only runs beside capture with more than one core')
+        writer = cv2.VideoWriter(f'{folder}/inline.avi', cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+        print(record('inline VideoWriter', writer.write))
+        writer.release()
+        for mode in ('thread', 'process'):
+            with vsrecorder(f'{folder}/{mode}.avi', fps, mode=mode, segment_seconds=2) as recorder:
+                result = record(f'vsrecorder {mode}', recorder.write)
+            stats = recorder.getstats()
+            print(f'{result} written {stats["written"]:4} dropped {stats["dropped"]:4} '
+                  f'queue max {stats["queue_max"]:2} segments {len(stats["segments"])}')
+
+
+def bench_modes(count: int = 240, width: int = 1280, height: int = 720, fps: int = 60):
+    print(f' capture modes {count} frames {width}x{height} (no camera) '.center(80, '='))
+
+    def sources():
+        yield f'synthetic @{fps}fps', lambda: vssynthetic(width, height, fps, count=count)
+        frames = [vssynthetic(width, height, pattern='bars', paced=False).read()[1] for _ in range(8)]
+        yield 'clip (unpaced)', lambda: vsclip(frames * (count // 8))
+
+    def run(vs, mode: str):
+        # latency of each call that delivers a frame, consumer does a small resize per frame
+        latencies = []
+        if mode == 'prefetch':
+            vs.prefetch()
+        else:
+            vs.start()
+        while True:
+            start = time.perf_counter()
+            if mode == 'read()':
+                if not vs.grabbed:
+                    break
+                frame, release = vs.read(), None
+            else:
+                got = vs.read_prefetch(timeout=1) if mode == 'prefetch' else vs.read_next(timeout=1)
+                if got is None:
+                    break
+                frame, release = got.frame, got.release
+            latencies.append(time.perf_counter() - start)
+            cv2.resize(frame, (width // 4, height // 4), interpolation=cv2.INTER_NEAREST)
+            if release:
+                release()
+        vs.stop()
+        return latencies
+
+    for source_name, source in sources():
+        for mode, slots in (('read()', 0), ('read_next() copy', 0), ('read_next() ring', 3), ('prefetch', 0)):
+            with vslib(source(), slots=slots) as vs:
+                wall, cpu = time.perf_counter(), time.process_time()
+                latencies = run(vs, mode)
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            print(f'{source_name:<18} {mode:<18} latency avg {np.mean(latencies) * 1000:6.3f} ms '
+                  f'p99 {np.percentile(latencies, 99) * 1000:6.3f} ms {len(latencies) / wall:7.1f} reads/s '
+                  f'cpu {cpu / wall * 100:5.1f}%')
+
+
+def bench_change(count: int = 120, width: int = 1920, height: int = 1080):
+    print(f' change detection {count} frames {width}x{height} '.center(80, '='))
+    frames = [vssynthetic(width, height, pattern='gradient', paced=False).read()[1] for _ in range(2)]
+    loop = 200
+    change = vschange()
+    timeit('vschange.check() (64x36 signature)', lambda: [change.check(frames[i % 2]) for i in range(loop)], loop)
+    timeit('full frame cv2.absdiff().mean()', lambda: [cv2.absdiff(*frames).mean() for _ in range(loop)], loop)
+
+    # scene is active in a part of the frames, consumer blurs every frame it gets
+    still = frames[0]
+    moving = vssynthetic(width, height, pattern='noise', paced=False)
+    for activity in (0.1, 0.5, 1.0):
+        active = int(count * activity)
+        clip = [still] * (count - active) + [moving.read()[1] for _ in range(active)]
+        for name, change in (('no filter', None), ('vschange', vschange())):
+            with vslib(vsclip(clip)) as vs:
+                vs.set_filter(change).prefetch()
+                cpu = time.process_time()
+                processed = 0
+                while (frame := vs.read_prefetch()) is not None:
+                    with frame as image:
+                        cv2.GaussianBlur(image, (9, 9), 0)
+                    processed += 1
+                cpu = time.process_time() - cpu
+            print(f'activity {activity:4.0%} {name:<12} processed {processed:4} of {count} cpu {cpu:7.3f} s')
+
+
+if __name__ == "__main__":
+    bench_ring()
+    bench_read_next()
+    bench_prefetch()
+    bench_seek()
+    bench_group()
+    bench_fanout()
+    bench_record()
+    bench_modes()
+    bench_change()
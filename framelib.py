@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import os
+import struct
+
+from lazylib import lazylib
+from loglib import loglib
+
+# numpy is imported on first use
+np = lazylib.load('numpy')
+
+# header: magic, version, header size, width, height, channel, frame count, pixel format
+HEADER_FMT = '<4sHHIIIQ16s'
+HEADER_SIZE = 64
+MAGIC = b'PYFS'
+VERSION = 1
+# offset of frame count in header, updated on every append
+COUNT_OFFSET = struct.calcsize('<4sHHIII')
+
+# pixel format to channel (bytes per pixel)
+PIXEL_FORMATS = {'rgb565': 2, 'rgb888': 3, 'bgr888': 3, 'rgba': 4, 'gray': 1}
+
+
+class framelib:
+    """
+    The library for raw frame store, many same size frames in one file.
+
+    [layout]
+        64 bytes header, then frames back to back with fixed stride (width * height * channel),
+        frame i is at HEADER_SIZE + i * stride, read through np.memmap so frames are zero-copy views.
+    """
+    slogger = loglib(__name__)
+
+    def __init__(self, file_name: str, mode: str = 'r', width: int = 0, height: int = 0, fmt: str = 'rgb565'):
+        """
+        Parameters
+        ----------
+        file_name : str
+            frame store file
+        mode : str
+            'r' read only, 'a' append (create if not exist), 'w' create new (truncate)
+        width : int
+            width of frame, only for creating new store
+        height : int
+            height of frame, only for creating new store
+        fmt : str
+            pixel format (rgb565, rgb888, bgr888, rgba, gray), only for creating new store
+        """
+        self.file_name = file_name
+        self.mode = mode
+        self.file = None
+        self.mm = None
+        self.mm_count = 0
+        self.width, self.height, self.fmt = width, height, fmt
+        self.channel = PIXEL_FORMATS.get(fmt, 0)
+        self.count = 0
+
+        try:
+            if mode == 'w' or (mode == 'a' and not os.path.exists(file_name)):
+                if not width or not height or not self.channel:
+                    framelib.slogger.error(f'invalid frame size ({width}x{height}) or format ({fmt})!!!')
+                    return
+                self.file = open(file_name, 'w+b')
+                self.file.write(self._header())
+            elif mode in ('r', 'a'):
+                self.file = open(file_name, 'rb' if mode == 'r' else 'r+b')
+                if not self._read_header():
+                    self.close()
+            else:
+                framelib.slogger.error(f'invalid mode: {mode}!!!')
+        except IOError as e:
+            framelib.slogger.error('Cannot open frame store ({})..'.format(e))
+            self.file = None
+
+    @property
+    def stride(self):
+        return self.width * self.height * self.channel
+
+    @property
+    def shape(self):
+        if self.channel == 1:
+            return self.height, self.width
+        return self.height, self.width, self.channel
+
+    def is_opened(self):
+        return self.file is not None
+
+    def _header(self):
+        header = struct.pack(HEADER_FMT, MAGIC, VERSION, HEADER_SIZE, self.width, self.height, self.channel,
+                             self.count, self.fmt.encode())
+        return header.ljust(HEADER_SIZE, b'\0')
+
+    def _read_header(self):
+        header = self.file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            framelib.slogger.error(f'{self.file_name} is too short!!!')
+            return False
+        magic, version, header_size, width, height, channel, count, fmt = \
+            struct.unpack_from(HEADER_FMT, header)
+        if magic != MAGIC or version != VERSION or header_size != HEADER_SIZE:
+            framelib.slogger.error(f'{self.file_name} is not a frame store (v{VERSION})!!!')
+            return False
+        self.width, self.height, self.channel, self.count = width, height, channel, count
+        self.fmt = fmt.rstrip(b'\0').decode()
+
+        # trust file size over header count when last append was interrupted
+        frames = (os.fstat(self.file.fileno()).st_size - HEADER_SIZE) // self.stride if self.stride else 0
+        if frames < self.count:
+            framelib.slogger.warning(f'header count {self.count} > {frames} frames in file, use {frames}')
+            self.count = frames
+        return True
+
+    # region [write]
+    def append(self, frame):
+        """
+        append one frame.
+
+        Parameters
+        ----------
+        frame : bytes, bytearray or np.ndarray
+            frame data, must be exactly one frame (stride bytes)
+
+        Returns
+        -------
+        int
+            index of appended frame, -1 if fail
+        """
+
+        return self.extend([frame])
+
+    def extend(self, frames):
+        """
+        append frames (iterable of frame, or (N, H, W, C) np.ndarray).
+
+        Returns
+        -------
+        int
+            index of last appended frame, -1 if fail
+        """
+
+        if not self.file or self.mode == 'r':
+            framelib.slogger.error('frame store is not opened for writing!!!')
+            return -1
+
+        self.file.seek(HEADER_SIZE + self.count * self.stride)
+        count = self.count
+        try:
+            for frame in frames:
+                buf = memoryview(np.ascontiguousarray(frame) if isinstance(frame, np.ndarray) else frame)
+                if buf.nbytes != self.stride:
+                    framelib.slogger.error(f'frame size {buf.nbytes} != {self.stride}!!!')
+                    break
+                self.file.write(buf)
+                count += 1
+        except (IOError, TypeError) as e:
+            framelib.slogger.error('Cannot write frame ({})..'.format(e))
+
+        # header count is updated after frame data, so a crash never exposes a partial frame
+        self.file.flush()
+        self.file.seek(COUNT_OFFSET)
+        self.file.write(struct.pack('<Q', count))
+        self.file.flush()
+        appended = count - self.count
+        self.count = count
+        return count - 1 if appended else -1
+
+    # endregion [write]
+
+    # region [read]
+    def _map(self):
+        """
+        map all frames, remapped only when frames are appended after last mapping
+        """
+        if self.mm_count != self.count:
+            self.mm = np.memmap(self.file_name, dtype=np.uint8, mode='r', offset=HEADER_SIZE,
+                                shape=(self.count,) + self.shape)
+            self.mm_count = self.count
+        return self.mm
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """
+        frame i (or slice of frames) as read-only np.ndarray view of file, no copy
+        """
+        if isinstance(i, slice):
+            return self._map()[i] if self.count else np.empty((0,) + self.shape, dtype=np.uint8)
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f'frame {i} out of range ({self.count})')
+        return self._map()[i]
+
+    def __iter__(self):
+        """
+        iterate frames, pages are loaded on access and can be dropped by os, memory stays constant
+        """
+        for i in range(self.count):
+            yield self[i]
+
+    def frames(self, start: int = 0, stop: int = None, step: int = 1):
+        """
+        iterate frames in range(start, stop, step)
+        """
+        for i in range(*slice(start, stop, step).indices(self.count)):
+            yield self[i]
+
+    # endregion [read]
+
+    def close(self):
+        self.mm = None
+        self.mm_count = 0
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def pack(file_name: str, raw_files: list, width: int, height: int, fmt: str = 'rgb565'):
+        """
+        pack raw frame files (one frame per file, e.g. from imagelib.file_crop_resize) into one frame store.
+
+        Returns
+        -------
+        int
+            number of frames in store
+        """
+        from filelib import filelib
+
+        with framelib(file_name, 'w', width, height, fmt) as store:
+            if not store.is_opened():
+                return 0
+            store.extend(buf for buf in map(filelib.file_read_binary, raw_files) if buf is not None)
+            return len(store)
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    # endregion [with]
+
+
+# region [main]
+if __name__ == "__main__":
+    """
+    For console test
+    """
+# endregion [main]
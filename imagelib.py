@@ -1,29 +1,94 @@
-import cv2
-import numpy as np
-from PIL import Image, UnidentifiedImageError
+from __future__ import annotations
 
+import sys
+
+from lazylib import lazylib
 from loglib import loglib
 
+# heavy dependencies are imported on first use
+cv2 = lazylib.load('cv2')
+np = lazylib.load('numpy')
+Image = lazylib.load('PIL.Image')
+
 MASK5 = 0b011111
 MASK6 = 0b111111
 
+# cv2.imread flag names for decode scale 1/n
+CV2_IMREAD_REDUCED = {
+    1: 'IMREAD_COLOR',
+    2: 'IMREAD_REDUCED_COLOR_2',
+    4: 'IMREAD_REDUCED_COLOR_4',
+    8: 'IMREAD_REDUCED_COLOR_8',
+}
+# PIL resize() reduces by integer factor first until image is within this factor of target size
+PIL_REDUCING_GAP = 2.0
+
+# RGB565 decode tables, built on first use, key: (channel, byteorder)
+RGB565_LUT = {}
+
+# reference: https://gist.github.com/Quasimondo/c3590226c924a06b276d606f4f189639
+# plain tuples so importing does not load numpy, numpy takes them as arrays
+RGB2YUV = ((0.29900, -0.16874, 0.50000),
+           (0.58700, -0.33126, -0.41869),
+           (0.11400, 0.50000, -0.08131))
+YUV2RGB = ((1.0, 1.0, 1.0),
+           (-0.000007154783816076815, -0.3441331386566162, 1.7720025777816772),
+           (1.4019975662231445, -0.7141380310058594, 0.00001542569043522235))
+YUV2RGB_OFFSET = (-179.45477266423404, 135.45870971679688, -226.8183044444304)
+
+# integer YUV engine: (Kr, Kb) per standard, fixed-point scale, coefficient cache
+YUV_STANDARDS = {'bt601': (0.299, 0.114), 'bt709': (0.2126, 0.0722)}
+YUV_SHIFT = 14
+YUV_COEF = {}
+# rows per stripe, bounds int32 temporaries
+YUV_ROWS = 64
+
+# uncompressed PIL rawmode streamed by np.memmap: (bytes per pixel, RGB index, alpha index)
+STREAM_RAWMODES = {
+    'RGB': (3, (0, 1, 2), None),
+    'BGR': (3, (2, 1, 0), None),
+    'RGBX': (4, (0, 1, 2), None),
+    'BGRX': (4, (2, 1, 0), None),
+    'RGBA': (4, (0, 1, 2), 3),
+    'BGRA': (4, (2, 1, 0), 3),
+    'L': (1, (0, 0, 0), None),
+}
+# folder_crop_resize saves its manifest after every MANIFEST_BATCH converted files
+MANIFEST_BATCH = 32
+# decoded (compressed) image modes im2stream maps to a temporary file: mode: (bytes per pixel, rawmode of PIL)
+STREAM_SPILLMODES = {
+    'L': (1, 'L'),
+    'P': (1, 'P'),
+    'RGB': (4, 'RGBX'),
+    'RGBA': (4, 'RGBA'),
+    'CMYK': (4, 'CMYK'),
+}
+# output format of im2stream: bytes per pixel (yuv 4:2:0 is 1.5)
+STREAM_FORMATS = {'rgb888': 3, 'rgba': 4, 'rgb565': 2, 'nv12': 1.5, 'i420': 1.5, 'yuyv': 2}
+
+# batch conversions: (channel in, channel out, dtype out, temporary bytes per pixel, kernel)
+# built on first use by imagelib._batch_conversions(), kernels need cv2 and numpy
+BATCH_CONVERSIONS = {}
+
 
 class imagelib:
     slogger = loglib(__name__)
 
     @staticmethod
-    def rgba2rgb888(rgba, width: int, height: int):
+    def rgba2rgb888(rgba, width: int, height: int, out: np.ndarray = None):
         """
         RGBA to RGB888.
 
         Parameters
         ----------
-        rgba : bytes or bytearray
+        rgba : bytes, bytearray or np.ndarray
             rgba image data
         width : int
             width of image
         height : int
             height of image
+        out : np.ndarray
+            preallocated (height, width, 3) uint8 output, None to allocate new one
 
         Returns
         -------
@@ -34,29 +99,30 @@ class imagelib:
         rgb888 = None
 
         try:
-            if type(rgba) is bytes:
+            if type(rgba) is bytes or type(rgba) is bytearray:
                 rgba = np.frombuffer(rgba, dtype=np.uint8).reshape(height, width, 4)
-            elif type(rgba) is bytearray:
-                rgba = np.array(rgba, dtype=np.uint8).reshape(height, width, 4)
-            rgb888 = cv2.cvtColor(rgba, cv2.COLOR_RGBA2RGB)
+            imagelib._check_out(out, (height, width, 3))
+            rgb888 = cv2.cvtColor(rgba, cv2.COLOR_RGBA2RGB, dst=out)
         except ValueError as e:
             imagelib.slogger.error('ValueError: {}'.format(e))
 
         return rgb888
 
     @staticmethod
-    def rgb8882rgba(rgb888, width: int, height: int):
+    def rgb8882rgba(rgb888, width: int, height: int, out: np.ndarray = None):
         """
         RGB888 to RGBA.
 
         Parameters
         ----------
-        rgb888 : bytes or bytearray
+        rgb888 : bytes, bytearray or np.ndarray
             rgb888 image data
         width : int
             width of image
         height : int
             height of image
+        out : np.ndarray
+            preallocated (height, width, 4) uint8 output, None to allocate new one
 
         Returns
         -------
@@ -67,18 +133,17 @@ class imagelib:
         rgba = None
 
         try:
-            if type(rgb888) is bytes:
+            if type(rgb888) is bytes or type(rgb888) is bytearray:
                 rgb888 = np.frombuffer(rgb888, dtype=np.uint8).reshape(height, width, 3)
-            elif type(rgb888) is bytearray:
-                rgb888 = np.array(rgb888, dtype=np.uint8).reshape(height, width, 3)
-            rgba = cv2.cvtColor(rgb888, cv2.COLOR_RGB2RGBA)
+            imagelib._check_out(out, (height, width, 4))
+            rgba = cv2.cvtColor(rgb888, cv2.COLOR_RGB2RGBA, dst=out)
         except ValueError as e:
             imagelib.slogger.error('ValueError: {}'.format(e))
 
         return rgba
 
     @staticmethod
-    def rgb5652rgb888(rgb565, width: int, height: int):
+    def rgb5652rgb888(rgb565, width: int, height: int, out: np.ndarray = None):
         """
         RGB565 to RGB888.
 
@@ -86,12 +151,14 @@ class imagelib:
 
         Parameters
         ----------
-        rgb565 : bytes or bytearray
+        rgb565 : bytes, bytearray or np.ndarray
             rgb565 image data
         width : int
             width of image
         height : int
             height of image
+        out : np.ndarray
+            preallocated (height, width, 3) uint8 output, None to allocate new one
 
         Returns
         -------
@@ -103,10 +170,8 @@ class imagelib:
 
         try:
             # convert to ndarray (height, width, channel)
-            if type(rgb565) is bytes:
+            if type(rgb565) is bytes or type(rgb565) is bytearray:
                 rgb565 = np.frombuffer(rgb565, dtype=np.uint8).reshape(height, width, 2)
-            elif type(rgb565) is bytearray:
-                rgb565 = np.array(rgb565, dtype=np.uint8).reshape(height, width, 2)
             # convert WxHx2 array of uint8 into WxH array of uint16
             byte0 = rgb565[:, :, 0].astype(np.uint16)
             byte1 = rgb565[:, :, 1].astype(np.uint16)
@@ -115,14 +180,142 @@ class imagelib:
             b8 = (rgb565 & MASK5) << 3
             g8 = ((rgb565 >> 5) & MASK6) << 2
             r8 = ((rgb565 >> (5 + 6)) & MASK5) << 3
-            rgb888 = np.dstack((r8, g8, b8)).astype(np.uint8)
+            if out is None:
+                rgb888 = np.dstack((r8, g8, b8)).astype(np.uint8)
+            else:
+                imagelib._check_out(out, (height, width, 3))
+                out[..., 0], out[..., 1], out[..., 2] = r8, g8, b8
+                rgb888 = out
         except ValueError as e:
             imagelib.slogger.error('ValueError: {}'.format(e))
 
         return rgb888
 
     @staticmethod
-    def rgb8882rgb565(rgb888: np.ndarray):
+    def rgb565_lut(channel: int = 3, byteorder: str = 'little'):
+        """
+        get RGB565 decode table (65536 entries), indexed by the native uint16 view of rgb565 data.
+
+        the big-endian table is just the little-endian one with byte swapped index,
+        so both variants decode by one table lookup without swapping the input buffer.
+
+        Parameters
+        ----------
+        channel : int
+            3 for RGB888, 4 for RGBA
+        byteorder : str
+            byte order of rgb565 data, 'little' or 'big'
+
+        Returns
+        -------
+        np.ndarray
+            decode table with shape (65536, channel)
+        """
+
+        key = (channel, byteorder)
+        lut = RGB565_LUT.get(key)
+        if lut is not None:
+            return lut
+
+        # interpret each native uint16 index as rgb565 value in given byte order
+        index = np.arange(65536, dtype=np.uint16)
+        if byteorder != sys.byteorder:
+            index = index.byteswap()
+
+        lut = np.empty((65536, channel), dtype=np.uint8)
+        lut[:, 0] = ((index >> (5 + 6)) & MASK5) << 3
+        lut[:, 1] = ((index >> 5) & MASK6) << 2
+        lut[:, 2] = (index & MASK5) << 3
+        if channel == 4:
+            lut[:, 3] = 0xFF
+
+        RGB565_LUT[key] = lut
+        return lut
+
+    @staticmethod
+    def rgb5652rgb888_lut(rgb565, width: int, height: int, byteorder: str = 'little', out: np.ndarray = None):
+        """
+        RGB565 to RGB888 by decode table.
+
+        Parameters
+        ----------
+        rgb565 : bytes, bytearray or np.ndarray
+            rgb565 image data
+        width : int
+            width of image
+        height : int
+            height of image
+        byteorder : str
+            byte order of rgb565 data, 'little' or 'big'
+        out : np.ndarray
+            preallocated (height, width, 3) uint8 output, None to allocate new one
+
+        Returns
+        -------
+        np.ndarray
+            rgb888 image data
+        """
+
+        return imagelib._rgb565_decode(rgb565, width, height, 3, byteorder, out)
+
+    @staticmethod
+    def rgb5652rgba_lut(rgb565, width: int, height: int, byteorder: str = 'little', out: np.ndarray = None):
+        """
+        RGB565 to RGBA by decode table.
+
+        Parameters
+        ----------
+        rgb565 : bytes, bytearray or np.ndarray
+            rgb565 image data
+        width : int
+            width of image
+        height : int
+            height of image
+        byteorder : str
+            byte order of rgb565 data, 'little' or 'big'
+        out : np.ndarray
+            preallocated (height, width, 4) uint8 output, None to allocate new one
+
+        Returns
+        -------
+        np.ndarray
+            rgba image data
+        """
+
+        return imagelib._rgb565_decode(rgb565, width, height, 4, byteorder, out)
+
+    @staticmethod
+    def _rgb565_decode(rgb565, width: int, height: int, channel: int, byteorder: str, out: np.ndarray = None,
+                       index: np.ndarray = None):
+        """
+        index is optional (width * height) np.intp scratch, take() converts uint16 index to intp otherwise
+        """
+        rgb = None
+
+        try:
+            if isinstance(rgb565, np.ndarray):
+                rgb565 = np.ascontiguousarray(rgb565, dtype=np.uint8)
+            # native uint16 view, no copy
+            rgb565 = np.frombuffer(rgb565, dtype=np.uint16, count=width * height)
+            if index is None:
+                index = rgb565
+            else:
+                np.copyto(index, rgb565)
+            lut = imagelib.rgb565_lut(channel, byteorder)
+            if out is None:
+                rgb = np.take(lut, index, axis=0).reshape(height, width, channel)
+            else:
+                imagelib._check_out(out, (height, width, channel))
+                # index is always in range, 'clip' avoids take() buffering out
+                np.take(lut, index, axis=0, out=out.reshape(-1, channel), mode='clip')
+                rgb = out
+        except ValueError as e:
+            imagelib.slogger.error('ValueError: {}'.format(e))
+
+        return rgb
+
+    @staticmethod
+    def rgb8882rgb565(rgb888: np.ndarray, out: np.ndarray = None, view: bool = False):
         """
         RGB888 to RGB565.
 
@@ -131,23 +324,37 @@ class imagelib:
         Parameters
         ----------
         rgb888 : np.ndarray
-            rgb888 image data
+            rgb888 (or rgba, alpha is ignored) image data
+        out : np.ndarray
+            preallocated (height, width, 2) uint8 output, rgb888 must be uint8, None to allocate new one
+        view : bool
+            return (height, width, 2) uint8 np.ndarray instead of copying it to bytes
 
         Returns
         -------
-        bytes
-            rgb565 image data
+        bytes or np.ndarray
+            rgb565 image data, np.ndarray when out is given or view is True, None if out mismatches
         """
 
+        if out is not None:
+            try:
+                imagelib._check_out(out, rgb888.shape[:2] + (2,))
+                return cv2.cvtColor(rgb888, cv2.COLOR_RGB2BGR565, dst=out)
+            except ValueError as e:
+                imagelib.slogger.error('ValueError: {}'.format(e))
+                return None
+
         r5 = (rgb888[..., 0] >> 3).astype(np.uint16) << 11
         g6 = (rgb888[..., 1] >> 2).astype(np.uint16) << 5
         b5 = (rgb888[..., 2] >> 3).astype(np.uint16)
         rgb565 = r5 | g6 | b5
 
+        if view:
+            return rgb565.view(np.uint8).reshape(rgb565.shape + (2,))
         return rgb565.tobytes()
 
     @staticmethod
-    def bgr8882rgb565(bgr888: np.ndarray):
+    def bgr8882rgb565(bgr888: np.ndarray, out: np.ndarray = None, view: bool = False):
         """
         BGR888 to RGB565.
 
@@ -157,22 +364,36 @@ class imagelib:
         ----------
         bgr888 : np.ndarray
             bgr888 image data
+        out : np.ndarray
+            preallocated (height, width, 2) uint8 output, bgr888 must be uint8, None to allocate new one
+        view : bool
+            return (height, width, 2) uint8 np.ndarray instead of copying it to bytes
 
         Returns
         -------
-        bytes
-            rgb565 image data
+        bytes or np.ndarray
+            rgb565 image data, np.ndarray when out is given or view is True, None if out mismatches
         """
 
+        if out is not None:
+            try:
+                imagelib._check_out(out, bgr888.shape[:2] + (2,))
+                return cv2.cvtColor(bgr888, cv2.COLOR_BGR2BGR565, dst=out)
+            except ValueError as e:
+                imagelib.slogger.error('ValueError: {}'.format(e))
+                return None
+
         r5 = (bgr888[..., 2] >> 3).astype(np.uint16) << 11
         g6 = (bgr888[..., 1] >> 2).astype(np.uint16) << 5
         b5 = (bgr888[..., 0] >> 3).astype(np.uint16)
         rgb565 = r5 | g6 | b5
 
+        if view:
+            return rgb565.view(np.uint8).reshape(rgb565.shape + (2,))
         return rgb565.tobytes()
 
     @staticmethod
-    def cv2imread(img_name: str, cvt_rgb: bool = True):
+    def cv2imread(img_name: str, cvt_rgb: bool = True, reduce: int = 1):
         """
          read image file.
 
@@ -182,6 +403,8 @@ class imagelib:
             image name
         cvt_rgb : bool
             if convert to RGB
+        reduce : int
+            decode at 1/reduce scale (1, 2, 4 or 8), jpeg is scaled in DCT domain which is much faster
 
         Returns
         -------
@@ -196,7 +419,12 @@ class imagelib:
                 imagelib.slogger.error('file_name is None or empty!!!')
                 break
 
-            buf = cv2.imread(img_name)
+            flags = CV2_IMREAD_REDUCED.get(reduce)
+            if flags is None:
+                imagelib.slogger.error(f'reduce {reduce} is not 1, 2, 4 or 8!!!')
+                break
+
+            buf = cv2.imread(img_name, getattr(cv2, flags))
             if cvt_rgb:
                 buf = cv2.cvtColor(buf, cv2.COLOR_BGR2RGB)
             break
@@ -204,7 +432,7 @@ class imagelib:
         return buf
 
     @staticmethod
-    def cv2resize(image: np.ndarray, width: int = 0, height: int = 0, inter: int = cv2.INTER_AREA):
+    def cv2resize(image: np.ndarray, width: int = 0, height: int = 0, inter: int = None):
         """
         image resize and keep the aspect rate of the original image when width is 0 or height is 0.
 
@@ -221,7 +449,7 @@ class imagelib:
         height : int
             height
         inter : int
-            interpolation
+            interpolation, None is cv2.INTER_AREA
 
         Returns
         -------
@@ -252,7 +480,7 @@ class imagelib:
             dim = (width, height)
 
         # resize the image
-        resized = cv2.resize(image, dim, interpolation=inter)
+        resized = cv2.resize(image, dim, interpolation=cv2.INTER_AREA if inter is None else inter)
 
         # return the resized image
         return resized
@@ -301,7 +529,7 @@ class imagelib:
         return crop
 
     @staticmethod
-    def getiminfo(file: str):
+    def getiminfo(file: str, index=None):
         """
         get image (jpg,bmp...etc) info (width, height, channel).
 
@@ -309,6 +537,8 @@ class imagelib:
         ----------
         file : str
             file name
+        index : imageindex
+            metadata index to answer from, None to read image header
 
         Returns
         -------
@@ -318,6 +548,11 @@ class imagelib:
             - channel (int): image channel
         """
 
+        # answer from index when it has the file
+        if index is not None:
+            info = index.get(file)
+            return info[:3] if info else (0, 0, 0)
+
         # get image info
         pilimage = imagelib.pilopen(file)
 
@@ -325,16 +560,18 @@ class imagelib:
             imagelib.slogger.error('pilimage is None!!!')
             return 0, 0, 0
 
-        # assign image size
-        (width, height) = pilimage.size
+        # only header is read, close file right away
+        with pilimage:
+            # assign image size
+            (width, height) = pilimage.size
 
-        # assign channel
-        channel = len(pilimage.getbands())
+            # assign channel
+            channel = len(pilimage.getbands())
 
         return width, height, channel
 
     @staticmethod
-    def buf2rgba(buffer, width: int, height: int, channel: int):
+    def buf2rgba(buffer, width: int, height: int, channel: int, out: np.ndarray = None):
         """
         convert buffer to rgba.
 
@@ -348,6 +585,8 @@ class imagelib:
             height of image
         channel : int
             color channel
+        out : np.ndarray
+            preallocated (height, width, 4) uint8 output, None to allocate new one
 
         Returns
         -------
@@ -357,23 +596,39 @@ class imagelib:
 
         rgba = None
         if channel == 1:
-            if type(buffer) is bytes:
-                image = Image.frombytes('L', (width, height), buffer, 'raw')
-            elif type(buffer) is bytearray:
-                image = Image.frombytes('L', (width, height), bytes(buffer), 'raw')
-            rgba = image.convert('RGBA')
-            rgba = np.array(rgba)
+            if out is not None:
+                gray = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width)
+                try:
+                    imagelib._check_out(out, (height, width, 4))
+                    rgba = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGBA, dst=out)
+                except ValueError as e:
+                    imagelib.slogger.error('ValueError: {}'.format(e))
+                    return None
+            else:
+                if type(buffer) is bytes:
+                    image = Image.frombytes('L', (width, height), buffer, 'raw')
+                elif type(buffer) is bytearray:
+                    image = Image.frombytes('L', (width, height), bytes(buffer), 'raw')
+                rgba = image.convert('RGBA')
+                rgba = np.array(rgba)
         elif channel == 2:
-            buffer = imagelib.rgb5652rgb888(buffer, width, height)
-            rgba = imagelib.rgb8882rgba(buffer, width, height)
+            rgba = imagelib.rgb5652rgba_lut(buffer, width, height, out=out)
         elif channel == 3:
-            rgba = imagelib.rgb8882rgba(buffer, width, height)
+            rgba = imagelib.rgb8882rgba(buffer, width, height, out=out)
         elif channel == 4:
             rgba = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4)
+            if out is not None:
+                try:
+                    imagelib._check_out(out, (height, width, 4))
+                    np.copyto(out, rgba)
+                    rgba = out
+                except ValueError as e:
+                    imagelib.slogger.error('ValueError: {}'.format(e))
+                    return None
         return rgba
 
     @staticmethod
-    def buf2rgb888(buffer, width: int, height: int, channel: int):
+    def buf2rgb888(buffer, width: int, height: int, channel: int, out: np.ndarray = None):
         """
         convert buffer to rgb888.
 
@@ -387,6 +642,8 @@ class imagelib:
             height of image
         channel : int
             color channel
+        out : np.ndarray
+            preallocated (height, width, 3) uint8 output, None to allocate new one
 
         Returns
         -------
@@ -396,28 +653,44 @@ class imagelib:
 
         rgb888 = None
         if channel == 1:
-            if type(buffer) is bytes:
-                image = Image.frombytes('L', (width, height), buffer, 'raw')
-            elif type(buffer) is bytearray:
-                image = Image.frombytes('L', (width, height), bytes(buffer), 'raw')
-            rgb888 = image.convert('RGB')
-            rgb888 = np.array(rgb888)
+            if out is not None:
+                gray = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width)
+                try:
+                    imagelib._check_out(out, (height, width, 3))
+                    rgb888 = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB, dst=out)
+                except ValueError as e:
+                    imagelib.slogger.error('ValueError: {}'.format(e))
+            else:
+                if type(buffer) is bytes:
+                    image = Image.frombytes('L', (width, height), buffer, 'raw')
+                elif type(buffer) is bytearray:
+                    image = Image.frombytes('L', (width, height), bytes(buffer), 'raw')
+                rgb888 = image.convert('RGB')
+                rgb888 = np.array(rgb888)
         elif channel == 2:
-            rgb888 = imagelib.rgb5652rgb888(buffer, width, height)
+            rgb888 = imagelib.rgb5652rgb888_lut(buffer, width, height, out=out)
         elif channel == 3:
             rgb888 = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+            if out is not None:
+                try:
+                    imagelib._check_out(out, (height, width, 3))
+                    np.copyto(out, rgb888)
+                    rgb888 = out
+                except ValueError as e:
+                    imagelib.slogger.error('ValueError: {}'.format(e))
+                    rgb888 = None
         elif channel == 4:
-            rgb888 = imagelib.rgba2rgb888(buffer, width, height)
+            rgb888 = imagelib.rgba2rgb888(buffer, width, height, out=out)
         return rgb888
 
     @staticmethod
-    def buf2rgb565(buffer, width: int, height: int, channel: int):
+    def buf2rgb565(buffer, width: int, height: int, channel: int, out: np.ndarray = None):
         """
         convert buffer to rgb565.
 
         Parameters
         ----------
-        buffer : bytes or bytearray
+        buffer : bytes, bytearray or np.ndarray
             image data
         width : int
             width of image
@@ -425,6 +698,8 @@ class imagelib:
             height of image
         channel : int
             color channel
+        out : np.ndarray
+            preallocated (height, width, 2) uint8 output, None to allocate new one
 
         Returns
         -------
@@ -434,27 +709,56 @@ class imagelib:
 
         rgb565 = None
         if channel == 1:
-            if type(buffer) is bytes:
-                image = Image.frombytes('L', (width, height), buffer, 'raw')
-            elif type(buffer) is bytearray:
-                image = Image.frombytes('L', (width, height), bytes(buffer), 'raw')
-            rgb888 = image.convert('RGB')
-            rgb888 = np.array(rgb888)
-            rgb565 = imagelib.rgb8882rgb565(rgb888)
+            if out is not None:
+                gray = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width)
+                try:
+                    imagelib._check_out(out, (height, width, 2))
+                    rgb565 = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR565, dst=out)
+                except ValueError as e:
+                    imagelib.slogger.error('ValueError: {}'.format(e))
+            else:
+                if type(buffer) is bytes:
+                    image = Image.frombytes('L', (width, height), buffer, 'raw')
+                elif type(buffer) is bytearray:
+                    image = Image.frombytes('L', (width, height), bytes(buffer), 'raw')
+                rgb888 = image.convert('RGB')
+                rgb888 = np.array(rgb888)
+                rgb565 = imagelib.rgb8882rgb565(rgb888, view=True)
         elif channel == 2:
-            pass
+            rgb565 = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 2)
+            if out is not None:
+                try:
+                    imagelib._check_out(out, (height, width, 2))
+                    np.copyto(out, rgb565)
+                    rgb565 = out
+                except ValueError as e:
+                    imagelib.slogger.error('ValueError: {}'.format(e))
+                    rgb565 = None
         elif channel == 3:
-            rgb565 = imagelib.rgb8882rgb565(buffer)
+            if type(buffer) is bytes or type(buffer) is bytearray:
+                buffer = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+            rgb565 = imagelib.rgb8882rgb565(buffer, out=out, view=True)
         elif channel == 4:
-            buffer = imagelib.rgba2rgb888(buffer, width, height)
-            rgb565 = imagelib.rgb8882rgb565(buffer)
+            # straight from rgba, alpha is ignored (no rgb888 temporary)
+            if type(buffer) is bytes or type(buffer) is bytearray:
+                buffer = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4)
+            rgb565 = imagelib.rgb8882rgb565(buffer, out=out, view=True)
 
-        # bytes to np.ndarray
-        rgb565 = np.frombuffer(rgb565, dtype=np.uint8).reshape(height, width, 2)
         return rgb565
 
     @staticmethod
-    def im2rgba(file: str, resize_width: int = 0, resize_height: int = 0):
+    def _check_out(out: np.ndarray, shape: tuple, dtype='uint8'):
+        """
+        check preallocated output, cv2 silently allocates a new one when dst mismatches
+        """
+        if out is None:
+            return
+        if out.shape != tuple(shape) or out.dtype != dtype or not out.flags.c_contiguous:
+            raise ValueError(f'out must be C-contiguous {np.dtype(dtype)} with shape {tuple(shape)}, '
+                             f'got {out.dtype} {out.shape}')
+
+    @staticmethod
+    def im2rgba(file: str, resize_width: int = 0, resize_height: int = 0, fast: bool = False):
         """
         convert image (jpg,bmp...etc) to rgba.
 
@@ -466,6 +770,8 @@ class imagelib:
             resize width, resize when both w/h are not 0
         resize_height : int
             resize height, resize when both w/h are not 0
+        fast : bool
+            fast downscale, see pildraft
 
         Returns
         -------
@@ -477,41 +783,10 @@ class imagelib:
             - buf (bytes): image rgba data
         """
 
-        # get image info
-        pilimage = imagelib.pilopen(file)
-
-        if pilimage is None:
-            imagelib.slogger.error('pilimage is None!!!')
-            return 0, 0, 0, None, None
-
-        image_info = dict({'format': pilimage.format, 'size': pilimage.size, 'mode': pilimage.mode})
-        imagelib.slogger.info(image_info)
-
-        # assign image size and channel
-        (width, height) = pilimage.size
-        channel = len(pilimage.getbands())
-
-        # resize image when both w/h are not 0
-        if resize_width != 0 and resize_height != 0:
-            (height, width) = (resize_height, resize_width)
-            pilimage = pilimage.resize((resize_width, resize_height))
-
-        # Modes: https://pillow.readthedocs.io/en/stable/handbook/concepts.html#modes
-        if pilimage.mode == 'RGBA':
-            pass
-        else:
-            pilimage = pilimage.convert('RGBA')
-
-        # convert to ndarray
-        buf = np.array(pilimage)
-        if buf is None:
-            imagelib.slogger.error('convert image fail!!!')
-            return 0, 0, 0, None, None
-
-        return width, height, 4, image_info, buf.tobytes()
+        return imagelib._im2buf(file, 'RGBA', resize_width, resize_height, fast)
 
     @staticmethod
-    def im2rgb888(file: str, resize_width: int = 0, resize_height: int = 0):
+    def im2rgb888(file: str, resize_width: int = 0, resize_height: int = 0, fast: bool = False):
         """
         convert image (jpg,bmp...etc) to rgb888.
 
@@ -523,6 +798,8 @@ class imagelib:
             resize width, resize when both w/h are not 0
         resize_height : int
             resize height, resize when both w/h are not 0
+        fast : bool
+            fast downscale, see pildraft
 
         Returns
         -------
@@ -534,6 +811,14 @@ class imagelib:
             - buf (bytes): image rgb888 data
         """
 
+        return imagelib._im2buf(file, 'RGB', resize_width, resize_height, fast)
+
+    @staticmethod
+    def _im2buf(file: str, mode: str, resize_width: int, resize_height: int, fast: bool):
+        """
+        convert image to buffer of mode ('RGB' or 'RGBA'), image file is closed when done
+        """
+
         # get image info
         pilimage = imagelib.pilopen(file)
 
@@ -541,34 +826,38 @@ class imagelib:
             imagelib.slogger.error('pilimage is None!!!')
             return 0, 0, 0, None, None
 
-        image_info = dict({'format': pilimage.format, 'size': pilimage.size, 'mode': pilimage.mode})
-        imagelib.slogger.info(image_info)
+        with pilimage:
+            image_info = dict({'format': pilimage.format, 'size': pilimage.size, 'mode': pilimage.mode})
+            imagelib.slogger.info(image_info)
 
-        # assign image size and channel
-        (width, height) = pilimage.size
-        channel = len(pilimage.getbands())
+            # assign image size
+            (width, height) = pilimage.size
 
-        # resize image when both w/h are not 0
-        if resize_width != 0 and resize_height != 0:
-            (height, width) = (resize_height, resize_width)
-            pilimage = pilimage.resize((resize_width, resize_height))
+            # resize image when both w/h are not 0
+            if resize_width != 0 and resize_height != 0:
+                (height, width) = (resize_height, resize_width)
+                if fast:
+                    imagelib.pildraft(pilimage, resize_width, resize_height)
+                    image = pilimage.resize((resize_width, resize_height), reducing_gap=PIL_REDUCING_GAP)
+                else:
+                    image = pilimage.resize((resize_width, resize_height))
+            else:
+                image = pilimage
 
-        # Modes: https://pillow.readthedocs.io/en/stable/handbook/concepts.html#modes
-        if pilimage.mode == 'RGB':
-            pass
-        else:
-            pilimage = pilimage.convert('RGB')
+            # Modes: https://pillow.readthedocs.io/en/stable/handbook/concepts.html#modes
+            if image.mode != mode:
+                image = image.convert(mode)
 
-        # convert to ndarray
-        buf = np.array(pilimage)
-        if buf is None:
-            imagelib.slogger.error('convert image fail!!!')
-            return 0, 0, 0, None, None
+            # convert to ndarray
+            buf = np.array(image)
+            if buf is None:
+                imagelib.slogger.error('convert image fail!!!')
+                return 0, 0, 0, None, None
 
-        return width, height, 3, image_info, buf.tobytes()
+        return width, height, len(mode), image_info, buf.tobytes()
 
     @staticmethod
-    def im2rgb565(file: str, resize_width: int = 0, resize_height: int = 0):
+    def im2rgb565(file: str, resize_width: int = 0, resize_height: int = 0, fast: bool = False):
         """
         convert image (jpg,bmp...etc) to rgb565.
 
@@ -580,6 +869,8 @@ class imagelib:
             resize width, resize when both w/h are not 0
         resize_height : int
             resize height, resize when both w/h are not 0
+        fast : bool
+            fast downscale, see pildraft
 
         Returns
         -------
@@ -592,7 +883,7 @@ class imagelib:
         """
 
         # get RGB888 first
-        width, height, _, image_info, buf888 = imagelib.im2rgb888(file, resize_width, resize_height)
+        width, height, _, image_info, buf888 = imagelib.im2rgb888(file, resize_width, resize_height, fast)
 
         # convert to ndarray
         rgb888 = np.frombuffer(buf888, dtype=np.uint8).reshape(height, width, 3)
@@ -632,7 +923,7 @@ class imagelib:
                 buf = Image.open(img_name)
             except FileNotFoundError as e:
                 imagelib.slogger.error('FileNotFoundError: {}'.format(e))
-            except UnidentifiedImageError as e:
+            except Image.UnidentifiedImageError as e:
                 imagelib.slogger.error('UnidentifiedImageError: {}'.format(e))
             except ValueError as e:
                 imagelib.slogger.error('ValueError: {}'.format(e))
@@ -641,6 +932,35 @@ class imagelib:
 
         return buf
 
+    @staticmethod
+    def pildraft(pilimage, width: int, height: int):
+        """
+        let jpeg decoder scale down by 1/2, 1/4 or 1/8 (DCT domain) while keeping size >= (width, height).
+
+        must be called before image data is loaded, it does nothing for other formats.
+
+        Parameters
+        ----------
+        pilimage : PIL.Image.Image
+            pil image object (not loaded yet)
+        width : int
+            smallest width needed
+        height : int
+            smallest height needed
+
+        Returns
+        -------
+        tuple
+            decoded size
+        """
+
+        try:
+            pilimage.draft(None, (width, height))
+        except ValueError as e:
+            imagelib.slogger.error('ValueError: {}'.format(e))
+
+        return pilimage.size
+
     @staticmethod
     def pilresize(image: np.ndarray, width: int = 0, height: int = 0):
         """
@@ -732,73 +1052,867 @@ class imagelib:
         return np.array(crop)
 
     @staticmethod
-    def rgb8882yuv(rgb):
+    def rgb8882yuv(rgb, out: np.ndarray = None):
         """
         reference: https://gist.github.com/Quasimondo/c3590226c924a06b276d606f4f189639
         input is a RGB numpy array with shape (height,width,3), can be uint,int, float or double,
         values expected in the range 0..255
         output is a double YUV numpy array with shape (height,width,3), values in the range 0..255
+        out is an optional preallocated C-contiguous double array with the same shape
         """
-        m = np.array([[0.29900, -0.16874, 0.50000],
-                      [0.58700, -0.33126, -0.41869],
-                      [0.11400, 0.50000, -0.08131]])
-
-        yuv = np.dot(rgb, m)
+        yuv = np.dot(rgb, RGB2YUV, out=out)
         yuv[:, :, 1:] += 128.0
         return yuv
 
     @staticmethod
-    def yuv2rgb888(yuv):
+    def yuv2rgb888(yuv, out: np.ndarray = None):
         """
         reference: https://gist.github.com/Quasimondo/c3590226c924a06b276d606f4f189639
         input is an YUV numpy array with shape (height,width,3) can be uint,int, float or double,
         values expected in the range 0..255
         output is a double RGB numpy array with shape (height,width,3), values in the range 0..255
+        out is an optional preallocated C-contiguous double array with the same shape
+        """
+        rgb = np.dot(yuv, YUV2RGB, out=out)
+        rgb += YUV2RGB_OFFSET
+        return rgb
+
+    # region [batch]
+    @staticmethod
+    def convert_batch(frames, conversion: str, width: int = 0, height: int = 0, chunk: int = 0,
+                      max_bytes: int = 0, out: np.ndarray = None):
+        """
+        convert N frames in one vectorized pass per chunk.
+
+        Parameters
+        ----------
+        frames : bytes, bytearray or np.ndarray
+            (N, H, W, C) frame stack, or contiguous multi-frame buffer (width/height are required)
+        conversion : str
+            converter name, see BATCH_CONVERSIONS ('rgb8882rgb565', 'rgb5652rgb888', ...)
+        width : int
+            width of frame, required for bytes input
+        height : int
+            height of frame, required for bytes input
+        chunk : int
+            frames per chunk, 0 means decided by max_bytes (or all frames if max_bytes is 0 too)
+        max_bytes : int
+            working memory cap per chunk (input + output + temporary)
+        out : np.ndarray
+            preallocated (N, H, W, C) output, None to allocate new one
+
+        Returns
+        -------
+        np.ndarray
+            converted (N, H, W, C) frames
+        """
+
+        prepared = imagelib._batch_prepare(frames, conversion, width, height, chunk, max_bytes)
+        if prepared is None:
+            return None
+        src, spec, chunk = prepared
+        _, channel_out, dtype_out, _, kernel = spec
+
+        dst = out
+        if dst is None:
+            dst = np.empty(src.shape[:3] + (channel_out,), dtype=dtype_out)
+        else:
+            try:
+                imagelib._check_out(dst, src.shape[:3] + (channel_out,), dtype_out)
+            except ValueError as e:
+                imagelib.slogger.error('ValueError: {}'.format(e))
+                return None
+        for start in range(0, len(src), chunk):
+            kernel(np.ascontiguousarray(src[start:start + chunk]), dst[start:start + chunk])
+
+        return dst
+
+    @staticmethod
+    def convert_batch_iter(frames, conversion: str, width: int = 0, height: int = 0, chunk: int = 0,
+                           max_bytes: int = 0):
+        """
+        convert N frames chunk by chunk, only one chunk of output is alive at a time.
+
+        parameters are the same as convert_batch.
+
+        Yields
+        ------
+        tuple : a tuple containing:
+            - start (int): index of first frame in chunk
+            - frames (np.ndarray): converted frames of chunk
+        """
+
+        prepared = imagelib._batch_prepare(frames, conversion, width, height, chunk, max_bytes)
+        if prepared is None:
+            return
+        src, spec, chunk = prepared
+        _, channel_out, dtype_out, _, kernel = spec
+
+        for start in range(0, len(src), chunk):
+            part = np.ascontiguousarray(src[start:start + chunk])
+            dst = np.empty(part.shape[:3] + (channel_out,), dtype=dtype_out)
+            kernel(part, dst)
+            yield start, dst
+
+    @staticmethod
+    def _batch_prepare(frames, conversion: str, width: int, height: int, chunk: int, max_bytes: int):
+        """
+        check conversion and convert frames to (N, H, W, C) ndarray, decide frames per chunk
+        """
+
+        spec = imagelib._batch_conversions().get(conversion)
+        if spec is None:
+            imagelib.slogger.error(f'unknown conversion: {conversion}!!!')
+            return None
+        channel_in, channel_out, dtype_out, scratch, _ = spec
+
+        try:
+            if isinstance(frames, np.ndarray):
+                if conversion == 'rgb5652rgb888' and frames.dtype == np.uint16:
+                    # (N, H, W) uint16 to (N, H, W, 2) uint8
+                    frames = np.ascontiguousarray(frames).view(np.uint8).reshape(frames.shape + (2,))
+                if frames.ndim == 3:
+                    # single frame
+                    frames = frames[np.newaxis]
+                src = frames.reshape(frames.shape[:3] + (channel_in,))
+            else:
+                src = np.frombuffer(frames, dtype=np.uint8).reshape(-1, height, width, channel_in)
+        except ValueError as e:
+            imagelib.slogger.error('ValueError: {}'.format(e))
+            return None
+
+        if chunk <= 0:
+            chunk = len(src)
+            if max_bytes > 0:
+                bpp = src.itemsize * channel_in + np.dtype(dtype_out).itemsize * channel_out + scratch
+                chunk = max_bytes // (src.shape[1] * src.shape[2] * bpp)
+        chunk = max(1, chunk)
+
+        return src, spec, chunk
+
+    @staticmethod
+    def _batch_image(frames: np.ndarray):
+        """
+        view (N, H, W, C) frames as one (N * H, W, C) image, so cv2 converts the stack in one call
+        """
+        return frames.reshape(-1, frames.shape[2], frames.shape[3])
+
+    @staticmethod
+    def _cvtcolor_kernel(code: int):
+        def kernel(src: np.ndarray, dst: np.ndarray):
+            cv2.cvtColor(imagelib._batch_image(src), code, dst=imagelib._batch_image(dst))
+        return kernel
+
+    @staticmethod
+    def _transform_kernel(m: np.ndarray):
+        def kernel(src: np.ndarray, dst: np.ndarray):
+            cv2.transform(imagelib._batch_image(src).astype(np.float64), m, dst=imagelib._batch_image(dst))
+        return kernel
+
+    @staticmethod
+    def _batch_conversions():
+        """
+        get BATCH_CONVERSIONS, built on first call
+        """
+        if not BATCH_CONVERSIONS:
+            # cv2 BGR565 is the same bit layout as rgb8882rgb565 (R in high bits, little-endian)
+            BATCH_CONVERSIONS.update({
+                'rgb8882rgb565': (3, 2, np.uint8, 0, imagelib._cvtcolor_kernel(cv2.COLOR_RGB2BGR565)),
+                'bgr8882rgb565': (3, 2, np.uint8, 0, imagelib._cvtcolor_kernel(cv2.COLOR_BGR2BGR565)),
+                'rgb5652rgb888': (2, 3, np.uint8, 0, imagelib._cvtcolor_kernel(cv2.COLOR_BGR5652RGB)),
+                'rgba2rgb888': (4, 3, np.uint8, 0, imagelib._cvtcolor_kernel(cv2.COLOR_RGBA2RGB)),
+                'rgb8882rgba': (3, 4, np.uint8, 0, imagelib._cvtcolor_kernel(cv2.COLOR_RGB2RGBA)),
+                'rgb8882yuv': (3, 3, np.float64, 24, imagelib._transform_kernel(
+                    np.hstack((np.transpose(RGB2YUV), [[0.0], [128.0], [128.0]])))),
+                'yuv2rgb888': (3, 3, np.float64, 24, imagelib._transform_kernel(
+                    np.hstack((np.transpose(YUV2RGB), np.reshape(YUV2RGB_OFFSET, (3, 1)))))),
+            })
+        return BATCH_CONVERSIONS
+
+    # endregion [batch]
+
+    # region [integer yuv]
+    @staticmethod
+    def yuv_coef(standard: str = 'bt601', full_range: bool = False):
+        """
+        get fixed-point (scaled by 2^YUV_SHIFT) coefficients of integer YUV engine.
+
+        Parameters
+        ----------
+        standard : str
+            'bt601' or 'bt709'
+        full_range : bool
+            full range (0..255) or limited range (Y 16..235, UV 16..240)
+
+        Returns
+        -------
+        tuple : a tuple containing:
+            - rgb2yuv (np.ndarray): (3, 3) int32, rows Y, U, V and columns R, G, B
+            - y_offset (int): 0 for full range, 16 for limited range
+            - yuv2rgb (np.ndarray): (3, 3) int32, rows R, G, B and columns Y, U, V
+        """
+
+        key = (standard, full_range)
+        coef = YUV_COEF.get(key)
+        if coef is not None:
+            return coef
+
+        kr, kb = YUV_STANDARDS[standard]
+        kg = 1.0 - kr - kb
+        m = np.array([[kr, kg, kb],
+                      [-kr / (2 * (1 - kb)), -kg / (2 * (1 - kb)), 0.5],
+                      [0.5, -kg / (2 * (1 - kr)), -kb / (2 * (1 - kr))]])
+        inv = np.linalg.inv(m)
+        y_offset = 0
+        if not full_range:
+            y_offset = 16
+            m = m * np.array([[219 / 255], [224 / 255], [224 / 255]])
+            inv = inv * np.array([255 / 219, 255 / 224, 255 / 224])
+
+        scale = 1 << YUV_SHIFT
+        coef = (np.round(m * scale).astype(np.int32), y_offset, np.round(inv * scale).astype(np.int32))
+        YUV_COEF[key] = coef
+        return coef
+
+    @staticmethod
+    def rgb8882nv12(rgb: np.ndarray, standard: str = 'bt601', full_range: bool = False, bgr: bool = False,
+                    out: np.ndarray = None):
+        """
+        RGB888 (or BGR888) to NV12 by integer YUV engine.
+
+        Parameters
+        ----------
+        rgb : np.ndarray
+            (height, width, 3) uint8 image, width and height must be even
+        standard : str
+            'bt601' or 'bt709'
+        full_range : bool
+            full range or limited range
+        bgr : bool
+            input is BGR888 (cv2 / vslib frame)
+        out : np.ndarray
+            preallocated (height * 3 / 2, width) uint8 output, None to allocate new one
+
+        Returns
+        -------
+        np.ndarray
+            (height * 3 / 2, width) uint8, Y plane then interleaved UV plane
+        """
+
+        return imagelib._rgb2yuv_int(rgb, 'nv12', standard, full_range, bgr, out)
+
+    @staticmethod
+    def rgb8882i420(rgb: np.ndarray, standard: str = 'bt601', full_range: bool = False, bgr: bool = False,
+                    out: np.ndarray = None):
+        """
+        RGB888 (or BGR888) to I420 by integer YUV engine.
+
+        parameters are the same as rgb8882nv12.
+
+        Returns
+        -------
+        np.ndarray
+            (height * 3 / 2, width) uint8, Y plane then U plane then V plane
+        """
+
+        return imagelib._rgb2yuv_int(rgb, 'i420', standard, full_range, bgr, out)
+
+    @staticmethod
+    def rgb8882yuyv(rgb: np.ndarray, standard: str = 'bt601', full_range: bool = False, bgr: bool = False,
+                    out: np.ndarray = None):
+        """
+        RGB888 (or BGR888) to packed YUYV (4:2:2) by integer YUV engine.
+
+        parameters are the same as rgb8882nv12, only width must be even.
+
+        Returns
+        -------
+        np.ndarray
+            (height, width, 2) uint8, Y0 U Y1 V ...
+        """
+
+        return imagelib._rgb2yuv_int(rgb, 'yuyv', standard, full_range, bgr, out)
+
+    @staticmethod
+    def nv122rgb888(nv12, width: int, height: int, standard: str = 'bt601', full_range: bool = False,
+                    bgr: bool = False, out: np.ndarray = None):
+        """
+        NV12 to RGB888 (or BGR888) by integer YUV engine.
+
+        Parameters
+        ----------
+        nv12 : bytes, bytearray or np.ndarray
+            nv12 image data
+        width : int
+            width of image
+        height : int
+            height of image
+        standard : str
+            'bt601' or 'bt709'
+        full_range : bool
+            full range or limited range
+        bgr : bool
+            output BGR888
+        out : np.ndarray
+            preallocated (height, width, 3) uint8 output, None to allocate new one
+
+        Returns
+        -------
+        np.ndarray
+            (height, width, 3) uint8 image
         """
-        m = np.array([[1.0, 1.0, 1.0],
-                      [-0.000007154783816076815, -0.3441331386566162, 1.7720025777816772],
-                      [1.4019975662231445, -0.7141380310058594, 0.00001542569043522235]])
 
-        rgb = np.dot(yuv, m)
-        rgb[:, :, 0] -= 179.45477266423404
-        rgb[:, :, 1] += 135.45870971679688
-        rgb[:, :, 2] -= 226.8183044444304
+        return imagelib._yuv2rgb_int(nv12, width, height, 'nv12', standard, full_range, bgr, out)
+
+    @staticmethod
+    def i4202rgb888(i420, width: int, height: int, standard: str = 'bt601', full_range: bool = False,
+                    bgr: bool = False, out: np.ndarray = None):
+        """
+        I420 to RGB888 (or BGR888) by integer YUV engine.
+
+        parameters are the same as nv122rgb888.
+        """
+
+        return imagelib._yuv2rgb_int(i420, width, height, 'i420', standard, full_range, bgr, out)
+
+    @staticmethod
+    def yuyv2rgb888(yuyv, width: int, height: int, standard: str = 'bt601', full_range: bool = False,
+                    bgr: bool = False, out: np.ndarray = None):
+        """
+        packed YUYV to RGB888 (or BGR888) by integer YUV engine.
+
+        parameters are the same as nv122rgb888.
+        """
+
+        return imagelib._yuv2rgb_int(yuyv, width, height, 'yuyv', standard, full_range, bgr, out)
+
+    @staticmethod
+    def _yuv_planes(buf: np.ndarray, width: int, height: int, fmt: str):
+        """
+        views of yuv buffer: (Y, U, V) for i420, (Y, UV) for nv12, (YUYV,) for yuyv
+        """
+        if fmt == 'yuyv':
+            return buf.reshape(height, width, 2),
+        flat = buf.reshape(-1)
+        y = flat[:width * height].reshape(height, width)
+        if fmt == 'nv12':
+            return y, flat[width * height:].reshape(height // 2, width // 2, 2)
+        quarter = width * height // 4
+        u = flat[width * height:width * height + quarter].reshape(height // 2, width // 2)
+        v = flat[width * height + quarter:].reshape(height // 2, width // 2)
+        return y, u, v
+
+    @staticmethod
+    def _yuv_check(width: int, height: int, fmt: str):
+        if fmt not in ('nv12', 'i420', 'yuyv'):
+            raise ValueError(f'unknown yuv format: {fmt}')
+        if width % 2 or (fmt != 'yuyv' and height % 2):
+            raise ValueError(f'{fmt} needs even size, got {width}x{height}')
+        return (height, width, 2) if fmt == 'yuyv' else (height * 3 // 2, width)
+
+    @staticmethod
+    def _rgb2yuv_int(rgb: np.ndarray, fmt: str, standard: str, full_range: bool, bgr: bool, out: np.ndarray):
+        yuv = None
+
+        try:
+            (height, width) = rgb.shape[:2]
+            shape = imagelib._yuv_check(width, height, fmt)
+            imagelib._check_out(out, shape)
+            yuv = np.empty(shape, dtype=np.uint8) if out is None else out
+            planes = imagelib._yuv_planes(yuv, width, height, fmt)
+            m, y_offset, _ = imagelib.yuv_coef(standard, full_range)
+            order = (2, 1, 0) if bgr else (0, 1, 2)
+            half = 1 << (YUV_SHIFT - 1)
+
+            # 4:2:0 sums 2x2 rgb block, 4:2:2 sums 2x1, chroma of the sum is the sum of chroma (linear)
+            sub = 1 if fmt == 'yuyv' else 2
+            c_shift = YUV_SHIFT + sub
+            c_round = (128 << c_shift) + (1 << (c_shift - 1))
+
+            for r0 in range(0, height, YUV_ROWS):
+                r1 = min(r0 + YUV_ROWS, height)
+                stripe = rgb[r0:r1]
+                r, g, b = (stripe[..., i].astype(np.int32) for i in order)
+
+                y = m[0, 0] * r + m[0, 1] * g + m[0, 2] * b
+                y += (y_offset << YUV_SHIFT) + half
+                y >>= YUV_SHIFT
+
+                if sub == 2:
+                    r = r[0::2, 0::2] + r[1::2, 0::2] + r[0::2, 1::2] + r[1::2, 1::2]
+                    g = g[0::2, 0::2] + g[1::2, 0::2] + g[0::2, 1::2] + g[1::2, 1::2]
+                    b = b[0::2, 0::2] + b[1::2, 0::2] + b[0::2, 1::2] + b[1::2, 1::2]
+                else:
+                    r, g, b = r[:, 0::2] + r[:, 1::2], g[:, 0::2] + g[:, 1::2], b[:, 0::2] + b[:, 1::2]
+                u = (m[1, 0] * r + m[1, 1] * g + m[1, 2] * b + c_round) >> c_shift
+                v = (m[2, 0] * r + m[2, 1] * g + m[2, 2] * b + c_round) >> c_shift
+                np.clip(y, 0, 255, out=y)
+                np.clip(u, 0, 255, out=u)
+                np.clip(v, 0, 255, out=v)
+
+                if fmt == 'yuyv':
+                    (packed,) = planes
+                    packed[r0:r1, :, 0] = y
+                    packed[r0:r1, 0::2, 1] = u
+                    packed[r0:r1, 1::2, 1] = v
+                elif fmt == 'nv12':
+                    planes[0][r0:r1] = y
+                    planes[1][r0 // 2:r1 // 2, :, 0] = u
+                    planes[1][r0 // 2:r1 // 2, :, 1] = v
+                else:
+                    planes[0][r0:r1] = y
+                    planes[1][r0 // 2:r1 // 2] = u
+                    planes[2][r0 // 2:r1 // 2] = v
+        except (ValueError, KeyError) as e:
+            imagelib.slogger.error('{}: {}'.format(type(e).__name__, e))
+            yuv = None
+
+        return yuv
+
+    @staticmethod
+    def _yuv2rgb_int(buf, width: int, height: int, fmt: str, standard: str, full_range: bool, bgr: bool,
+                     out: np.ndarray):
+        rgb = None
+
+        try:
+            shape = imagelib._yuv_check(width, height, fmt)
+            if not isinstance(buf, np.ndarray):
+                buf = np.frombuffer(buf, dtype=np.uint8)
+            planes = imagelib._yuv_planes(buf[:shape[0]] if buf.ndim > 1 else buf[:int(np.prod(shape))],
+                                          width, height, fmt)
+            imagelib._check_out(out, (height, width, 3))
+            rgb = np.empty((height, width, 3), dtype=np.uint8) if out is None else out
+            _, y_offset, m = imagelib.yuv_coef(standard, full_range)
+            order = (2, 1, 0) if bgr else (0, 1, 2)
+            half = 1 << (YUV_SHIFT - 1)
+
+            for r0 in range(0, height, YUV_ROWS):
+                r1 = min(r0 + YUV_ROWS, height)
+                n = r1 - r0
+                if fmt == 'yuyv':
+                    packed = planes[0][r0:r1]
+                    y = packed[..., 0].astype(np.int32).reshape(n, width // 2, 2)
+                    u = packed[:, 0::2, 1].astype(np.int32)[:, :, np.newaxis]
+                    v = packed[:, 1::2, 1].astype(np.int32)[:, :, np.newaxis]
+                    dst = rgb[r0:r1].reshape(n, width // 2, 2, 3)
+                else:
+                    y = planes[0][r0:r1].astype(np.int32).reshape(n // 2, 2, width // 2, 2)
+                    if fmt == 'nv12':
+                        uv = planes[1][r0 // 2:r1 // 2]
+                        u, v = uv[..., 0], uv[..., 1]
+                    else:
+                        u, v = planes[1][r0 // 2:r1 // 2], planes[2][r0 // 2:r1 // 2]
+                    u = u.astype(np.int32)[:, np.newaxis, :, np.newaxis]
+                    v = v.astype(np.int32)[:, np.newaxis, :, np.newaxis]
+                    dst = rgb[r0:r1].reshape(n // 2, 2, width // 2, 2, 3)
+
+                # chroma is computed at its own resolution and broadcast to the pixels sharing it
+                y -= y_offset
+                y *= m[0, 0]
+                y += half
+                u -= 128
+                v -= 128
+                for channel, i in zip(range(3), order):
+                    c = m[channel, 1] * u + m[channel, 2] * v
+                    dst[..., i] = np.clip((y + c) >> YUV_SHIFT, 0, 255)
+        except (ValueError, KeyError) as e:
+            imagelib.slogger.error('{}: {}'.format(type(e).__name__, e))
+            rgb = None
+
         return rgb
 
+    # endregion [integer yuv]
+
+    # region [stream]
     @staticmethod
-    def folder_crop_resize(folder: str, prefix_name: str, w_resize: int, h_resize: int):
+    def im2stream(file: str, target, fmt: str = 'rgb565', rows: int = 256):
         """
-        test only, not handle exception.
+        convert image (jpg,bmp...etc) stripe by stripe and write each stripe to target,
+        peak memory is a few stripes of rows instead of 3 full size buffers of im2*.
+
+        uncompressed images (bmp, ppm/pgm, uncompressed tiff) are read through np.memmap,
+        other formats (jpeg, png...) are decoded once by PIL into a memory-mapped temporary file (in TMPDIR,
+        file pages the kernel can write back instead of process memory) and then converted stripe by stripe.
+        A target file is written as target + '.tmp' and renamed when complete, removed on error.
+
+        Parameters
+        ----------
+        file : str
+            file name
+        target : str, np.ndarray or callable
+            output file name, np.ndarray (e.g. np.memmap) written as flat uint8,
+            or callable(offset: int, data: np.ndarray) called per written block
+        fmt : str
+            output format: rgb888, rgba, rgb565, nv12, i420 or yuyv
+        rows : int
+            rows per stripe (rounded up to even for yuv)
+
+        Returns
+        -------
+        tuple : a tuple containing:
+            - width (int): image width
+            - height (int): image height
+            - image_info (dict): image info (format, size, mode)
+            - size (int): bytes written
+        """
+
+        if fmt not in STREAM_FORMATS:
+            imagelib.slogger.error(f'unknown format: {fmt}!!!')
+            return 0, 0, None, 0
+
+        pilimage = imagelib.pilopen(file)
+        if pilimage is None:
+            imagelib.slogger.error('pilimage is None!!!')
+            return 0, 0, None, 0
+
+        with pilimage:
+            image_info = dict({'format': pilimage.format, 'size': pilimage.size, 'mode': pilimage.mode})
+            (width, height) = pilimage.size
+            size = int(width * height * STREAM_FORMATS[fmt])
+            rows = max(2, rows + rows % 2)
+
+            writer = None
+            stripes = None
+            ok = False
+            try:
+                if fmt in ('nv12', 'i420', 'yuyv'):
+                    imagelib._yuv_check(width, height, fmt)
+                writer = imagelib._stream_writer(target, size)
+                stripes = imagelib._im_stripes(pilimage, rows, fmt == 'rgba')
+                for r0, stripe in stripes:
+                    imagelib._stream_stripe(stripe, r0, width, height, fmt, writer)
+                ok = True
+            except (IOError, ValueError) as e:
+                imagelib.slogger.error('{}: {}'.format(type(e).__name__, e))
+            finally:
+                if stripes is not None:
+                    stripes.close()
+                if writer is not None:
+                    writer(None, ok)
+
+        return width, height, image_info, size if ok else 0
+
+    @staticmethod
+    def _im_stripes(pilimage, rows: int, alpha: bool):
+        """
+        yield (first row, (rows, width, 3 or 4) uint8 RGB/RGBA stripe) of image
+        """
+        (width, height) = pilimage.size
+        channel = 4 if alpha else 3
+        tile = pilimage.tile[0] if len(pilimage.tile) == 1 else None
+        # raw tile args: rawmode or (rawmode, stride, orientation)
+        args = tile[3] if tile and tile[0] == 'raw' else None
+        args = (args,) if isinstance(args, str) else tuple(args or ())
+        rawmode, stride, orientation = (args + (None, 0, 1)[len(args):])[:3]
+
+        if rawmode in STREAM_RAWMODES and tile[1] == (0, 0, width, height) and getattr(pilimage, 'filename', None):
+            # uncompressed: map pixel rows of file, nothing is decoded
+            bpp, index, alpha_index = STREAM_RAWMODES[rawmode]
+            stride = stride or width * bpp
+            mm = np.memmap(pilimage.filename, dtype=np.uint8, mode='r', offset=tile[2], shape=(height, stride))
+            pixels = mm[:, :width * bpp].reshape(height, width, bpp)
+            if orientation < 0:
+                # bottom-up rows (bmp)
+                pixels = pixels[::-1]
+            for r0 in range(0, height, rows):
+                raw = pixels[r0:r0 + rows]
+                stripe = np.empty(raw.shape[:2] + (channel,), dtype=np.uint8)
+                stripe[..., :3] = raw[..., index]
+                if alpha:
+                    stripe[..., 3] = raw[..., alpha_index] if alpha_index is not None else 0xFF
+                yield r0, stripe
+            del pixels, mm
+        else:
+            # compressed: decode once into a memory-mapped temporary file, convert stripe by stripe
+            import tempfile
+
+            mode = 'RGBA' if alpha else 'RGB'
+            spill = STREAM_SPILLMODES.get(pilimage.mode)
+            with tempfile.TemporaryFile(prefix='im2stream_') as f:
+                if spill is not None:
+                    bpp, rawmode = spill
+                    pixels = np.memmap(f, dtype=np.uint8, mode='w+', shape=(height, width * bpp))
+                    # load() decodes into an image of its mode and size that is already there
+                    pilimage.im = Image.frombuffer(pilimage.mode, (width, height), pixels, 'raw', rawmode, 0, 1).im
+                pilimage.load()
+                try:
+                    for r0 in range(0, height, rows):
+                        crop = pilimage.crop((0, r0, width, min(r0 + rows, height)))
+                        yield r0, np.asarray(crop if crop.mode == mode else crop.convert(mode))
+                finally:
+                    # unmap before the temporary file is removed
+                    pilimage.im = None
+                    pixels = None
+
+    @staticmethod
+    def _stream_stripe(stripe: np.ndarray, r0: int, width: int, height: int, fmt: str, writer):
         """
+        convert one RGB/RGBA stripe and write it (planes at their own offsets for planar yuv)
+        """
+        n = stripe.shape[0]
+        if fmt in ('rgb888', 'rgba'):
+            writer(r0 * width * stripe.shape[2], stripe)
+        elif fmt == 'rgb565':
+            writer(r0 * width * 2, imagelib.rgb8882rgb565(stripe, out=np.empty((n, width, 2), np.uint8)))
+        elif fmt == 'yuyv':
+            writer(r0 * width * 2, imagelib.rgb8882yuyv(stripe))
+        else:
+            planes = imagelib._yuv_planes(imagelib._rgb2yuv_int(stripe, fmt, 'bt601', False, False, None),
+                                          width, n, fmt)
+            writer(r0 * width, planes[0])
+            chroma = width * height
+            if fmt == 'nv12':
+                writer(chroma + r0 // 2 * width, planes[1])
+            else:
+                quarter = width * height // 4
+                writer(chroma + r0 // 2 * (width // 2), planes[1])
+                writer(chroma + quarter + r0 // 2 * (width // 2), planes[2])
+
+    @staticmethod
+    def _stream_writer(target, size: int):
+        """
+        get writer(offset, data) for target, writer(None, ok) closes it (a file target is written to
+        target + '.tmp', renamed to target if ok, removed if not)
+        """
+        if isinstance(target, str):
+            import os
+
+            loglib.create_parent_folder(os.path.abspath(target))
+            partial = target + '.tmp'
+            f = open(partial, 'wb')
+            f.truncate(size)
+
+            def writer(offset, data):
+                if offset is None:
+                    f.close()
+                    if data:
+                        os.replace(partial, target)
+                    else:
+                        os.remove(partial)
+                    return
+                f.seek(offset)
+                f.write(np.ascontiguousarray(data))
+            return writer
+
+        if isinstance(target, np.ndarray):
+            if target.dtype != np.uint8 or target.size < size or not target.flags.c_contiguous:
+                raise ValueError(f'target must be C-contiguous uint8 with at least {size} bytes')
+            flat = target.reshape(-1)
+
+            def writer(offset, data):
+                if offset is None:
+                    if isinstance(target, np.memmap):
+                        target.flush()
+                    return
+                flat[offset:offset + data.size] = data.reshape(-1)
+            return writer
+
+        if callable(target):
+            def writer(offset, data):
+                if offset is not None:
+                    target(offset, data)
+            return writer
+
+        raise ValueError(f'unknown target: {type(target).__name__}')
+
+    # endregion [stream]
+
+    @staticmethod
+    def folder_crop_resize(folder: str, prefix_name: str, w_resize: int, h_resize: int, workers: int = 1,
+                           check: str = 'mtime', fast: bool = False):
+        """
+        center crop and resize all images in folder (and sub folders) to folder/convert/ (jpg and rgb565 raw).
+
+        converted files are recorded in a manifest in convert folder, so each source keeps its output name
+        and sources not changed since last run are skipped. The manifest is saved every MANIFEST_BATCH
+        converted files, an interrupted run only converts again what was not saved.
+
+        Parameters
+        ----------
+        folder : str
+            source folder
+        prefix_name : str
+            prefix of output file name
+        w_resize : int
+            resize width
+        h_resize : int
+            resize height
+        workers : int
+            number of worker processes, 1 to convert in current process
+        check : str
+            how to tell a source is up to date, 'mtime' (mtime and size), 'hash' (content sha1, only hashed
+            when mtime or size changed) or 'none' (always convert)
+        fast : bool
+            fast downscale, see file_crop_resize
+
+        Returns
+        -------
+        dict
+            summary: total, converted, skipped, failed, failures [(file, error)], seconds, fps
+        """
+        import json
+        import os
+        import pathlib
+        import time
+
+        time_start = time.perf_counter()
+
         # create folder if not exist
         convert_folder = f'{folder}/convert/'
-        import os
         if not os.path.isdir(convert_folder):
-            import pathlib
             pathlib.Path(convert_folder).mkdir(parents=True, exist_ok=True)
 
-        files = []
+        # load manifest: {relative source path: {'index', 'mtime', 'size', 'sha1'}}
+        manifest_file = f'{convert_folder}.{prefix_name}_{w_resize}x{h_resize}.manifest.json'
+        manifest = {}
+        if os.path.isfile(manifest_file):
+            try:
+                with open(manifest_file) as f:
+                    manifest = json.load(f)
+            except (IOError, ValueError) as e:
+                imagelib.slogger.error(f'ignore broken manifest ({e})')
 
-        # get all files
-        import os
+        # get all files, skip convert folder itself
+        files = []
+        convert_real = os.path.realpath(convert_folder)
         for r, d, f in os.walk(folder):
+            d[:] = [x for x in d if os.path.realpath(os.path.join(r, x)) != convert_real]
             # append full path with file name
-            full_paths = [os.path.join(r, file) for file in f]
-            files.extend(full_paths)
+            files.extend(os.path.join(r, file) for file in f)
+        files.sort()
+
+        # decide which files to convert, new files get next index so existing output names are kept
+        next_index = max((entry['index'] for entry in manifest.values()), default=0) + 1
+        jobs = []
+        skipped = 0
+        for file in files:
+            key = os.path.relpath(file, folder)
+            st = os.stat(file)
+            entry = manifest.get(key)
+            if entry is None:
+                entry = {'index': next_index}
+                next_index += 1
+            file_new = f'{convert_folder}{prefix_name}_{w_resize}x{h_resize}_{entry["index"]:03}'
+            sha1 = None
+            if check == 'hash':
+                unchanged = entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime_ns
+                sha1 = entry['sha1'] if unchanged and entry.get('sha1') else imagelib._file_sha1(file)
+            up_to_date = imagelib._is_up_to_date(entry, st, sha1, file_new, check)
+            entry = {'index': entry['index'], 'mtime': st.st_mtime_ns, 'size': st.st_size,
+                     'sha1': sha1 or entry.get('sha1')}
+            if up_to_date:
+                manifest[key] = entry
+                skipped += 1
+            else:
+                jobs.append((key, entry, file, file_new))
+
+        # crop/resize each file, results in job order as they complete
+        failures = []
+        args = [(file, file_new, w_resize, h_resize, fast) for _, _, file, file_new in jobs]
+        executor = None
+        if workers > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+            futures = [executor.submit(imagelib._file_crop_resize_job, arg) for arg in args]
+            errors = (future.result() for future in futures)
+        else:
+            futures = []
+            errors = map(imagelib._file_crop_resize_job, args)
 
-        # crop/resize each file
-        for i, file in enumerate(files):
-            file_new = f'{convert_folder}{prefix_name}_{w_resize}x{h_resize}_{(i + 1):03}'
-            imagelib.file_crop_resize(file, file_new, w_resize, h_resize)
+        try:
+            for done, ((key, entry, file, _), error) in enumerate(zip(jobs, errors), 1):
+                if error:
+                    failures.append((file, error))
+                    manifest.pop(key, None)
+                else:
+                    manifest[key] = entry
+                if done % MANIFEST_BATCH == 0:
+                    imagelib._save_manifest(manifest_file, manifest)
+        finally:
+            try:
+                if executor is not None:
+                    # python 3.8 has no shutdown(cancel_futures=True), jobs not started yet are cancelled here
+                    for future in futures:
+                        future.cancel()
+                    executor.shutdown(wait=True)
+            finally:
+                imagelib._save_manifest(manifest_file, manifest)
+
+        seconds = time.perf_counter() - time_start
+        converted = len(jobs) - len(failures)
+        summary = {'total': len(files), 'converted': converted, 'skipped': skipped, 'failed': len(failures),
+                   'failures': failures, 'seconds': seconds, 'fps': converted / seconds if seconds else 0.0}
+        imagelib.slogger.info(f'total: {len(files)}, converted: {converted}, skipped: {skipped}, '
+                              f'failed: {len(failures)}, {seconds:0.3f} s, {summary["fps"]:0.1f} files/s')
+        for file, error in failures:
+            imagelib.slogger.error(f'{file}: {error}')
+
+        return summary
 
     @staticmethod
-    def file_crop_resize(file: str, file_new: str, w_resize: int, h_resize: int):
+    def _save_manifest(manifest_file: str, manifest: dict):
         """
-        test only, not handle exception.
+        write manifest to a temporary file and replace the old one, an interrupted write keeps the old one
+        """
+        import json
+        import os
+
+        try:
+            with open(f'{manifest_file}.tmp', 'w') as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(f'{manifest_file}.tmp', manifest_file)
+        except IOError as e:
+            imagelib.slogger.error(f'Cannot write manifest ({e})..')
+
+    @staticmethod
+    def _is_up_to_date(entry: dict, st, sha1: str, file_new: str, check: str):
+        import os
+
+        if check == 'none' or 'size' not in entry or entry['size'] != st.st_size:
+            return False
+        if not os.path.isfile(f'{file_new}.jpg') or not os.path.isfile(f'{file_new}.raw'):
+            return False
+        if check == 'hash' and entry.get('sha1'):
+            return entry['sha1'] == sha1
+        return entry.get('mtime') == st.st_mtime_ns
+
+    @staticmethod
+    def _file_sha1(file: str):
+        import hashlib
+
+        sha1 = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        return sha1.hexdigest()
+
+    @staticmethod
+    def _file_crop_resize_job(args: tuple):
+        """
+        file_crop_resize for worker process, return error message or None
+        """
+        try:
+            if not imagelib.file_crop_resize(*args):
+                return 'write fail'
+        except Exception as e:
+            return f'{type(e).__name__}: {e}'
+        return None
+
+    @staticmethod
+    def file_crop_resize(file: str, file_new: str, w_resize: int, h_resize: int, fast: bool = False):
         """
-        w, h, c, image_info, rgb888 = imagelib.im2rgb888(file)
+        test only, not handle exception.
 
-        rgb888 = np.frombuffer(rgb888, dtype=np.uint8).reshape(h, w, 3)
+        fast decodes jpeg at the smallest 1/2^n scale still large enough for the center crop.
+        """
+        if fast:
+            with imagelib.pilopen(file) as pilimage:
+                imagelib.pildraft(pilimage, max(w_resize, h_resize), max(w_resize, h_resize))
+                rgb888 = np.asarray(pilimage.convert('RGB'))
+            (h, w) = rgb888.shape[:2]
+        else:
+            w, h, c, image_info, rgb888 = imagelib.im2rgb888(file)
+            rgb888 = np.frombuffer(rgb888, dtype=np.uint8).reshape(h, w, 3)
 
         if w > h:
             x = int((w - h) / 2)
@@ -812,8 +1926,269 @@ class imagelib:
             rgb888 = imagelib.cv2crop(rgb888, x, y, w, h)
 
         rgb888 = imagelib.cv2resize(rgb888, w_resize, h_resize)
-        cv2.imwrite(f'{file_new}.jpg', rgb888[:, :, ::-1])  # convert rgb888 to bgr888 for cv2 save image
+        ok = cv2.imwrite(f'{file_new}.jpg', rgb888[:, :, ::-1])  # convert rgb888 to bgr888 for cv2 save image
         rgb565 = imagelib.rgb8882rgb565(rgb888)
 
         from filelib import filelib
-        filelib.file_write_binary(rgb565, f'{file_new}.raw')
+        ret = filelib.file_write_binary(rgb565, f'{file_new}.raw')
+
+        return ret and ok
+
+
+class imagectx:
+    """
+    The conversion context, owns output buffers per conversion and resolution,
+    so steady-state conversion allocates nothing.
+
+    ps. returned np.ndarray is reused by the next call with the same conversion and resolution,
+    copy it if it must be kept.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+    def buffer(self, name: str, shape: tuple, dtype='uint8'):
+        """
+        get scratch buffer, allocate only when (name, shape, dtype) is new.
+
+        Parameters
+        ----------
+        name : str
+            buffer name (usually conversion name)
+        shape : tuple
+            buffer shape
+        dtype : type
+            buffer dtype
+
+        Returns
+        -------
+        np.ndarray
+            scratch buffer
+        """
+
+        key = (name, tuple(shape), np.dtype(dtype))
+        buf = self.buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers[key] = buf
+        return buf
+
+    def release(self):
+        self.buffers.clear()
+
+    def rgba2rgb888(self, rgba, width: int, height: int):
+        return imagelib.rgba2rgb888(rgba, width, height, out=self.buffer('rgba2rgb888', (height, width, 3)))
+
+    def rgb8882rgba(self, rgb888, width: int, height: int):
+        return imagelib.rgb8882rgba(rgb888, width, height, out=self.buffer('rgb8882rgba', (height, width, 4)))
+
+    def rgb5652rgb888(self, rgb565, width: int, height: int, byteorder: str = 'little'):
+        return imagelib._rgb565_decode(rgb565, width, height, 3, byteorder,
+                                       out=self.buffer('rgb5652rgb888', (height, width, 3)),
+                                       index=self.buffer('rgb565_index', (width * height,), np.intp))
+
+    def rgb5652rgba(self, rgb565, width: int, height: int, byteorder: str = 'little'):
+        return imagelib._rgb565_decode(rgb565, width, height, 4, byteorder,
+                                       out=self.buffer('rgb5652rgba', (height, width, 4)),
+                                       index=self.buffer('rgb565_index', (width * height,), np.intp))
+
+    def rgb8882rgb565(self, rgb888: np.ndarray):
+        return imagelib.rgb8882rgb565(rgb888, out=self.buffer('rgb8882rgb565', rgb888.shape[:2] + (2,)))
+
+    def bgr8882rgb565(self, bgr888: np.ndarray):
+        return imagelib.bgr8882rgb565(bgr888, out=self.buffer('bgr8882rgb565', bgr888.shape[:2] + (2,)))
+
+    def rgb8882yuv(self, rgb: np.ndarray):
+        return imagelib.rgb8882yuv(self.float64(rgb), out=self.buffer('rgb8882yuv', rgb.shape, np.float64))
+
+    def yuv2rgb888(self, yuv: np.ndarray):
+        return imagelib.yuv2rgb888(self.float64(yuv), out=self.buffer('yuv2rgb888', yuv.shape, np.float64))
+
+    def float64(self, image: np.ndarray):
+        """
+        np.dot() casts non double input to a new double array, cast it into scratch buffer instead
+        """
+        if image.dtype == np.float64:
+            return image
+        buf = self.buffer('float64', image.shape, np.float64)
+        np.copyto(buf, image)
+        return buf
+
+    def buf2rgba(self, buffer, width: int, height: int, channel: int):
+        if channel == 2:
+            return self.rgb5652rgba(buffer, width, height)
+        return imagelib.buf2rgba(buffer, width, height, channel, out=self.buffer('buf2rgba', (height, width, 4)))
+
+    def buf2rgb888(self, buffer, width: int, height: int, channel: int):
+        if channel == 2:
+            return self.rgb5652rgb888(buffer, width, height)
+        return imagelib.buf2rgb888(buffer, width, height, channel, out=self.buffer('buf2rgb888', (height, width, 3)))
+
+    def buf2rgb565(self, buffer, width: int, height: int, channel: int):
+        return imagelib.buf2rgb565(buffer, width, height, channel, out=self.buffer('buf2rgb565', (height, width, 2)))
+
+    def convert_batch(self, frames, conversion: str, width: int = 0, height: int = 0, chunk: int = 0,
+                      max_bytes: int = 0):
+        prepared = imagelib._batch_prepare(frames, conversion, width, height, chunk, max_bytes)
+        if prepared is None:
+            return None
+        src, (_, channel_out, dtype_out, _, _), chunk = prepared
+        out = self.buffer(conversion, src.shape[:3] + (channel_out,), dtype_out)
+        return imagelib.convert_batch(src, conversion, chunk=chunk, out=out)
+
+
+class imageindex:
+    """
+    The image metadata index, (width, height, channel, format, mode) per file.
+
+    entries are keyed by path and only trusted while mtime and size are unchanged,
+    new or changed files are read by header only (PIL opens lazily) and closed right away.
+    the index can be saved to and loaded from a json file, so warm runs do not open any image.
+    """
+
+    def __init__(self, index_file: str = None):
+        # {abs path: [mtime_ns, size, width, height, channel, format, mode]}, width 0 for non image
+        self.entries = {}
+        self.index_file = index_file
+        self.dirty = False
+        if index_file:
+            self.load(index_file)
+
+    def load(self, index_file: str):
+        import json
+        import os
+
+        if not os.path.isfile(index_file):
+            return False
+        try:
+            with open(index_file) as f:
+                self.entries = json.load(f)
+        except (IOError, ValueError) as e:
+            imagelib.slogger.error(f'ignore broken index ({e})')
+            return False
+        self.dirty = False
+        return True
+
+    def save(self, index_file: str = None):
+        """
+        save index to json file (write to temporary file then replace, never leaves a broken index)
+        """
+        import json
+        import os
+
+        index_file = index_file or self.index_file
+        if not index_file:
+            imagelib.slogger.error('index_file is None or empty!!!')
+            return False
+
+        loglib.create_parent_folder(os.path.abspath(index_file))
+        try:
+            with open(f'{index_file}.tmp', 'w') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(f'{index_file}.tmp', index_file)
+        except IOError as e:
+            imagelib.slogger.error(f'Cannot write index ({e})..')
+            return False
+        self.dirty = False
+        return True
+
+    def get(self, file: str, st=None):
+        """
+        get image info.
+
+        Parameters
+        ----------
+        file : str
+            file name
+        st : os.stat_result
+            stat of file if already known (from os.scandir)
+
+        Returns
+        -------
+        tuple : (width, height, channel, format, mode), None if file is not an image or not exist
+        """
+        import os
+
+        key = os.path.abspath(file)
+        try:
+            st = st or os.stat(key)
+        except OSError:
+            return None
+
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+            entry = [st.st_mtime_ns, st.st_size] + imageindex.read_header(key)
+            self.entries[key] = entry
+            self.dirty = True
+
+        return tuple(entry[2:]) if entry[2] else None
+
+    def scan(self, folder: str, recursive: bool = True):
+        """
+        bulk populate index by os.scandir (stat comes with directory entry).
+
+        Parameters
+        ----------
+        folder : str
+            folder to scan
+        recursive : bool
+            scan sub folders
+
+        Returns
+        -------
+        dict
+            {abs path: (width, height, channel, format, mode)} of images in folder
+        """
+        import os
+
+        infos = {}
+        folders = [os.path.abspath(folder)]
+        while folders:
+            try:
+                it = os.scandir(folders.pop())
+            except OSError as e:
+                imagelib.slogger.error(f'OSError: {e}')
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            folders.append(entry.path)
+                    elif entry.is_file():
+                        info = self.get(entry.path, entry.stat())
+                        if info:
+                            infos[entry.path] = info
+        return infos
+
+    def prune(self):
+        """
+        remove entries of files which do not exist anymore
+        """
+        import os
+
+        removed = [key for key in self.entries if not os.path.exists(key)]
+        for key in removed:
+            del self.entries[key]
+        self.dirty = self.dirty or bool(removed)
+        return len(removed)
+
+    @staticmethod
+    def read_header(file: str):
+        """
+        read [width, height, channel, format, mode] from image header, [0, 0, 0, None, None] if not an image
+        """
+        try:
+            with Image.open(file) as pilimage:
+                return [pilimage.size[0], pilimage.size[1], len(pilimage.getbands()), pilimage.format,
+                        pilimage.mode]
+        except (OSError, ValueError, Image.UnidentifiedImageError):
+            return [0, 0, 0, None, None]
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.index_file and self.dirty:
+            self.save()
+    # endregion [with]
@@ -1,16 +1,17 @@
-import datetime
-
-import pylink
+from __future__ import annotations
 
+from lazylib import lazylib
 from loglib import loglib
 
+# pylink is imported on first use
+pylink = lazylib.load('pylink')
+
 
 class pyjlink:
 
     def __init__(self) -> None:
         super().__init__()
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')
-        self.logger = loglib(f'{__name__}_time{timestamp}')
+        self.logger = loglib(__name__, context=f'pyjlink@{id(self):x}')
 
     def init(self, dll_path: str = None):
         """
@@ -49,8 +50,9 @@ class pyjlink:
     def deinit(self, jlink: pylink.JLink):
         if jlink:
             jlink.close()
+        self.logger.close()
 
-    def connect(self, jlink: pylink.JLink, serial_no: int = None, interface=pylink.enums.JLinkInterfaces.SWD,
+    def connect(self, jlink: pylink.JLink, serial_no: int = None, interface=None,
                 device_xml: str = None, chip_name: str = None, speed: int = 4000):
 
         ret = False
@@ -74,7 +76,7 @@ class pyjlink:
                         break
 
                     # set interface (default is SWD)
-                    ret = jlink.set_tif(interface)
+                    ret = jlink.set_tif(pylink.enums.JLinkInterfaces.SWD if interface is None else interface)
                     self.logger.i(f'\t\tset_tif ret: {ret}')
 
                     # set device xml path
@@ -157,7 +159,7 @@ class pyjlink:
 
         return info
 
-    def simple_test(self, dll_path: str = None, serial_no: int = None, interface=pylink.enums.JLinkInterfaces.SWD,
+    def simple_test(self, dll_path: str = None, serial_no: int = None, interface=None,
                     device_xml: str = None, chip_name: str = None, speed: int = 4000, mem_base: int = 0):
         ret = False
         while True:
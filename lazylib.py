@@ -0,0 +1,89 @@
+import importlib
+import sys
+import threading
+import types
+
+
+class lazymodule(types.ModuleType):
+    """
+    Placeholder of a module, imports the real module on first attribute access.
+
+    [how]
+        __getattr__ is called only for missing attributes, so after first access the real module namespace
+        is copied in and later accesses cost nothing extra, misses (e.g. submodules imported later) are
+        forwarded to the real module.
+    """
+
+    def __getattr__(self, attr: str):
+        module = sys.modules.get(self.__name__)
+        if module is None or '__lazy_loaded__' not in self.__dict__:
+            with lazylib.lock:
+                if '__lazy_loaded__' not in self.__dict__:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__.update(module.__dict__)
+                    self.__dict__['__lazy_loaded__'] = True
+                module = sys.modules[self.__name__]
+            if attr in self.__dict__:
+                return self.__dict__[attr]
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+class lazylib:
+    """
+    The library for lazy import of heavy dependencies (cv2, numpy, PIL, serial, pylink).
+
+    [usage]
+        np = lazylib.load('numpy') at module top, numpy is imported when np.xxx is first used.
+        Annotations must not touch the module at def time, use "from __future__ import annotations".
+
+    [threads]
+        a placeholder may be first used by several threads at once (vslib capture/prefetch threads, pipelib
+        thread stages, vsrecorder encoder thread, serlib reader/writer), so the import is done under lock,
+        importlib.util.LazyLoader is not thread-safe before python 3.12. Worker processes (folder_crop_resize,
+        pipelib process stages) have their own placeholders and import on their own.
+    """
+    # one lock for all placeholders, module import is serialized by python anyway
+    lock = threading.RLock()
+
+    @staticmethod
+    def load(name: str):
+        """
+        get module by name, lazily.
+
+        Parameters
+        ----------
+        name : str
+            module name, e.g. 'numpy', 'PIL.Image'
+
+        Returns
+        -------
+        types.ModuleType
+            the module if it is already imported, else a placeholder importing it on first use
+            (ImportError, e.g. missing package, is raised on first use too)
+        """
+
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        return lazymodule(name)
+
+    @staticmethod
+    def is_loaded(module) -> bool:
+        """
+        whether module (from load()) is imported already
+        """
+        return type(module) is not lazymodule or '__lazy_loaded__' in module.__dict__
+
+
+# region [main]
+if __name__ == "__main__":
+    """
+    For console test
+    """
+    np = lazylib.load('numpy')
+    print('numpy' in sys.modules, lazylib.is_loaded(np))
+    print(np.zeros(3), 'numpy' in sys.modules, lazylib.is_loaded(np))
+# endregion [main]
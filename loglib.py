@@ -1,30 +1,170 @@
-import datetime
 import logging
 import os
 import sys
+import threading
+import types
 
-from printlib import printlib
+from printlib import logclock, printlib
+
+# async mode policies when queue is full
+ASYNC_POLICIES = ('block', 'drop', 'count')
+
+
+class loghandler(logging.Handler):
+    """
+    Handler of async mode, puts records with their target handlers to loglib queue,
+    the listener thread formats and writes them.
+    """
+
+    def __init__(self, targets: list):
+        super().__init__()
+        self.targets = targets
+
+    def emit(self, record):
+        loglib._enqueue(record, self.targets)
+
+
+class logpool:
+    """
+    Console/file handlers of one logger, shared by every loglib of that logger (one console handler),
+    released when its last loglib is closed.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.console = None
+        # replaced (not changed in place) on add/remove, the async listener may be iterating it
+        self.handlers = []
+        self.queuehandler = None
+        self.refs = 0
+
+    def add(self, handler: logging.Handler):
+        self.handlers = self.handlers + [handler]
+        if self.queuehandler is not None:
+            self.queuehandler.targets = self.handlers
+        else:
+            self.logger.addHandler(handler)
+
+    def remove(self, handler: logging.Handler):
+        self.handlers = [h for h in self.handlers if h is not handler]
+        if self.queuehandler is not None:
+            self.queuehandler.targets = self.handlers
+        self.logger.removeHandler(handler)
+
+    def route(self, to_queue: bool):
+        """
+        route handlers through async queue or attach them to logger
+        """
+        if to_queue and self.queuehandler is None:
+            for handler in self.handlers:
+                self.logger.removeHandler(handler)
+            self.queuehandler = loghandler(self.handlers)
+            self.logger.addHandler(self.queuehandler)
+        elif not to_queue and self.queuehandler is not None:
+            self.logger.removeHandler(self.queuehandler)
+            self.queuehandler = None
+            for handler in self.handlers:
+                self.logger.addHandler(handler)
+
+    def __deepcopy__(self, memo):
+        # shared, a deepcopied loglib uses the same pool
+        return self
 
 
 class loglib:
-    def __init__(self, module: str = None):
+    """
+    [pool]
+        loglib instances of the same module share one logger and its handlers (logpool), e.g. every vslib
+        logs through logger 'vslib' with one console handler. context tells instances apart: it is set as
+        record.context (for filters/formatters, a file from start_log() only gets records of its context) and
+        costs nothing per instance in logging. close() releases the instance, its file handler, and the shared
+        handlers with the last instance of the pool. Logging after close() does not join the pool again (e.g. the
+        last lines of a reader thread), it goes to the handlers still attached to the logger, start_console() or
+        start_log() join it again.
+
+    [async]
+        loglib.start_async() moves console/file output of every loglib to one listener thread: a log call only
+        puts the record into a bounded queue. When the queue is full, policy 'block' waits, 'drop' drops the
+        record and 'count' drops it and writes how many were dropped once the listener catches up (loglib.dropped
+        counts both). Queued records are written by loglib.flush(), close_log(), loglib.stop_async() and at exit.
+
+    [lazy]
+        every log method takes msg with args (msg % args) or a lambda without args (msg()), e.g.
+        logger.info('READ <<< %s', data) or logger.debug(lambda: data.hex()), the message is built (and caller
+        info/timestamp taken) only when the level is enabled (see setlevel()). Other callables are not called,
+        logger.i(obj) logs obj as before.
+    """
+    # logger name: logpool
+    pools = {}
+    lock = threading.RLock()
+    async_queue = None
+    async_thread = None
+    async_policy = 'block'
+    dropped = 0
+    reported = 0
+    atexit_registered = False
+
+    def __init__(self, module: str = None, context: str = None):
+        """
+        Parameters
+        ----------
+        module : str
+            logger name, usually __name__
+        context : str
+            identity of the instance (e.g. port, source), see [pool]
+        """
         # get logger per module
         self.module = module
+        self.context = context
+        self.extra = None if context is None else {'context': context}
         self.logger = logging.getLogger(module)
-        self.logger.setLevel(logging.DEBUG)
         self.formatter = logging.Formatter('%(message)s')
 
-        # console handler init
-        self.consolehandler = None
         # file handler init
         self.filehandler = None
+        self.pool = None
+        self.closed = False
+        self._join()
+
+    def _join(self):
+        with loglib.lock:
+            self.closed = False
+            pool = loglib.pools.get(self.logger.name)
+            if pool is None:
+                pool = loglib.pools[self.logger.name] = logpool(self.logger)
+                # default level of a new logger, a level set by setlevel() of another instance is kept
+                if self.logger.level == logging.NOTSET:
+                    self.logger.setLevel(logging.DEBUG)
+                if loglib.async_queue is not None:
+                    pool.route(True)
+            pool.refs += 1
+            self.pool = pool
+
+    def close(self):
+        """
+        close file log and leave pool, the pool's handlers are closed with its last loglib
+        """
+        if self.pool is None:
+            return
+        if self.filehandler is not None:
+            self.close_log()
+        with loglib.lock:
+            self.closed = True
+            pool, self.pool = self.pool, None
+            pool.refs -= 1
+            if pool.refs == 0:
+                loglib.flush()
+                for handler in pool.handlers:
+                    pool.remove(handler)
+                    handler.close()
+                pool.console = None
+                pool.route(False)
+                if loglib.pools.get(self.logger.name) is pool:
+                    del loglib.pools[self.logger.name]
 
     @staticmethod
     def get_file_name(prefix: str = '', postfix: str = '', ext: str = '', with_ms: bool = False):
-        if with_ms:
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        else:
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = logclock.wall(with_ms)
 
         filename = ''
 
@@ -45,13 +185,16 @@ class loglib:
         """
         init_console decorator
         """
-        def func(self, msg: str = ''):
+        def func(self, *args):
             self.init_console()
-            log(self, msg)
+            log(self, *args)
         return func
 
     def init_console(self):
-        if not self.consolehandler:
+        if self.closed:
+            # closed instance logs through whatever handlers the logger still has, see [pool]
+            return
+        if self.pool is None or self.pool.console is None:
             # print(f' init console {self.module} '.center(100, '^'))
             self.start_console()
 
@@ -65,9 +208,20 @@ class loglib:
         [root cause] loglib.__init__ has logging.StreamHandler(sys.stdout)
         [solution] init console handler out of __init__
         """
-        self.consolehandler = logging.StreamHandler(sys.stdout)
-        self.consolehandler.setFormatter(self.formatter)
-        self.logger.addHandler(self.consolehandler)
+        with loglib.lock:
+            if self.pool is None:
+                self._join()
+            if self.pool.console is None:
+                self.pool.console = logging.StreamHandler(sys.stdout)
+                self.pool.console.setFormatter(self.formatter)
+                self.pool.add(self.pool.console)
+
+    @property
+    def consolehandler(self):
+        """
+        console handler of the pool, None if not started
+        """
+        return self.pool.console if self.pool is not None else None
 
     def start_log(self, logfile: str):
         self.create_parent_folder(logfile)
@@ -75,7 +229,130 @@ class loglib:
         # file handler
         self.filehandler = logging.FileHandler(logfile)
         self.filehandler.setFormatter(self.formatter)
-        self.logger.addHandler(self.filehandler)
+        if self.context is not None:
+            context = self.context
+            self.filehandler.addFilter(lambda record: getattr(record, 'context', None) == context)
+        with loglib.lock:
+            if self.pool is None:
+                self._join()
+            self.pool.add(self.filehandler)
+
+    def _remove_handler(self, handler: logging.Handler):
+        # queued records of handler are written first
+        loglib.flush()
+        with loglib.lock:
+            pool = self.pool or loglib.pools.get(self.logger.name)
+            if pool is not None:
+                pool.remove(handler)
+            else:
+                self.logger.removeHandler(handler)
+
+    # region [async]
+    @staticmethod
+    def start_async(queue_size: int = 10000, policy: str = 'block'):
+        """
+        start async mode, see [async].
+
+        Parameters
+        ----------
+        queue_size : int
+            max records waiting for listener
+        policy : str
+            'block', 'drop' or 'count' when queue is full
+
+        Returns
+        -------
+        bool
+            True if started, False if already started or invalid policy
+        """
+        import atexit
+        import queue
+
+        if policy not in ASYNC_POLICIES:
+            return False
+        with loglib.lock:
+            if loglib.async_queue is not None:
+                return False
+            loglib.async_policy = policy
+            loglib.async_queue = queue.Queue(maxsize=queue_size)
+            loglib.async_thread = threading.Thread(target=loglib._listen, args=(loglib.async_queue,),
+                                                   name='loglib', daemon=True)
+            loglib.async_thread.start()
+            if not loglib.atexit_registered:
+                atexit.register(loglib.stop_async)
+                loglib.atexit_registered = True
+            for pool in loglib.pools.values():
+                pool.route(True)
+        return True
+
+    @staticmethod
+    def stop_async():
+        """
+        write queued records, stop listener and go back to sync mode
+        """
+        with loglib.lock:
+            if loglib.async_queue is None:
+                return
+            # records logged from now on are written by caller
+            async_queue, loglib.async_queue = loglib.async_queue, None
+            async_queue.put(None)
+            loglib.async_thread.join()
+            loglib.async_thread = None
+            for pool in loglib.pools.values():
+                pool.route(False)
+
+    @staticmethod
+    def flush():
+        """
+        wait until listener wrote every queued record
+        """
+        async_queue = loglib.async_queue
+        if async_queue is not None and threading.current_thread() is not loglib.async_thread:
+            async_queue.join()
+
+    @staticmethod
+    def _enqueue(record: logging.LogRecord, targets: list):
+        import queue
+
+        async_queue = loglib.async_queue
+        if async_queue is None:
+            # async mode stopped after routing, write in caller
+            for handler in targets:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+        if loglib.async_policy == 'block':
+            async_queue.put((record, targets))
+            return
+        try:
+            async_queue.put_nowait((record, targets))
+        except queue.Full:
+            with loglib.lock:
+                loglib.dropped += 1
+
+    @staticmethod
+    def _listen(async_queue):
+        while True:
+            item = async_queue.get()
+            try:
+                if item is None:
+                    break
+                record, targets = item
+                if loglib.async_policy == 'count' and loglib.dropped > loglib.reported:
+                    dropped, loglib.reported = loglib.dropped - loglib.reported, loglib.dropped
+                    notice = logging.LogRecord(record.name, logging.WARNING, __file__, 0,
+                                               f'W/loglib {dropped} log records dropped', None, None)
+                    for handler in targets:
+                        handler.handle(notice)
+                for handler in targets:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            except Exception:
+                # listener must survive a broken handler
+                pass
+            finally:
+                async_queue.task_done()
+    # endregion [async]
 
     @staticmethod
     def create_parent_folder(file_path: str):
@@ -98,88 +375,124 @@ class loglib:
 
     # region [just log]
     @_init_console
-    def d(self, msg: str = ''):
-        self.logger.debug(msg)
+    def d(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(loglib._message(msg, args), extra=self.extra)
 
     @_init_console
-    def i(self, msg: str = ''):
-        self.logger.info(msg)
+    def i(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(loglib._message(msg, args), extra=self.extra)
 
     @_init_console
-    def w(self, msg: str = ''):
-        self.logger.warning(msg)
+    def w(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning(loglib._message(msg, args), extra=self.extra)
 
     @_init_console
-    def e(self, msg: str = ''):
-        self.logger.error(msg)
+    def e(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(loglib._message(msg, args), extra=self.extra)
 
     @_init_console
-    def c(self, msg: str = ''):
-        self.logger.critical(msg)
+    def c(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            self.logger.critical(loglib._message(msg, args), extra=self.extra)
 
     @_init_console
-    def l(self, level: int, msg: str = ''):
-        self.logger.log(level, msg)
+    def l(self, level: int, msg='', *args):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, loglib._message(msg, args), extra=self.extra)
 
     # endregion [just log]
 
     # region [log with time and level]
     @_init_console
-    def d1(self, msg: str = ''):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        self.logger.debug(f'D/{timestamp} {msg}')
+    def d1(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            timestamp = logclock.now()
+            self.logger.debug(f'D/{timestamp} {loglib._message(msg, args)}', extra=self.extra)
 
     @_init_console
-    def i1(self, msg: str = ''):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        self.logger.debug(f'I/{timestamp} {msg}')
+    def i1(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.INFO):
+            timestamp = logclock.now()
+            self.logger.info(f'I/{timestamp} {loglib._message(msg, args)}', extra=self.extra)
 
     @_init_console
-    def w1(self, msg: str = ''):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        self.logger.debug(f'W/{timestamp} {msg}')
+    def w1(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.WARNING):
+            timestamp = logclock.now()
+            self.logger.warning(f'W/{timestamp} {loglib._message(msg, args)}', extra=self.extra)
 
     @_init_console
-    def e1(self, msg: str = ''):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        self.logger.debug(f'E/{timestamp} {msg}')
+    def e1(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.ERROR):
+            timestamp = logclock.now()
+            self.logger.error(f'E/{timestamp} {loglib._message(msg, args)}', extra=self.extra)
 
     @_init_console
-    def c1(self, msg: str = ''):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        self.logger.debug(f'C/{timestamp} {msg}')
+    def c1(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            timestamp = logclock.now()
+            self.logger.critical(f'C/{timestamp} {loglib._message(msg, args)}', extra=self.extra)
 
     @_init_console
-    def l1(self, level: int, msg: str = ''):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
-        self.logger.log(level, f'{logging.getLevelName(level)}/{timestamp} {msg}')
+    def l1(self, level: int, msg='', *args):
+        if self.logger.isEnabledFor(level):
+            timestamp = logclock.now()
+            msg = f'{logging.getLevelName(level)}/{timestamp} {loglib._message(msg, args)}'
+            self.logger.log(level, msg, extra=self.extra)
 
     # endregion [log with time and level]
 
     # region [log with caller info]
     @_init_console
-    def debug(self, msg: str = ''):
-        self.logger.debug('D/{} {}'.format(printlib.get_caller_info(3), msg))
+    def debug(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            msg = 'D/{} {}'.format(printlib.get_caller_info(3), loglib._message(msg, args))
+            self.logger.debug(msg, extra=self.extra)
 
     @_init_console
-    def info(self, msg: str = ''):
-        self.logger.info('I/{} {}'.format(printlib.get_caller_info(3), msg))
+    def info(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.INFO):
+            msg = 'I/{} {}'.format(printlib.get_caller_info(3), loglib._message(msg, args))
+            self.logger.info(msg, extra=self.extra)
 
     @_init_console
-    def warning(self, msg: str = ''):
-        self.logger.warning('W/{} {}'.format(printlib.get_caller_info(3), msg))
+    def warning(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.WARNING):
+            msg = 'W/{} {}'.format(printlib.get_caller_info(3), loglib._message(msg, args))
+            self.logger.warning(msg, extra=self.extra)
 
     @_init_console
-    def error(self, msg: str = ''):
-        self.logger.error('E/{} {}'.format(printlib.get_caller_info(3), msg))
+    def error(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.ERROR):
+            msg = 'E/{} {}'.format(printlib.get_caller_info(3), loglib._message(msg, args))
+            self.logger.error(msg, extra=self.extra)
 
     @_init_console
-    def critical(self, msg: str = ''):
-        self.logger.critical('C/{} {}'.format(printlib.get_caller_info(3), msg))
+    def critical(self, msg='', *args):
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            msg = 'C/{} {}'.format(printlib.get_caller_info(3), loglib._message(msg, args))
+            self.logger.critical(msg, extra=self.extra)
 
     @_init_console
-    def log(self, level: int, msg: str = ''):
-        self.logger.log(level, '{}/{} {}'.format(logging.getLevelName(level), printlib.get_caller_info(3), msg))
+    def log(self, level: int, msg='', *args):
+        if self.logger.isEnabledFor(level):
+            msg = '{}/{} {}'.format(logging.getLevelName(level), printlib.get_caller_info(3),
+                                    loglib._message(msg, args))
+            self.logger.log(level, msg, extra=self.extra)
+
+    @staticmethod
+    def _message(msg, args: tuple):
+        """
+        build message of an enabled log call, msg() if msg is a lambda without args, msg % args if args,
+        other objects (classes, functions, callable instances) are logged as they are, never called
+        """
+        if not args and type(msg) is types.FunctionType and msg.__name__ == '<lambda>':
+            return msg()
+        return msg % args if args else msg
 
     # endregion [log with caller info]
 
@@ -190,13 +503,19 @@ class loglib:
         logging.disable(logging.CRITICAL)
 
     def close_console(self):
-        self.logger.removeHandler(self.consolehandler)
-        self.consolehandler.flush()
-        self.consolehandler.close()
-        self.consolehandler = None
+        """
+        close console of the pool (shared by loglib instances of the same module)
+        """
+        consolehandler = self.consolehandler
+        self._remove_handler(consolehandler)
+        consolehandler.flush()
+        consolehandler.close()
+        with loglib.lock:
+            if self.pool is not None and self.pool.console is consolehandler:
+                self.pool.console = None
 
     def close_log(self):
-        self.logger.removeHandler(self.filehandler)
+        self._remove_handler(self.filehandler)
         self.filehandler.flush()
         self.filehandler.close()
         self.filehandler = None
@@ -0,0 +1,294 @@
+import queue
+import threading
+import time
+
+from loglib import loglib
+
+# queue policies when a stage queue is full
+POLICIES = ('block', 'drop_oldest')
+# end of input mark, passed from stage to stage
+END = None
+
+
+class pipestage:
+    """
+    One stage of pipelib: bounded input queue, workers calling func(item), stats.
+    """
+
+    def __init__(self, name: str, func, workers: int, mode: str, queue_size: int, policy: str):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.mode = mode
+        self.policy = policy
+        # items are (enqueue time, item)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.executor = None
+        self.alive = 0
+        self.lock = threading.Lock()
+
+        # stats
+        self.count_in = 0
+        self.count_out = 0
+        self.dropped = 0
+        self.errors = 0
+        self.wait_sum = 0.0
+        self.service_sum = 0.0
+        self.latency_max = 0.0
+
+    def put(self, item, timeout: float = None):
+        """
+        put item by policy, block (backpressure) or drop oldest queued item when full.
+
+        Returns
+        -------
+        bool
+            True if queued, False if blocked longer than timeout
+        """
+        entry = (time.monotonic(), item)
+        if self.policy == 'drop_oldest':
+            while True:
+                try:
+                    self.queue.put_nowait(entry)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        with self.lock:
+                            self.dropped += 1
+                    except queue.Empty:
+                        pass
+        else:
+            try:
+                self.queue.put(entry, timeout=timeout)
+            except queue.Full:
+                return False
+        with self.lock:
+            self.count_in += 1
+        return True
+
+    def getstats(self, elapsed: float):
+        done = self.count_out + self.errors
+        return {
+            'in': self.count_in,
+            'out': self.count_out,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'queue': self.queue.qsize(),
+            'wait_avg': self.wait_sum / done if done else 0.0,
+            'service_avg': self.service_sum / done if done else 0.0,
+            'latency_max': self.latency_max,
+            'throughput': self.count_out / elapsed if elapsed else 0.0,
+        }
+
+
+class pipelib:
+    """
+    The library for staged pipeline, e.g. capture (vslib) -> convert (imagelib) -> sink (filelib/serlib).
+
+    [stage]
+        func(item) runs on workers threads (or a process pool, func and items must be picklable), its return
+        value goes to the next stage, None drops the item. Each stage has a bounded queue, 'block' makes a full
+        queue block the stage before it (backpressure up to put()), 'drop_oldest' drops the oldest queued item
+        instead, e.g. to keep the latest frames when a sink is slow. With several workers the order may change.
+
+    [stats]
+        per stage: items in/out, dropped, errors, queue size, average queue wait and service time (seconds),
+        max latency (wait + service), throughput (items per second since start).
+    """
+    slogger = loglib(__name__)
+
+    def __init__(self):
+        self.stages = []
+        self.started = False
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def add(self, name: str, func, workers: int = 1, mode: str = 'thread', queue_size: int = 4,
+            policy: str = 'block'):
+        """
+        add a stage after the last one.
+
+        Parameters
+        ----------
+        name : str
+            stage name in stats
+        func : callable
+            func(item) -> item for next stage, None to drop
+        workers : int
+            number of workers
+        mode : str
+            'thread' or 'process'
+        queue_size : int
+            max items waiting in stage queue
+        policy : str
+            'block' or 'drop_oldest' when queue is full
+
+        Returns
+        -------
+        pipelib
+            self, None if fail
+        """
+        if self.started:
+            pipelib.slogger.error('cannot add stage after start!!!')
+            return None
+        if mode not in ('thread', 'process') or policy not in POLICIES or workers < 1 or queue_size < 1:
+            pipelib.slogger.error(f'invalid stage {name}: mode {mode}, policy {policy}, workers {workers}, '
+                                  f'queue_size {queue_size}!!!')
+            return None
+        self.stages.append(pipestage(name, func, workers, mode, queue_size, policy))
+        return self
+
+    def start(self):
+        if self.started:
+            pipelib.slogger.warning('already started!!!')
+            return None
+        if not self.stages:
+            pipelib.slogger.error('no stage!!!')
+            return None
+        self.started = True
+        self.start_time = time.monotonic()
+        self.end_time = 0.0
+        for i, stage in enumerate(self.stages):
+            if stage.mode == 'process':
+                from concurrent.futures import ProcessPoolExecutor
+                stage.executor = ProcessPoolExecutor(max_workers=stage.workers)
+            stage.alive = stage.workers
+            next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            stage.threads = [threading.Thread(target=self._work, args=(stage, next_stage), daemon=True)
+                             for _ in range(stage.workers)]
+            for thread in stage.threads:
+                thread.start()
+        return self
+
+    def _work(self, stage: pipestage, next_stage: pipestage):
+        while True:
+            enqueued, item = stage.queue.get()
+            if item is END:
+                break
+            start = time.monotonic()
+            try:
+                if stage.executor:
+                    result = stage.executor.submit(stage.func, item).result()
+                else:
+                    result = stage.func(item)
+                ok = True
+            except Exception as e:
+                pipelib.slogger.error(f'stage {stage.name} error: {e!r}')
+                result, ok = None, False
+            end = time.monotonic()
+
+            with stage.lock:
+                if ok:
+                    stage.count_out += 1
+                else:
+                    stage.errors += 1
+                stage.wait_sum += start - enqueued
+                stage.service_sum += end - start
+                stage.latency_max = max(stage.latency_max, end - enqueued)
+            if result is not None and next_stage is not None:
+                next_stage.put(result)
+
+        # last worker of stage passes end to every worker of next stage
+        with stage.lock:
+            stage.alive -= 1
+            last = stage.alive == 0
+        if last:
+            if stage.executor:
+                stage.executor.shutdown()
+            if next_stage is not None:
+                for _ in range(next_stage.workers):
+                    next_stage.queue.put((time.monotonic(), END))
+            else:
+                self.end_time = time.monotonic()
+
+    def put(self, item, timeout: float = None):
+        """
+        put item into first stage (blocks when it is full and its policy is 'block').
+
+        Returns
+        -------
+        bool
+            True if queued, False if not started, item is None or timeout
+        """
+        if not self.started or item is END:
+            return False
+        return self.stages[0].put(item, timeout)
+
+    def feed(self, items):
+        """
+        put all items (e.g. frames from vslib), return number of items queued
+        """
+        return sum(self.put(item) for item in items)
+
+    def join(self, timeout: float = None):
+        """
+        end input, wait until every stage drained and stop.
+
+        Returns
+        -------
+        bool
+            True if all stages finished
+        """
+        if not self.started:
+            return True
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.queue.put((time.monotonic(), END))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stage in self.stages:
+            for thread in stage.threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                if thread.is_alive():
+                    return False
+        self.started = False
+        return True
+
+    def getstats(self):
+        """
+        Returns
+        -------
+        dict
+            {stage name: stats}, see [stats]
+        """
+        end = self.end_time or time.monotonic()
+        elapsed = end - self.start_time if self.start_time else 0.0
+        return {stage.name: stage.getstats(elapsed) for stage in self.stages}
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.join()
+    # endregion [with]
+
+
+# region [main]
+if __name__ == "__main__":
+    """
+    For console test
+    """
+    import sys
+
+    from filelib import filelib
+    from imagelib import imagelib
+    from vslib import vslib
+
+    def convert(frame):
+        # convert then give prefetch slot back to decoder
+        with frame as image:
+            return frame.seq, imagelib.bgr8882rgb565(image)
+
+    # capture -> rgb565 -> raw files
+    with vslib(sys.argv[1] if len(sys.argv) > 1 else 'asset/4K.mp4') as vs:
+        vs.prefetch()
+        with pipelib() as pipe:
+            pipe.add('rgb565', convert, workers=2)
+            pipe.add('write', lambda item: filelib.file_write_binary(item[1], f'{item[0]:05}.raw'),
+                     policy='drop_oldest')
+            pipe.start()
+            pipe.feed(iter(vs.read_prefetch, None))
+        print(pipe.getstats())
+# endregion [main]
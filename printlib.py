@@ -1,58 +1,104 @@
-import datetime
-import inspect
+import sys
+import time
 
 
-class printlib:
+class logclock:
+    """
+    Timestamps of log lines and log file names, shared by printlib and loglib.
 
-    @staticmethod
-    def print(*args, **kwargs):
-        stack = inspect.stack()
+    [wall]
+        'YYYYmmdd_HHMMSS.mmm' (local time), the 'YYYYmmdd_HHMMSS' part is formatted once per second and cached,
+        only milliseconds are appended per call.
 
-        # Get class name
-        try:
-            the_class = stack[1][0].f_locals["self"].__class__.__name__
-        except KeyError as e:
-            the_class = None
+    [monotonic]
+        logclock.set_monotonic(True) makes now() return seconds since start of monotonic clock ('12.345678'),
+        e.g. to measure latency between log lines without wall clock steps. File names always use wall time.
+    """
+    # (second, 'YYYYmmdd_HHMMSS'), replaced as a whole so threads never see a mixed pair
+    cache = (-1, '')
+    monotonic = False
+    origin = time.monotonic()
 
-        # Get function name
-        the_method = stack[1][0].f_code.co_name
+    @staticmethod
+    def wall(with_ms: bool = True):
+        """
+        'YYYYmmdd_HHMMSS.mmm', 'YYYYmmdd_HHMMSS' if not with_ms
+        """
+        now = time.time()
+        second = int(now)
+        cached, prefix = logclock.cache
+        if second != cached:
+            prefix = time.strftime('%Y%m%d_%H%M%S', time.localtime(second))
+            logclock.cache = (second, prefix)
+        if not with_ms:
+            return prefix
+        return f'{prefix}.{int((now - second) * 1000):03d}'
 
-        # Get line number
-        the_line_number = stack[1][0].f_lineno
+    @staticmethod
+    def now():
+        """
+        timestamp of a log line, see [wall] and [monotonic]
+        """
+        if logclock.monotonic:
+            return f'{time.monotonic() - logclock.origin:.6f}'
+        return logclock.wall()
 
-        # Get time
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
+    @staticmethod
+    def set_monotonic(monotonic: bool = True):
+        logclock.monotonic = monotonic
+        logclock.origin = time.monotonic()
 
-        if the_class:
-            print(
-                "{} [{}.{}#{}] {}".format(timestamp, the_class, the_method, the_line_number, " ".join(map(str, args))),
-                **kwargs)
-        else:
-            print("{} [{}#{}] {}".format(timestamp, the_method, the_line_number, " ".join(map(str, args))), **kwargs)
 
-    @staticmethod
-    def get_caller_info(level: int = 1):
-        stack = inspect.stack()
+class printlib:
+    """
+    [caller info]
+        the caller is found with sys._getframe(level) (no inspect.stack(), which reads source of every frame),
+        its "[Class.method#line]" is cached per code object, line and class of self.
+    """
+    # (code, line, class of self): "[Class.method#line]"
+    callers = {}
+    CALLERS_MAX = 4096
 
-        # Get class name
+    @staticmethod
+    def caller(level: int = 1):
+        """
+        "[Class.method#line]" of the caller level frames up ("[method#line]" if it has no self),
+        level 0 is the function calling caller()
+        """
         try:
-            the_class = stack[level][0].f_locals["self"].__class__.__name__
-        except KeyError as e:
-            the_class = None
+            frame = sys._getframe(level + 1)
+        except ValueError:
+            return '[?]'
+        code = frame.f_code
+        the_class = None
+        if 'self' in code.co_varnames:
+            the_self = frame.f_locals.get('self')
+            the_class = None if the_self is None else the_self.__class__
+        key = (code, frame.f_lineno, the_class)
+        info = printlib.callers.get(key)
+        if info is None:
+            if the_class:
+                info = '[{}.{}#{}]'.format(the_class.__name__, code.co_name, frame.f_lineno)
+            else:
+                info = '[{}#{}]'.format(code.co_name, frame.f_lineno)
+            if len(printlib.callers) >= printlib.CALLERS_MAX:
+                printlib.callers.clear()
+            printlib.callers[key] = info
+        return info
 
-        # Get function name
-        the_method = stack[level][0].f_code.co_name
+    @staticmethod
+    def print(*args, **kwargs):
+        # Get time
+        timestamp = logclock.now()
 
-        # Get line number
-        the_line_number = stack[level][0].f_lineno
+        print('{} {} {}'.format(timestamp, printlib.caller(1), ' '.join(map(str, args))), **kwargs)
 
+    @staticmethod
+    def get_caller_info(level: int = 1):
         # Get time
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')[:-3]
+        timestamp = logclock.now()
 
-        if the_class:
-            return "{} [{}.{}#{}]".format(timestamp, the_class, the_method, the_line_number)
-        else:
-            return "{} [{}#{}]".format(timestamp, the_method, the_line_number)
+        return '{} {}'.format(timestamp, printlib.caller(level))
 
     @staticmethod
     def draw_percent(percent, text, bar_len=20):
@@ -1,11 +1,12 @@
-import datetime
 import queue
 from concurrent.futures.thread import ThreadPoolExecutor
 
-import serial
-
+from lazylib import lazylib
 from loglib import loglib
 
+# pyserial is imported on first use
+serial = lazylib.load('serial')
+
 
 class serlib:
     """
@@ -13,8 +14,7 @@ class serlib:
     """
 
     def __init__(self, port: str, baudrate: int = 115200):
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')
-        self.logger = loglib(f'{__name__}_p{port}_time{timestamp}')
+        self.logger = loglib(__name__, context=f'serlib:{port}')
         self.port = port
         self.serial = None
         self.bufr = queue.Queue()
@@ -43,6 +43,7 @@ class serlib:
             self.serial.close()
         else:
             self.logger.error('serial is None!!!')
+        self.logger.close()
 
     def write_data(self, data: str):
         """
@@ -57,8 +58,8 @@ class serlib:
         if self.serial:
             try:
                 len_write = self.serial.write(data.encode())
-                self.logger.info(f'WRITE len({len_write})')
-                self.logger.info(f'WRITE >>> {data}')
+                self.logger.info('WRITE len(%d)', len_write)
+                self.logger.info('WRITE >>> %s', data)
             except serial.serialutil.SerialException as e:
                 self.logger.error(e)
             except serial.serialutil.SerialTimeoutException as e:
@@ -75,8 +76,8 @@ class serlib:
             try:
                 raw = self.serial.read(size=size)
                 data = raw.decode()
-                self.logger.info(f'READ len({len(data)})')
-                self.logger.info(f'READ <<<\n{data}')
+                self.logger.info('READ len(%d)', len(data))
+                self.logger.info('READ <<<\n%s', data)
                 ret = data
             except serial.serialutil.SerialException as e:
                 self.logger.error(e)
@@ -90,8 +91,8 @@ class serlib:
             try:
                 raw = self.serial.readline()
                 data = raw.decode()
-                self.logger.info(f'READ len({len(data)})')
-                self.logger.info(f'READ <<< {data}')
+                self.logger.info('READ len(%d)', len(data))
+                self.logger.info('READ <<< %s', data)
                 ret = data
             except serial.serialutil.SerialException as e:
                 self.logger.error(e)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from framelib import framelib
+
+
+class Test_framelib:
+    width = 8
+    height = 6
+
+    def frame(self, i: int):
+        return np.full((self.height, self.width, 2), i, dtype=np.uint8)
+
+    def test_append_read(self, tmp_path):
+        file_name = str(tmp_path / 'frames.fs')
+
+        with framelib(file_name, 'w', self.width, self.height, 'rgb565') as store:
+            assert store.is_opened()
+            assert len(store) == 0
+            assert store.append(self.frame(0)) == 0
+            assert store.append(self.frame(1).tobytes()) == 1
+            assert store.append(b'\0' * 5) == -1
+            # read while writing, mapping follows appended frames
+            assert np.array_equal(store[1], self.frame(1))
+            assert store.extend(self.frame(i) for i in range(2, 5)) == 4
+            assert np.array_equal(store[-1], self.frame(4))
+
+        with framelib(file_name) as store:
+            assert (store.width, store.height, store.channel, store.fmt) == (self.width, self.height, 2, 'rgb565')
+            assert len(store) == 5
+            frame = store[3]
+            assert isinstance(frame, np.memmap) and not frame.flags.writeable
+            assert np.array_equal(frame, self.frame(3))
+            assert [f[0, 0, 0] for f in store] == [0, 1, 2, 3, 4]
+            assert [f[0, 0, 0] for f in store.frames(1, None, 2)] == [1, 3]
+            assert store.append(self.frame(5)) == -1
+
+        with framelib(file_name, 'a') as store:
+            assert store.append(self.frame(5)) == 5
+        with framelib(file_name) as store:
+            assert len(store) == 6
+
+    def test_invalid(self, tmp_path):
+        file_name = tmp_path / 'bad.fs'
+        file_name.write_bytes(b'x' * 100)
+        assert not framelib(str(file_name)).is_opened()
+        assert not framelib(str(tmp_path / 'none.fs')).is_opened()
+        assert not framelib(str(tmp_path / 'new.fs'), 'w', 0, 0).is_opened()
+
+    def test_pack(self, tmp_path):
+        raw_files = []
+        for i in range(3):
+            raw_files.append(str(tmp_path / f'{i}.raw'))
+            self.frame(i).tofile(raw_files[-1])
+        assert framelib.pack(str(tmp_path / 'packed.fs'), raw_files, self.width, self.height) == 3
+        with framelib(str(tmp_path / 'packed.fs')) as store:
+            assert np.array_equal(store[2], self.frame(2))
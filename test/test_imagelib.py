@@ -0,0 +1,383 @@
+import os
+
+import numpy as np
+import pytest
+
+from imagelib import imagelib, imagectx, imageindex
+
+
+class Test_imagelib:
+    width = 256
+    height = 256
+
+    def rgb565_all(self):
+        # every possible rgb565 value once, little-endian bytes
+        return np.arange(65536, dtype='<u2').tobytes()
+
+    def test_rgb5652rgb888_lut(self):
+        rgb565 = self.rgb565_all()
+        expected = imagelib.rgb5652rgb888(rgb565, self.width, self.height)
+
+        rgb888 = imagelib.rgb5652rgb888_lut(rgb565, self.width, self.height)
+        assert rgb888.shape == (self.height, self.width, 3)
+        assert np.array_equal(rgb888, expected)
+
+        rgb888 = imagelib.rgb5652rgb888_lut(bytearray(rgb565), self.width, self.height)
+        assert np.array_equal(rgb888, expected)
+
+        rgb565_be = np.arange(65536, dtype='>u2').tobytes()
+        rgb888 = imagelib.rgb5652rgb888_lut(rgb565_be, self.width, self.height, byteorder='big')
+        assert np.array_equal(rgb888, expected)
+
+        assert imagelib.rgb5652rgb888_lut(rgb565[:-2], self.width, self.height) is None
+
+    def test_rgb5652rgba_lut(self):
+        rgb565 = self.rgb565_all()
+        expected = imagelib.rgb8882rgba(imagelib.rgb5652rgb888(rgb565, self.width, self.height),
+                                        self.width, self.height)
+
+        rgba = imagelib.rgb5652rgba_lut(rgb565, self.width, self.height)
+        assert np.array_equal(rgba, expected)
+        assert np.array_equal(imagelib.buf2rgba(rgb565, self.width, self.height, 2), expected)
+        assert np.array_equal(imagelib.buf2rgb888(rgb565, self.width, self.height, 2), expected[..., :3])
+
+    def test_convert_batch(self):
+        n, h, w = 5, 6, 8
+        rgb888 = np.random.randint(0, 256, (n, h, w, 3), dtype=np.uint8)
+        rgba = np.random.randint(0, 256, (n, h, w, 4), dtype=np.uint8)
+
+        rgb565 = imagelib.convert_batch(rgb888, 'rgb8882rgb565')
+        assert rgb565.shape == (n, h, w, 2)
+        for i in range(n):
+            assert rgb565[i].tobytes() == imagelib.rgb8882rgb565(rgb888[i])
+        bgr565 = imagelib.convert_batch(rgb888.tobytes(), 'bgr8882rgb565', w, h, chunk=2)
+        assert bgr565.tobytes() == imagelib.bgr8882rgb565(rgb888)
+
+        frames = imagelib.convert_batch(rgb565.tobytes(), 'rgb5652rgb888', w, h, max_bytes=h * w * 5 * 2)
+        for i in range(n):
+            assert np.array_equal(frames[i], imagelib.rgb5652rgb888(rgb565[i].tobytes(), w, h))
+
+        assert np.array_equal(imagelib.convert_batch(rgba, 'rgba2rgb888', chunk=3), rgba[..., :3])
+        frames = imagelib.convert_batch(rgb888, 'rgb8882rgba')
+        assert np.array_equal(frames[0], imagelib.rgb8882rgba(rgb888[0], w, h))
+
+        yuv = imagelib.convert_batch(rgb888, 'rgb8882yuv', chunk=2)
+        assert np.allclose(yuv[1], imagelib.rgb8882yuv(rgb888[1]))
+        rgb = imagelib.convert_batch(yuv, 'yuv2rgb888', chunk=4)
+        assert np.allclose(rgb[4], imagelib.yuv2rgb888(yuv[4]))
+
+        starts = [start for start, _ in imagelib.convert_batch_iter(rgb888, 'rgb8882rgba', chunk=2)]
+        assert starts == [0, 2, 4]
+
+        assert imagelib.convert_batch(rgb888, 'unknown') is None
+        assert imagelib.convert_batch(b'\x00' * 7, 'rgb8882rgba', w, h) is None
+
+    def test_out(self):
+        h, w = 6, 8
+        rgb888 = np.random.randint(0, 256, (h, w, 3), dtype=np.uint8)
+        rgb565 = imagelib.rgb8882rgb565(rgb888)
+
+        out = np.empty((h, w, 2), dtype=np.uint8)
+        assert imagelib.rgb8882rgb565(rgb888, out=out) is out
+        assert out.tobytes() == rgb565
+        view = imagelib.rgb8882rgb565(rgb888, view=True)
+        assert view.shape == (h, w, 2) and view.tobytes() == rgb565
+        assert imagelib.buf2rgb565(rgb888.tobytes(), w, h, 3).tobytes() == rgb565
+        assert imagelib.buf2rgb565(rgb565, w, h, 2).tobytes() == rgb565
+
+        out = np.empty((h, w, 3), dtype=np.uint8)
+        assert imagelib.rgb5652rgb888(rgb565, w, h, out=out) is out
+        assert np.array_equal(out, imagelib.rgb5652rgb888(rgb565, w, h))
+        gray = rgb888[..., 0].tobytes()
+        assert imagelib.buf2rgb888(gray, w, h, 1, out=out) is out
+        assert np.array_equal(out, imagelib.buf2rgb888(gray, w, h, 1))
+        assert imagelib.buf2rgb565(gray, w, h, 1, out=np.empty((h, w, 2), np.uint8)).tobytes() == \
+            imagelib.buf2rgb565(gray, w, h, 1).tobytes()
+
+        # wrong shape is rejected instead of silently allocating
+        assert imagelib.rgba2rgb888(np.zeros((h, w, 4), np.uint8), w, h, out=np.empty((w, h, 3), np.uint8)) is None
+        wrong = np.empty((w, h, 2), np.uint8)
+        assert imagelib.rgb8882rgb565(rgb888, out=wrong) is None and imagelib.bgr8882rgb565(rgb888, out=wrong) is None
+        assert imagelib.buf2rgb565(gray, w, h, 1, out=wrong) is None
+        assert imagelib.buf2rgb565(rgb565, w, h, 2, out=wrong) is None
+        rgba_out = np.empty((h, w, 4), np.uint8)
+        assert imagelib.buf2rgba(gray, w, h, 1, out=rgba_out) is rgba_out
+        assert imagelib.buf2rgba(rgba_out.tobytes(), w, h, 4, out=np.empty((h, w, 4), np.uint8)).tobytes() == \
+            rgba_out.tobytes()
+        for wrong_rgba in (np.empty((w, h, 4), np.uint8), np.empty((h, w, 4), np.uint16)):
+            assert imagelib.buf2rgba(gray, w, h, 1, out=wrong_rgba) is None
+            assert imagelib.buf2rgba(rgba_out.tobytes(), w, h, 4, out=wrong_rgba) is None
+
+        # rgba to rgb565 ignores alpha, into out without rgb888 temporary
+        rgba = np.dstack([rgb888, np.full((h, w), 7, np.uint8)])
+        out = np.empty((h, w, 2), dtype=np.uint8)
+        assert imagelib.buf2rgb565(rgba.tobytes(), w, h, 4, out=out) is out and out.tobytes() == rgb565
+        assert imagelib.buf2rgb565(rgba.tobytes(), w, h, 4).tobytes() == rgb565
+
+    def test_imagectx(self):
+        h, w = 6, 8
+        ctx = imagectx()
+        rgb888 = np.random.randint(0, 256, (h, w, 3), dtype=np.uint8)
+
+        rgb565 = ctx.rgb8882rgb565(rgb888)
+        assert rgb565.tobytes() == imagelib.rgb8882rgb565(rgb888)
+        rgba = ctx.buf2rgba(rgb565.tobytes(), w, h, 2)
+        assert np.array_equal(rgba, imagelib.buf2rgba(rgb565.tobytes(), w, h, 2))
+        yuv = ctx.rgb8882yuv(rgb888)
+        assert np.allclose(yuv, imagelib.rgb8882yuv(rgb888))
+
+        # steady state reuses the same buffers
+        assert ctx.rgb8882rgb565(rgb888) is rgb565
+        assert ctx.buf2rgba(rgb565.tobytes(), w, h, 2) is rgba
+        assert ctx.rgb8882yuv(rgb888) is yuv
+        frames = ctx.convert_batch(np.stack([rgb888] * 3), 'rgb8882rgba')
+        assert ctx.convert_batch(np.stack([rgb888] * 3), 'rgb8882rgba') is frames
+        n_buffers = len(ctx.buffers)
+        ctx.rgb8882rgb565(np.zeros((h * 2, w, 3), np.uint8))
+        assert len(ctx.buffers) == n_buffers + 1
+        ctx.release()
+        assert not ctx.buffers
+
+    def test_folder_crop_resize(self, tmp_path):
+        from PIL import Image
+
+        folder = tmp_path / 'images'
+        (folder / 'sub').mkdir(parents=True)
+        for i, size in enumerate([(40, 30), (30, 40), (32, 32)]):
+            Image.new('RGB', size, (i * 50, 100, 200)).save(folder / f'{i}.png')
+        Image.new('RGB', (20, 10)).save(folder / 'sub' / 'sub.bmp')
+        (folder / 'bad.png').write_bytes(b'not an image')
+
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16, workers=2)
+        assert (summary['total'], summary['converted'], summary['skipped'], summary['failed']) == (5, 4, 0, 1)
+        raws = sorted((folder / 'convert').glob('*.raw'))
+        assert len(raws) == 4
+        assert all(raw.stat().st_size == 16 * 16 * 2 for raw in raws)
+
+        # convert folder is not walked, unchanged files are skipped
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16)
+        assert (summary['total'], summary['converted'], summary['skipped'], summary['failed']) == (5, 0, 4, 1)
+
+        Image.new('RGB', (50, 50), (1, 2, 3)).save(folder / '1.png')
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16, check='hash')
+        assert (summary['converted'], summary['skipped']) == (1, 3)
+
+        # same content with new mtime is up to date by hash
+        import os
+        os.utime(folder / '0.png', ns=(0, 0))
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16, check='hash')
+        assert (summary['converted'], summary['skipped']) == (0, 4)
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16, check='none')
+        assert (summary['converted'], summary['skipped']) == (4, 0)
+        assert len(list((folder / 'convert').glob('*.raw'))) == 4
+
+    def test_folder_crop_resize_incremental(self, tmp_path, monkeypatch):
+        import imagelib as module
+        from PIL import Image
+
+        folder = tmp_path / 'images'
+        folder.mkdir()
+        for i in range(5):
+            Image.new('RGB', (32, 24), (i * 50, 100, 200)).save(folder / f'{i}.png')
+
+        # only sources with changed size or mtime are hashed
+        hashed = []
+        sha1 = imagelib._file_sha1
+        monkeypatch.setattr(imagelib, '_file_sha1', lambda file: hashed.append(file) or sha1(file))
+        imagelib.folder_crop_resize(str(folder), 'test', 16, 16, check='hash')
+        assert len(hashed) == 5
+        hashed.clear()
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16, check='hash')
+        assert summary['skipped'] == 5 and hashed == []
+
+        # interrupted run keeps the manifest of files converted so far
+        import json
+        for i in range(5):
+            os.utime(folder / f'{i}.png', ns=(i, i))
+        monkeypatch.setattr(module, 'MANIFEST_BATCH', 2)
+        job = imagelib._file_crop_resize_job
+
+        saved = {}
+
+        def interrupted(args):
+            if args[0].endswith('3.png'):
+                # saved in batches while converting, before the run ends
+                manifest = next((folder / 'convert').glob('*.manifest.json'))
+                saved.update(json.loads(manifest.read_text()))
+                raise KeyboardInterrupt
+            return job(args)
+
+        monkeypatch.setattr(imagelib, '_file_crop_resize_job', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            imagelib.folder_crop_resize(str(folder), 'test', 16, 16)
+        monkeypatch.setattr(imagelib, '_file_crop_resize_job', job)
+        assert [saved[f'{i}.png']['mtime'] for i in range(2)] == [0, 1] and saved['2.png']['mtime'] != 2
+        summary = imagelib.folder_crop_resize(str(folder), 'test', 16, 16)
+        assert (summary['converted'], summary['skipped']) == (2, 3)
+
+    def test_fast_downscale(self, tmp_path):
+        from PIL import Image
+
+        file = str(tmp_path / 'big.jpg')
+        gradient = np.linspace(0, 255, 1600, dtype=np.uint8)
+        image = np.dstack([np.tile(gradient, (1200, 1))] * 3)
+        Image.fromarray(image).save(file, quality=95)
+
+        w, h, c, info, buf = imagelib.im2rgb888(file, 100, 75)
+        w_fast, h_fast, c_fast, info_fast, buf_fast = imagelib.im2rgb888(file, 100, 75, fast=True)
+        assert (w_fast, h_fast, c_fast, info_fast['size']) == (w, h, c, info['size']) == (100, 75, 3, (1600, 1200))
+        diff = np.abs(np.frombuffer(buf, np.uint8).astype(int) - np.frombuffer(buf_fast, np.uint8))
+        assert diff.mean() < 3
+        assert len(imagelib.im2rgb565(file, 100, 75, fast=True)[4]) == 100 * 75 * 2
+        assert len(imagelib.im2rgba(file, 100, 75, fast=True)[4]) == 100 * 75 * 4
+
+        assert imagelib.cv2imread(file, reduce=4).shape == (300, 400, 3)
+        assert imagelib.cv2imread(file, reduce=3) is None
+
+        imagelib.file_crop_resize(file, str(tmp_path / 'fast'), 64, 64, fast=True)
+        assert (tmp_path / 'fast.raw').stat().st_size == 64 * 64 * 2
+
+    def test_imageindex(self, tmp_path, monkeypatch):
+        from PIL import Image
+
+        folder = tmp_path / 'images'
+        (folder / 'sub').mkdir(parents=True)
+        Image.new('RGB', (40, 30)).save(folder / 'a.jpg')
+        Image.new('RGBA', (8, 4)).save(folder / 'sub' / 'b.png')
+        (folder / 'c.txt').write_text('not an image')
+        index_file = str(tmp_path / 'index.json')
+
+        with imageindex(index_file) as index:
+            infos = index.scan(str(folder))
+            assert sorted(info[:3] for info in infos.values()) == [(8, 4, 4), (40, 30, 3)]
+            assert index.get(str(folder / 'c.txt')) is None
+        assert imagelib.getiminfo(str(folder / 'a.jpg')) == (40, 30, 3)
+
+        # warm run answers from saved index without opening any image
+        index = imageindex(index_file)
+        with monkeypatch.context() as m:
+            m.setattr('imagelib.Image.open', None)
+            assert len(index.scan(str(folder))) == 2
+            assert imagelib.getiminfo(str(folder / 'sub' / 'b.png'), index) == (8, 4, 4)
+        assert not index.dirty
+
+        # changed file is read again
+        Image.new('L', (16, 16)).save(folder / 'a.jpg')
+        assert imagelib.getiminfo(str(folder / 'a.jpg'), index) == (16, 16, 1)
+        assert index.dirty
+        (folder / 'a.jpg').unlink()
+        assert imagelib.getiminfo(str(folder / 'a.jpg'), index) == (0, 0, 0)
+        assert index.prune() == 1
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc/self/fd')
+    def test_no_leaked_fd(self, tmp_path):
+        from PIL import Image
+
+        file = str(tmp_path / 'a.jpg')
+        Image.new('RGB', (40, 30)).save(file)
+        fds = len(os.listdir('/proc/self/fd'))
+        for _ in range(10):
+            imagelib.getiminfo(file)
+            imagelib.im2rgb565(file, 8, 8, fast=True)
+            imagelib.file_crop_resize(file, str(tmp_path / 'out'), 8, 8, fast=True)
+        assert len(os.listdir('/proc/self/fd')) == fds
+
+    def test_integer_yuv(self):
+        import cv2
+
+        h, w = 70, 64  # more rows than one stripe
+        # constant 2x2 blocks, cv2 takes top-left pixel as chroma sample while imagelib averages the block
+        rgb = np.random.randint(0, 256, (h // 2, w // 2, 3), dtype=np.uint8).repeat(2, 0).repeat(2, 1)
+
+        i420 = imagelib.rgb8882i420(rgb)
+        assert i420.shape == (h * 3 // 2, w) and i420.dtype == np.uint8
+        assert np.abs(i420.astype(int) - cv2.cvtColor(rgb, cv2.COLOR_RGB2YUV_I420)).max() <= 1
+        nv12 = imagelib.rgb8882nv12(rgb[..., ::-1], bgr=True)
+        assert np.array_equal(nv12[:h], i420[:h])
+        assert np.array_equal(nv12[h:].reshape(-1, 2)[:, 0], i420.reshape(-1)[h * w:h * w * 5 // 4])
+        yuyv = imagelib.rgb8882yuyv(rgb)
+        assert yuyv.shape == (h, w, 2)
+        assert np.array_equal(yuyv[..., 0], i420[:h])
+
+        for fmt, buf, code in (('nv12', nv12, cv2.COLOR_YUV2RGB_NV12), ('i420', i420, cv2.COLOR_YUV2RGB_I420),
+                               ('yuyv', yuyv, cv2.COLOR_YUV2RGB_YUYV)):
+            rgb_back = getattr(imagelib, f'{fmt}2rgb888')(buf.tobytes(), w, h)
+            assert np.abs(rgb_back.astype(int) - cv2.cvtColor(buf, code)).max() <= 1
+            out = np.empty((h, w, 3), dtype=np.uint8)
+            assert getattr(imagelib, f'{fmt}2rgb888')(buf, w, h, bgr=True, out=out) is out
+            assert np.array_equal(out, rgb_back[..., ::-1])
+
+        for standard in ('bt601', 'bt709'):
+            for full_range in (False, True):
+                nv12 = imagelib.rgb8882nv12(rgb, standard, full_range)
+                rgb_back = imagelib.nv122rgb888(nv12, w, h, standard, full_range)
+                assert np.abs(rgb_back.astype(int) - rgb).mean() < 2
+
+        assert imagelib.rgb8882nv12(rgb[:, 1:]) is None
+        assert imagelib.nv122rgb888(nv12[:-1], w, h) is None
+
+    def test_im2stream(self, tmp_path, monkeypatch):
+        from PIL import Image
+
+        h, w = 50, 36
+        rgb = np.random.randint(0, 256, (h, w, 3), dtype=np.uint8)
+        rgba = np.random.randint(0, 256, (h, w, 4), dtype=np.uint8)
+        files = {}
+        for ext in ('bmp', 'ppm', 'png'):
+            files[ext] = str(tmp_path / f'rgb.{ext}')
+            Image.fromarray(rgb).save(files[ext])
+        Image.fromarray(rgba).save(str(tmp_path / 'rgba.tif'))
+        Image.fromarray(rgb[..., 0]).save(str(tmp_path / 'gray.pgm'))
+
+        expected = {
+            'rgb888': rgb.tobytes(),
+            'rgba': imagelib.rgb8882rgba(rgb, w, h).tobytes(),
+            'rgb565': imagelib.rgb8882rgb565(rgb),
+            'nv12': imagelib.rgb8882nv12(rgb).tobytes(),
+            'i420': imagelib.rgb8882i420(rgb).tobytes(),
+            'yuyv': imagelib.rgb8882yuyv(rgb).tobytes(),
+        }
+        for ext, file in files.items():
+            for fmt, buf in expected.items():
+                out = str(tmp_path / f'{ext}.{fmt}')
+                assert imagelib.im2stream(file, out, fmt, rows=8)[3] == len(buf)
+                with open(out, 'rb') as f:
+                    assert f.read() == buf, (ext, fmt)
+
+        # uncompressed images are never decoded by PIL
+        with monkeypatch.context() as m:
+            m.setattr('PIL.ImageFile.ImageFile.load', None)
+            target = np.zeros(w * h * 4, dtype=np.uint8)
+            imagelib.im2stream(str(tmp_path / 'rgba.tif'), target, 'rgba', rows=7)
+            assert target.tobytes() == rgba.tobytes()
+            blocks = []
+            imagelib.im2stream(str(tmp_path / 'gray.pgm'), lambda offset, data: blocks.append((offset, data.copy())),
+                               'rgb888', rows=16)
+            assert [offset for offset, _ in blocks] == [0, 16 * w * 3, 32 * w * 3, 48 * w * 3]
+            assert np.array_equal(np.concatenate([data for _, data in blocks]), rgb[..., [0, 0, 0]])
+
+        assert imagelib.im2stream(files['png'], np.zeros(10, np.uint8), 'rgb888')[3] == 0
+        assert imagelib.im2stream(files['png'], target, 'unknown')[3] == 0
+
+        # compressed images of every mode are decoded once into a temporary file, same pixels as PIL
+        Image.fromarray(rgb).save(str(tmp_path / 'rgb.jpg'), quality=95)
+        Image.fromarray(rgba).save(str(tmp_path / 'rgba.png'))
+        Image.fromarray(rgb[..., 0]).save(str(tmp_path / 'gray.png'))
+        Image.fromarray(rgb).quantize(16).save(str(tmp_path / 'palette.png'))
+        for name in ('rgb.jpg', 'rgba.png', 'gray.png', 'palette.png'):
+            with Image.open(str(tmp_path / name)) as pilimage:
+                decoded = np.asarray(pilimage.convert('RGBA'))
+            out = str(tmp_path / f'{name}.rgba')
+            assert imagelib.im2stream(str(tmp_path / name), out, 'rgba', rows=16)[3] == w * h * 4
+            with open(out, 'rb') as f:
+                assert f.read() == decoded.tobytes(), name
+
+        # a failed conversion leaves neither target nor partial file
+        out = str(tmp_path / 'odd.nv12')
+        Image.fromarray(rgb[:, :35]).save(str(tmp_path / 'odd.png'))
+        assert imagelib.im2stream(str(tmp_path / 'odd.png'), out, 'nv12')[3] == 0
+        with monkeypatch.context() as m:
+            m.setattr(imagelib, '_stream_stripe', lambda *args: (_ for _ in ()).throw(IOError('disk full')))
+            assert imagelib.im2stream(files['png'], out, 'rgb888')[3] == 0
+        assert not any(path.name.startswith('odd.nv12') for path in tmp_path.iterdir())
+        assert not any(path.suffix == '.tmp' for path in tmp_path.iterdir())
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from lazylib import lazylib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class Test_lazylib:
+    def run(self, script: str):
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        return result.stdout.split()
+
+    def test_load(self):
+        # already imported module is returned as is
+        assert lazylib.load('sys') is sys
+        assert self.run("import sys; from lazylib import lazylib; m = lazylib.load('colorsys'); "
+                        "print('colorsys' in sys.modules, lazylib.is_loaded(m)); "
+                        "print(m.rgb_to_hsv(1, 0, 0)[2], 'colorsys' in sys.modules, lazylib.is_loaded(m))") == \
+            ['False', 'False', '1', 'True', 'True']
+
+    def test_missing_module(self):
+        module = lazylib.load('no_such_module_for_test')
+        with pytest.raises(ImportError):
+            module.attr
+
+    def test_threads(self):
+        module = lazylib.load('tabnanny')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(module.check)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 8 and all(r is sys.modules['tabnanny'].check for r in results)
+
+    def test_no_heavy_import(self):
+        heavy = ('cv2', 'numpy', 'PIL', 'serial', 'pylink')
+        for module in ('filelib', 'framelib', 'imagelib', 'vslib', 'serlib', 'jlinklib.pyjlink'):
+            assert self.run(f"import sys; import {module}; "
+                            f"print('loaded:', *[m for m in {heavy!r} if m in sys.modules])") == ['loaded:'], module
@@ -76,3 +76,222 @@ class Test_loglib:
         import os
         if os.path.exists(test_file):
             os.remove(test_file)
+
+    def test_async(self, tmp_path):
+        import threading
+
+        test_file = str(tmp_path / 'async.log')
+        logger = loglib('test_loglib_async')
+        logger.start_log(test_file)
+        assert loglib.start_async(queue_size=100)
+        assert not loglib.start_async()
+        threads = [threading.Thread(target=lambda t=t: [logger.i(f'{t} {i}') for i in range(200)]) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.close_log()
+        loglib.stop_async()
+        with open(test_file) as f:
+            lines = [line.split() for line in f]
+        assert len(lines) == 800
+        for t in range(4):
+            assert [int(i) for thread, i in lines if thread == str(t)] == list(range(200))
+
+    def test_async_drop(self, tmp_path):
+        test_file = str(tmp_path / 'drop.log')
+        logger = loglib('test_loglib_drop')
+        logger.start_log(test_file)
+        dropped = loglib.dropped
+        assert loglib.start_async(queue_size=2, policy='count')
+        # listener waits for file handler lock, queue fills up
+        logger.filehandler.acquire()
+        for i in range(10):
+            logger.i(f'{i}')
+        logger.filehandler.release()
+        loglib.flush()
+        logger.i('last')
+        loglib.stop_async()
+        logger.close_log()
+        dropped = loglib.dropped - dropped
+        with open(test_file) as f:
+            lines = f.read().splitlines()
+        reports = [line for line in lines if line.startswith('W/loglib')]
+        assert dropped >= 7 and sum(int(line.split()[1]) for line in reports) == dropped
+        assert len(lines) - len(reports) == 10 - dropped + 1 and lines[-1] == 'last'
+
+    def test_caller_info(self, tmp_path):
+        import sys
+
+        from printlib import printlib
+
+        test_file = str(tmp_path / 'caller.log')
+        logger = loglib('test_loglib_caller')
+        logger.start_log(test_file)
+        line = sys._getframe().f_lineno + 1
+        logger.info('info')
+
+        def function():
+            logger.error('error')
+            return printlib.get_caller_info(1)
+
+        assert function().endswith(f' [function#{line + 4}]')
+        logger.close_log()
+        with open(test_file) as f:
+            lines = f.read().splitlines()
+        assert lines[0].startswith('I/') and lines[0].endswith(f' [Test_loglib.test_caller_info#{line}] info')
+        assert lines[1].startswith('E/') and lines[1].endswith(f' [function#{line + 3}] error')
+
+    def test_clock(self):
+        import datetime
+        import re
+
+        from printlib import logclock, printlib
+
+        timestamp = logclock.now()
+        assert re.fullmatch(r'\d{8}_\d{6}\.\d{3}', timestamp) and re.fullmatch(r'\d{8}_\d{6}', logclock.wall(False))
+        seconds = datetime.datetime.strptime(timestamp, '%Y%m%d_%H%M%S.%f').timestamp()
+        assert abs(datetime.datetime.now().timestamp() - seconds) < 1.5
+
+        logclock.set_monotonic(True)
+        try:
+            first = float(printlib.get_caller_info(1).split()[0])
+            second = float(printlib.get_caller_info(1).split()[0])
+            assert 0 <= first <= second < 1
+            # file names stay wall clock
+            assert len(loglib.get_file_name(prefix='abc', postfix='xyz', ext='test')) == 28
+        finally:
+            logclock.set_monotonic(False)
+        assert re.fullmatch(r'\d{8}_\d{6}\.\d{3}', logclock.now())
+
+    def test_lazy(self, tmp_path):
+        import logging
+
+        test_file = str(tmp_path / 'lazy.log')
+        logger = loglib('test_loglib_lazy')
+        logger.start_log(test_file)
+        built = []
+
+        def message(*args):
+            built.append(args)
+            return ' '.join(args)
+
+        logger.setlevel(logging.WARNING)
+        # disabled levels neither build message nor look up caller/time
+        for log in (logger.debug, logger.info, logger.d1, logger.i1, logger.d, logger.i):
+            log(lambda: message('x'))
+        logger.l1(logging.INFO, lambda: message('x'))
+        assert not built
+        logger.w1(lambda: message('a', 'b'))
+        logger.e1('%s %d%%', 'c', 100)
+        logger.warning('100%')
+        logger.l(logging.ERROR, '%s', 'l')
+        logger.setlevel(logging.DEBUG)
+        logger.i1('i1')
+        logger.close_log()
+        assert built == [('a', 'b')]
+        with open(test_file) as f:
+            lines = f.read().splitlines()
+        assert [line[:2] for line in lines] == ['W/', 'E/', 'W/', 'l', 'I/']
+        assert lines[0].endswith(' a b') and lines[1].endswith(' c 100%') and lines[2].endswith('] 100%')
+
+    def test_lazy_callables(self, tmp_path):
+        test_file = str(tmp_path / 'callables.log')
+        logger = loglib('test_loglib_callables')
+        logger.start_log(test_file)
+        created = []
+
+        class item:
+            def __init__(self):
+                created.append(self)
+
+        # classes and functions are logged, not called
+        logger.i(item)
+        logger.i(max)
+        logger.i(lambda: 'lazy')
+        logger.close_log()
+        assert not created
+        with open(test_file) as f:
+            assert f.read().splitlines() == [str(item), str(max), 'lazy']
+
+    def test_pool(self, tmp_path):
+        import logging
+
+        first = loglib('test_loglib_pool', context='first')
+        second = loglib('test_loglib_pool', context='second')
+        first.start_log(str(tmp_path / 'first.log'))
+        first.i('1')
+        second.i('2')
+        first.e('3')
+        # one console handler for both, file handler gets its own context only
+        assert first.consolehandler is second.consolehandler and len(first.logger.handlers) == 2
+        first.close()
+        second.i('4')
+        second.close()
+        assert first.logger.handlers == [] and 'test_loglib_pool' not in loglib.pools
+        with open(tmp_path / 'first.log') as f:
+            assert f.read().splitlines() == ['1', '3']
+
+        # logging after close does not take the pool again, start_console() does
+        second.i('5')
+        assert second.logger.handlers == [] and 'test_loglib_pool' not in loglib.pools
+        second.start_console()
+        assert len(second.logger.handlers) == 1 and loglib.pools['test_loglib_pool'].refs == 1
+        second.close()
+        assert logging.getLogger('test_loglib_pool').handlers == []
+
+    def test_pool_level(self):
+        import logging
+
+        first = loglib('test_loglib_level')
+        assert first.logger.level == logging.DEBUG
+        first.setlevel(logging.WARNING)
+        # a new instance of the same module keeps the level
+        second = loglib('test_loglib_level')
+        assert first.logger.level == logging.WARNING and not second.logger.isEnabledFor(logging.DEBUG)
+        first.close()
+        second.close()
+        third = loglib('test_loglib_level')
+        assert third.logger.level == logging.WARNING
+        third.setlevel(logging.DEBUG)
+        third.close()
+
+    def test_pool_cycles(self):
+        import gc
+        import logging
+        import tracemalloc
+
+        from serlib import serlib
+        from vslib import vslib, vssynthetic
+
+        def cycle(i: int):
+            # reconnect camera and serial port
+            with vslib(vssynthetic(16, 16, paced=False)) as vs:
+                vs.read()
+            port = serlib(f'/dev/no_such_port_{i}')
+            port.close()
+
+        cycle(0)
+        loggers = len(logging.Logger.manager.loggerDict)
+        handlers = len(logging.getLogger('vslib').handlers), len(logging.getLogger('serlib').handlers)
+        # pytest keeps every propagated record
+        for name in ('vslib', 'serlib'):
+            logging.getLogger(name).propagate = False
+        try:
+            gc.collect()
+            tracemalloc.start()
+            for i in range(50):
+                cycle(i)
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            for i in range(500):
+                cycle(i)
+            gc.collect()
+            growth = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+        finally:
+            for name in ('vslib', 'serlib'):
+                logging.getLogger(name).propagate = True
+        assert len(logging.Logger.manager.loggerDict) == loggers
+        assert (len(logging.getLogger('vslib').handlers), len(logging.getLogger('serlib').handlers)) == handlers
+        assert growth < 100_000, growth
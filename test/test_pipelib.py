@@ -0,0 +1,85 @@
+import operator
+import threading
+import time
+
+import numpy as np
+
+from imagelib import imagelib
+from pipelib import pipelib
+
+
+class Test_pipelib:
+    def test_stages(self):
+        results = []
+        with pipelib() as pipe:
+            pipe.add('square', lambda x: x * x, workers=3)
+            # odd items are dropped by returning None
+            pipe.add('even', lambda x: x if x % 2 == 0 else None)
+            pipe.add('sink', results.append)
+            pipe.start()
+            assert pipe.feed(range(20)) == 20
+        assert sorted(results) == [x * x for x in range(0, 20, 2)]
+        stats = pipe.getstats()
+        assert stats['square']['in'] == stats['square']['out'] == stats['even']['in'] == 20
+        assert stats['sink']['out'] == 10 and stats['sink']['throughput'] > 0
+        assert not pipe.put(1)
+
+    def test_invalid(self):
+        pipe = pipelib()
+        assert pipe.start() is None
+        assert pipe.add('a', abs, mode='fiber') is None
+        assert pipe.add('a', abs, policy='drop_newest') is None
+        assert pipe.add('a', abs) is pipe and pipe.start() is pipe
+        assert pipe.add('b', abs) is None
+        pipe.join()
+
+    def test_errors(self):
+        results = []
+        with pipelib() as pipe:
+            pipe.add('div', lambda x: 10 // x).add('sink', results.append)
+            pipe.start()
+            pipe.feed([1, 0, 2])
+        assert sorted(results) == [5, 10]
+        assert pipe.getstats()['div']['errors'] == 1
+
+    def test_drop_oldest(self):
+        results = []
+        gate = threading.Event()
+
+        def slow(x):
+            gate.wait()
+            results.append(x)
+
+        with pipelib() as pipe:
+            pipe.add('sink', slow, queue_size=2, policy='drop_oldest')
+            pipe.start()
+            # never blocks, sink is stuck on first item and keeps the latest 2
+            assert pipe.feed(range(10)) == 10
+            gate.set()
+        stats = pipe.getstats()['sink']
+        assert results[-2:] == [8, 9] and stats['dropped'] == 10 - len(results)
+
+    def test_block(self):
+        gate = threading.Event()
+        with pipelib() as pipe:
+            pipe.add('sink', lambda x: gate.wait(), queue_size=2)
+            pipe.start()
+            assert pipe.feed(range(3)) == 3
+            # worker holds 1 item and queue is full: backpressure
+            start = time.perf_counter()
+            assert not pipe.put(3, timeout=0.1)
+            assert time.perf_counter() - start >= 0.1
+            gate.set()
+        stats = pipe.getstats()['sink']
+        assert stats['out'] == 3 and stats['dropped'] == 0 and stats['wait_avg'] > 0
+
+    def test_process(self):
+        results = []
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        with pipelib() as pipe:
+            pipe.add('neg', operator.neg, workers=2, mode='process')
+            pipe.add('rgb565', lambda x: len(imagelib.bgr8882rgb565(frame)) - x)
+            pipe.add('sink', results.append)
+            pipe.start()
+            pipe.feed(range(5))
+        assert sorted(results) == [48 * 64 * 2 + x for x in range(5)]
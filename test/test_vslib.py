@@ -0,0 +1,407 @@
+import multiprocessing
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from vslib import vslib, vsgroup, vspublisher, vssubscriber, vsrecorder, vssource, vssynthetic, vsclip, vsimages, \
+    vschange
+
+
+class Test_vslib:
+    width = 64
+    height = 48
+    count = 20
+
+    @pytest.fixture
+    def video(self, tmp_path):
+        """
+        mjpg video, frame i is filled with i * 10
+        """
+        file_name = str(tmp_path / 'video.avi')
+        writer = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*'MJPG'), 30, (self.width, self.height))
+        for i in range(self.count):
+            writer.write(np.full((self.height, self.width, 3), i * 10, dtype=np.uint8))
+        writer.release()
+        return file_name
+
+    @staticmethod
+    def index(frame):
+        return int(round(frame.mean() / 10))
+
+    def test_ring(self, video):
+        with vslib(video, slots=3) as vs:
+            assert len(vs.slots) == 3
+            with vs.borrow() as frame:
+                assert self.index(frame) == 0
+                assert not frame.flags.writeable
+                assert np.shares_memory(frame, vs.slots[0])
+
+            borrowed = vs.borrow()
+            vs.start()
+            time.sleep(0.5)
+            # borrowed slot is never refilled, capture went on with the other slots
+            assert self.index(borrowed.frame) == 0
+            assert vs.latest != borrowed.slot
+            borrowed.release()
+            assert not any(vs.pins)
+
+            frame = vs.read()
+            assert frame.flags.writeable and not any(np.shares_memory(frame, slot) for slot in vs.slots)
+            vs.stop()
+            assert self.index(frame) == self.count - 1
+
+    def test_copy_mode(self, video):
+        with vslib(video) as vs:
+            assert vs.borrow() is None
+            assert self.index(vs.read()) == 0
+
+    @pytest.mark.parametrize('slots', [0, 3])
+    def test_read_next(self, video, slots):
+        with vslib(video, slots=slots) as vs:
+            # nothing new until capture starts
+            assert vs.read_next(timeout=0.05, seq=1) is None
+            vs.start()
+            seqs = []
+            while True:
+                frame = vs.read_next(timeout=2)
+                if frame is None:
+                    break
+                assert self.index(frame.frame) == frame.seq - 1
+                seqs.append(frame.seq)
+                frame.release()
+                time.sleep(0.002)
+            vs.stop()
+            stats = vs.getstats()
+            assert seqs == sorted(set(seqs)) and seqs[-1] == self.count
+            assert stats['captured'] == self.count and stats['duplicated'] == 0
+            assert stats['dropped'] + len(seqs) == self.count
+
+            if slots:
+                for _ in range(2):
+                    vs.borrow().release()
+                assert vs.getstats()['duplicated'] == 2
+
+    def test_ring_capture_dropped(self):
+        with vslib(vssynthetic(64, 48, fps=200), slots=3) as vs:
+            vs.start()
+            held = [vs.read_next(timeout=2), vs.read_next(timeout=2)]
+            # latest slot and both borrowed slots are taken, capture drops frames
+            deadline = time.monotonic() + 2
+            while not vs.capture_dropped and time.monotonic() < deadline:
+                time.sleep(0.005)
+            published = vs.slot_seq[vs.latest]
+            assert vs.capture_dropped and vs.seq > published
+            # dropped frames are never delivered, no duplicate of the latest one
+            assert vs.read_next(timeout=0.05, seq=published) is None
+            delivered = vs.read_seq
+            for frame in held:
+                frame.release()
+            frame = vs.read_next(timeout=2, seq=published)
+            assert frame.seq > published + 1 and vs.getstats()['duplicated'] == 0
+            assert vs.getstats()['dropped'] >= frame.seq - delivered - 1
+            frame.release()
+
+    def test_prefetch(self, video):
+        with vslib(video) as vs:
+            assert vs.read_prefetch() is None
+            assert vs.prefetch(depth=2) is vs
+            assert vs.prefetch() is None
+            seqs = []
+            while True:
+                frame = vs.read_prefetch(timeout=2)
+                if frame is None:
+                    break
+                with frame as image:
+                    assert self.index(image) == frame.seq - 1
+                seqs.append(frame.seq)
+            assert seqs == list(range(1, self.count + 1))
+            assert not vs.grabbed and vs.read_prefetch() is None
+            assert vs.getstats()['dropped'] == 0
+
+        # paced to 30 fps, 20 frames are due over 19 / 30 seconds
+        with vslib(video) as vs:
+            vs.prefetch(paced=True)
+            start = time.perf_counter()
+            count = 0
+            while (frame := vs.read_prefetch(timeout=2)) is not None:
+                frame.release()
+                count += 1
+            assert count == self.count and 0.6 <= time.perf_counter() - start < 1.5
+
+    def test_seek(self, tmp_path):
+        # inter-frame codec, frame i shows i // 10 on the left half and i % 10 on the right half
+        file_name = str(tmp_path / 'seek.mp4')
+        writer = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*'mp4v'), 30, (self.width, self.height))
+        for i in range(60):
+            frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            frame[:, :self.width // 2], frame[:, self.width // 2:] = i // 10 * 25, i % 10 * 25
+            writer.write(frame)
+        writer.release()
+
+        def index(frame):
+            half = self.width // 2
+            return int(round(frame[:, :half].mean() / 25)) * 10 + int(round(frame[:, half:].mean() / 25))
+
+        with vslib(file_name) as vs:
+            assert vs.seek_index()['count'] == 60
+            for i in (59, 3, 4, 40, 10, 0, -1):
+                assert index(vs.read_at(i)) == i % 60
+            assert vs.read_at(60) is None
+            assert [(i, index(frame)) for i, frame in vs.iter_frames(5, 50, 11)] == \
+                [(i, i) for i in range(5, 50, 11)]
+            assert vs.frame_at(1000) == 30
+        assert (tmp_path / '.seek.mp4.vsindex.json').is_file()
+
+        # cached index is used by next open
+        with vslib(file_name) as vs:
+            index_file = tmp_path / '.seek.mp4.vsindex.json'
+            index_file.write_text(index_file.read_text().replace('"count":60', '"count":59'))
+            assert vs.seek_index()['count'] == 59
+
+        with vslib(str(tmp_path / 'none.mp4')) as vs:
+            assert vs.seek_index() is None
+
+    def test_group(self, video, tmp_path):
+        short = str(tmp_path / 'short.avi')
+        writer = cv2.VideoWriter(short, cv2.VideoWriter_fourcc(*'MJPG'), 30, (self.width, self.height))
+        for i in range(10):
+            writer.write(np.full((self.height, self.width, 3), i * 10, dtype=np.uint8))
+        writer.release()
+
+        with vsgroup([video, video, short], max_failures=3) as group:
+            assert group.is_opened()
+            assert group.read_next(timeout=0.05) is None
+            group.start()
+            sets = []
+            # capture keeps retrying ended files, no set without a frame
+            while (frames := group.read_next(timeout=0.5)) is not None:
+                assert len({frame.seq for frame in frames}) == 1
+                sets.append([None if frame.frame is None else self.index(frame.frame) for frame in frames])
+            stats = group.getstats()
+            assert group.started
+
+        # files are read in lockstep, first frame of each was read by vslib()
+        assert all(s[0] == s[1] for s in sets if s[0] is not None)
+        assert all(s[0] == s[2] for s in sets if s[2] is not None)
+        assert [source['frames'] for source in stats['sources']] == [self.count - 1, self.count - 1, 9]
+        assert not any(source['healthy'] for source in stats['sources'])
+        assert stats['sets'] == self.count - 1 and stats['skew_max'] >= stats['skew_avg'] >= 0
+
+    def test_group_retry(self):
+        class flaky(vssynthetic):
+            def __init__(self):
+                super().__init__(16, 16, fps=100, pattern='solid')
+                self.down = False
+
+            def grab(self):
+                return not self.down and super().grab()
+
+        sources = [flaky(), flaky()]
+        with vsgroup(sources, max_failures=3) as group:
+            group.start()
+            assert group.read_next(timeout=1) is not None
+            for source in sources:
+                source.down = True
+            # every source unhealthy, capture waits for the retry once per second
+            time.sleep(0.3)
+            stats = group.getstats()
+            assert group.started and not any(source['healthy'] for source in stats['sources'])
+            assert [source['failures'] for source in stats['sources']] == [3, 3]
+            # last set before sources went down
+            group.read_next(timeout=0)
+            sources[1].down = False
+            frames = group.read_next(timeout=2)
+            assert frames[0].frame is None and frames[1].frame is not None
+            # failed source has no grab time, not a stale one
+            assert frames[0].timestamp is None and frames[1].timestamp > 0
+            stats = group.getstats()
+            assert [source['healthy'] for source in stats['sources']] == [False, True]
+            # source 0 is skipped until its retry is due: no failure and no grab time per set
+            time.sleep(0.2)
+            assert group.getstats()['sources'][0]['failures'] <= 5
+            assert group.grab_times[0] - group.retry_times[0] < 0.05
+
+    def test_shared_memory(self, video):
+        with vspublisher(self.width, self.height, slots=4) as publisher:
+            with vssubscriber(publisher.name) as subscriber:
+                assert subscriber.is_opened() and subscriber.shape == (self.height, self.width, 3)
+                assert subscriber.read_next(timeout=0.01) is None
+                for i in range(3):
+                    publisher.publish(np.full((self.height, self.width, 3), i, dtype=np.uint8))
+                frame = subscriber.read_next(timeout=0)
+                assert frame.seq == 1 and frame.frame[0, 0, 0] == 0 and not frame.frame.flags.writeable
+                assert frame.frame is subscriber.frames[frame.slot]
+                # lap the ring, frame 1 is overwritten and 2, 3 are dropped
+                for i in range(3, 8):
+                    publisher.publish(np.full((self.height, self.width, 3), i, dtype=np.uint8))
+                assert not subscriber.is_valid(frame)
+                frame = subscriber.read_next(timeout=0)
+                assert frame.seq == 6 and frame.frame[0, 0, 0] == 5 and subscriber.dropped == 4
+                assert publisher.publish(np.zeros((2, 2, 3), dtype=np.uint8)) == -1
+        assert not vssubscriber('no_such_ring').is_opened()
+
+        # close while a frame is still held, shared memory is closed once the frame is gone
+        with vspublisher(self.width, self.height, slots=4) as publisher:
+            subscriber = vssubscriber(publisher.name)
+            publisher.publish(np.full((self.height, self.width, 3), 9, dtype=np.uint8))
+            frame = subscriber.read_next(timeout=0)
+            subscriber.close()
+            assert not subscriber.is_opened() and len(vspublisher.pending) == 1
+            assert frame.frame[0, 0, 0] == 9
+            del frame
+        assert vspublisher.pending == []
+
+        # capture into shared memory, two worker processes split the frames
+        with vslib(video) as vs, vspublisher(self.width, self.height, slots=self.count + 1) as publisher:
+            ctx = multiprocessing.get_context('spawn')
+            results = ctx.Queue()
+            workers = [ctx.Process(target=subscribe, args=(publisher.name, i, 2, results)) for i in range(2)]
+            for worker in workers:
+                worker.start()
+            publisher.start(vs)
+            seqs = sorted(sum((results.get(timeout=30) for _ in workers), []))
+            for worker in workers:
+                worker.join()
+        assert seqs == [(seq, seq - 1) for seq in range(1, self.count + 1)]
+
+    @pytest.mark.parametrize('mode', ['thread', 'process'])
+    def test_recorder(self, video, tmp_path, mode):
+        # 10 fps, 0.5 second segments of 5 frames
+        file_name = str(tmp_path / 'record.avi')
+        with vslib(video) as vs, vsrecorder(file_name, fps=10, queue_size=self.count, segment_seconds=0.5,
+                                            mode=mode) as recorder:
+            vs.prefetch()
+            while (frame := vs.read_prefetch(timeout=2)) is not None:
+                assert recorder.write(frame)
+                frame.release()
+        assert not recorder.write(np.zeros((self.height, self.width, 3), dtype=np.uint8))
+        stats = recorder.getstats()
+        assert stats['written'] == stats['queued'] == self.count and stats['dropped'] == 0
+        assert stats['segments'] == [str(tmp_path / f'record_{i:04}.avi') for i in range(4)]
+        indexes = []
+        for segment in stats['segments']:
+            stream = cv2.VideoCapture(segment)
+            while (frame := stream.read()[1]) is not None:
+                indexes.append(self.index(frame))
+            stream.release()
+        assert indexes == list(range(self.count))
+
+    def test_recorder_drop(self, tmp_path):
+        # noise frames compress badly, a full queue drops instead of blocking
+        frame = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        with vsrecorder(str(tmp_path / 'noise.avi'), queue_size=2) as recorder:
+            for _ in range(30):
+                recorder.write(frame)
+        stats = recorder.getstats()
+        assert stats['dropped'] > 0 and stats['written'] + stats['dropped'] == 30 and stats['queue_max'] <= 2
+
+        # about 200 KB per frame (900 KB raw), first segment is cut by raw bytes, later ones by file bytes
+        for mode in ('thread', 'process'):
+            with vsrecorder(str(tmp_path / f'{mode}.avi'), queue_size=6, segment_bytes=500_000,
+                            mode=mode) as recorder:
+                for _ in range(6):
+                    recorder.write(frame)
+            stats = recorder.getstats()
+            assert stats['written'] == 6 and len(stats['segments']) == 3
+
+    def test_sources(self, video, tmp_path):
+        # synthetic camera: paced, frame index in pixels, ring mode decodes into slots
+        source = vssynthetic(self.width, self.height, fps=50, pattern='solid', count=self.count)
+        with vslib(source, slots=3) as vs:
+            assert vs.getinfo() == (self.width, self.height, 50, self.count)
+            start = time.perf_counter()
+            vs.start()
+            seqs = []
+            while (frame := vs.read_next(timeout=1)) is not None:
+                with frame as image:
+                    assert image[0, 0, 0] == frame.seq - 1
+                seqs.append(frame.seq)
+            vs.stop()
+            # 19 frames after the first one at 50 fps
+            assert seqs[-1] == self.count and time.perf_counter() - start >= 0.35
+        for pattern in vssynthetic.PATTERNS:
+            stream = vssynthetic(32, 16, pattern=pattern, paced=False)
+            first, second = stream.read()[1], stream.read()[1]
+            assert first.shape == (16, 32, 3) and not np.array_equal(first, second)
+            assert stream.get(cv2.CAP_PROP_POS_FRAMES) == 2
+
+        # in memory clip of the test video, seekable, retrieve into given image
+        clip = vsclip.from_file(video)
+        assert clip.count == self.count and clip.fps == 30
+        with vslib(clip) as vs:
+            vs.prefetch()
+            indexes = []
+            while (frame := vs.read_prefetch(timeout=1)) is not None:
+                with frame as image:
+                    indexes.append(self.index(image))
+            assert indexes == list(range(self.count))
+        clip = vsclip(clip.frames, loop=True)
+        assert clip.set(cv2.CAP_PROP_POS_FRAMES, self.count - 1)
+        image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        assert [self.index(clip.read(image)[1]) for _ in range(2)] == [self.count - 1, 0]
+        assert clip.read(image)[1] is image
+
+        # image folder
+        for i in range(3):
+            cv2.imwrite(str(tmp_path / f'{i:02}.png'), np.full((self.height, self.width, 3), i * 10, dtype=np.uint8))
+        with vslib(vsimages(str(tmp_path), '*.png')) as vs:
+            assert [self.index(vs.frame)] + [self.index(vs._read()) for _ in range(2)] == [0, 1, 2]
+            assert vs._read() is None and not vs.grabbed
+        assert not vsimages(str(tmp_path), '*.jpg').isOpened()
+
+        # a path object is a file, not a source object
+        import pathlib
+        with vslib(pathlib.Path(video)) as vs:
+            assert vs.src == video and vs.getinfo()[3] == self.count and self.index(vs.frame) == 0
+
+        # _retrieve() is abstract, a source without it fails when created
+        class nosource(vssource):
+            pass
+
+        with pytest.raises(TypeError):
+            nosource(16, 16, 30, 0, False)
+
+    @pytest.mark.parametrize('mode', ['prefetch', 'copy', 'ring'])
+    def test_change(self, mode):
+        # 4 static scenes of 5 frames, sensor noise of +-1 level
+        noise = np.random.default_rng(0).integers(0, 2, (10, self.height, self.width, 3), dtype=np.uint8)
+        frames = [noise[i % 10] + scene * 50 for scene in range(4) for i in range(5)]
+        source = vsclip(frames, fps=100, paced=mode != 'prefetch')
+        with vslib(source, slots=3 if mode == 'ring' else 0) as vs:
+            vs.set_filter(vschange(threshold=10))
+            if mode == 'prefetch':
+                vs.prefetch()
+                read = vs.read_prefetch
+            else:
+                vs.start()
+                read = vs.read_next
+            seqs = []
+            while (frame := read(timeout=1)) is not None:
+                seqs.append(frame.seq)
+                frame.release()
+            vs.stop()
+            stats = vs.getstats()
+        # one frame per scene, live capture may drop the first frame of a scene
+        assert [(seq - 1) // 5 for seq in seqs] == [0, 1, 2, 3]
+        assert mode != 'prefetch' or seqs == [1, 6, 11, 16]
+        assert stats['skipped'] == vs.change.skipped == 16 - stats['dropped']
+        change = vs.change.getstats()
+        assert change['emitted'] == 4 and 0 < change['score_avg'] < 10 <= change['score_max']
+
+        change = vschange(threshold=10, max_skip=2)
+        assert [change.check(frame) for frame in frames[:5]] == [True, False, False, True, False]
+
+
+def subscribe(name: str, worker: int, workers: int, results):
+    """
+    subscriber process of test_shared_memory, (seq, frame index) of every frame it got
+    """
+    got = []
+    with vssubscriber(name, worker, workers) as subscriber:
+        while (frame := subscriber.read_next(timeout=5)) is not None:
+            got.append((frame.seq, Test_vslib.index(frame.frame)))
+            if frame.seq + workers > Test_vslib.count:
+                break
+    results.put(got)
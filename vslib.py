@@ -1,25 +1,452 @@
-from threading import Thread, Lock
+from abc import ABC, abstractmethod
+from threading import Thread, Lock, Condition
 
-import cv2
-import datetime
+import os
+import queue
+import struct
+import time
 
+from lazylib import lazylib
 from loglib import loglib
 
+# cv2 and numpy are imported on first use
+cv2 = lazylib.load('cv2')
+np = lazylib.load('numpy')
+
+# cv2 (ffmpeg) seek to frame i restarts decoding from the keyframe before i - SEEK_FRAMES
+SEEK_FRAMES = 16
+# seek index cache version, bump when layout changes
+SEEK_INDEX_VERSION = 1
+
+# shared memory ring: magic, version, slots, width, height, channel, published seq, then per slot (seq, time)
+SHM_HEADER_FMT = '<4sHHIIIQ'
+SHM_HEADER_SIZE = 64
+SHM_MAGIC = b'PYVS'
+SHM_VERSION = 1
+# offset of published seq in header
+SHM_SEQ_OFFSET = 24
+
+
+class vsframe:
+    """
+    Frame of vslib with its sequence number and capture time.
+
+    In ring and prefetch mode it is a borrowed view of a preallocated slot (no copy), the slot is not
+    refilled until release(), so keep it short or copy the frame to keep it. In copy mode it owns a copy
+    and release() does nothing.
+    """
+
+    def __init__(self, frame, seq: int = 0, timestamp: float = 0.0, slot: int = -1, release=None):
+        """
+        Parameters
+        ----------
+        frame : np.ndarray
+            frame
+        seq : int
+            sequence number, 1 is first captured frame
+        timestamp : float
+            capture time (time.monotonic()), media time in seconds for prefetched frames, None if no frame
+            (vsgroup source failed)
+        slot : int
+            slot index, -1 if frame is a copy
+        release : callable
+            release(vsframe) gives the slot back, None if frame is a copy
+        """
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp
+        self.slot = slot
+        self._release = release
+
+    def release(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(self)
+
+    # region [with]
+    def __enter__(self):
+        return self.frame
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+    # endregion [with]
+
+
+class vssource(ABC):
+    """
+    Base of frame sources usable as vslib(src) in place of cv2.VideoCapture (headless tests and benchmarks).
+
+    Same interface as cv2.VideoCapture: read(image=), grab(), retrieve(image=), get(), set(), isOpened(),
+    release(). Subclasses implement _retrieve(i, out) to write frame i into out. grab() only moves the position
+    (like a camera grab), retrieve() renders/copies into image when its shape matches (no allocation).
+
+    [pace]
+        paced=True makes grab() wait until the next frame is due at fps, like a camera, otherwise frames are
+        delivered as fast as they are read, like a file.
+    """
+    slogger = loglib(__name__)
+
+    def __init__(self, width: int, height: int, fps: float, count: int, paced: bool, loop: bool = False):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        # frames, 0 is endless
+        self.count = count
+        self.paced = paced
+        self.loop = loop
+        # frames grabbed, frame pos - 1 is the current one
+        self.pos = 0
+        self.due = None
+        self.opened = True
+
+    @abstractmethod
+    def _retrieve(self, i: int, out):
+        """
+        write frame i (0 <= i < count, any i if endless) into out (height, width, 3) uint8
+        """
+
+    def grab(self):
+        if not self.opened or (self.count and not self.loop and self.pos >= self.count):
+            return False
+        if self.paced:
+            now = time.monotonic()
+            self.due = now if self.due is None else self.due + 1 / self.fps
+            if self.due > now:
+                time.sleep(self.due - now)
+        self.pos += 1
+        return True
+
+    def retrieve(self, image=None, flag: int = 0):
+        if not self.opened or self.pos == 0:
+            return False, None
+        if image is None or image.shape != (self.height, self.width, 3) or image.dtype != np.uint8:
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        i = self.pos - 1
+        self._retrieve(i % self.count if self.count else i, image)
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, propid: int):
+        props = {
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_COUNT: self.count if self.count else -1,
+            cv2.CAP_PROP_POS_FRAMES: self.pos,
+            cv2.CAP_PROP_POS_MSEC: max(self.pos - 1, 0) * 1000 / self.fps,
+        }
+        return float(props.get(propid, 0))
+
+    def set(self, propid: int, value):
+        if propid == cv2.CAP_PROP_POS_FRAMES and (not self.count or 0 <= value <= self.count):
+            self.pos = int(value)
+            self.due = None
+            return True
+        if propid == cv2.CAP_PROP_FPS and value > 0:
+            self.fps = value
+            return True
+        return False
+
+    def isOpened(self):
+        return self.opened
+
+    def release(self):
+        self.opened = False
+
+
+class vssynthetic(vssource):
+    """
+    Generated frames, like a camera (paced) of any resolution and fps.
+
+    [pattern]
+        'gradient': gradient moving 4 pixels per frame
+        'bars': color bars with a moving white line
+        'noise': random frames (worst case for codecs, 8 frames cycle)
+        'solid': frame i is filled with i % 256 (frame index is readable from pixels)
+    """
+    PATTERNS = ('gradient', 'bars', 'noise', 'solid')
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30, pattern: str = 'gradient',
+                 count: int = 0, paced: bool = True):
+        """
+        Parameters
+        ----------
+        width : int
+            frame width
+        height : int
+            frame height
+        fps : float
+            frame rate
+        pattern : str
+            see [pattern]
+        count : int
+            frames before end of stream, 0 is endless
+        paced : bool
+            deliver frames at fps, see [pace]
+        """
+        super().__init__(width, height, fps, count, paced)
+        if pattern not in vssynthetic.PATTERNS:
+            vssource.slogger.error(f'unknown pattern {pattern}, use gradient!!!')
+            pattern = 'gradient'
+        self.pattern = pattern
+        self.base = None
+        if pattern == 'gradient':
+            # twice as wide, frame is a moving window of it
+            x = np.arange(width * 2) * 255 // max(width * 2 - 1, 1)
+            y = np.arange(height) * 255 // max(height - 1, 1)
+            self.base = np.empty((height, width * 2, 3), dtype=np.uint8)
+            self.base[..., 0] = x
+            self.base[..., 1] = y[:, None]
+            self.base[..., 2] = (x + y[:, None]) // 2
+        elif pattern == 'bars':
+            colors = np.array([[255, 255, 255], [0, 255, 255], [255, 255, 0], [0, 255, 0], [255, 0, 255],
+                               [0, 0, 255], [255, 0, 0], [0, 0, 0]], dtype=np.uint8)
+            self.base = np.ascontiguousarray(
+                np.broadcast_to(colors[np.arange(width) * 8 // width], (height, width, 3)))
+        elif pattern == 'noise':
+            self.base = np.random.default_rng(0).integers(0, 256, (8, height, width, 3), dtype=np.uint8)
+
+    def _retrieve(self, i: int, out):
+        if self.pattern == 'gradient':
+            offset = i * 4 % self.width
+            out[...] = self.base[:, offset:offset + self.width]
+        elif self.pattern == 'bars':
+            out[...] = self.base
+            out[:, i * 4 % self.width] = 255
+        elif self.pattern == 'noise':
+            out[...] = self.base[i % 8]
+        else:
+            out.fill(i % 256)
+
+
+class vsclip(vssource):
+    """
+    In-memory clip, frames are copied out of a list of frames (decoded once, no decode per read).
+    """
+
+    def __init__(self, frames: list, fps: float = 30, loop: bool = False, paced: bool = False):
+        """
+        Parameters
+        ----------
+        frames : list
+            frames (np.ndarray, same shape, uint8 bgr)
+        fps : float
+            frame rate
+        loop : bool
+            restart at end instead of ending
+        paced : bool
+            deliver frames at fps, see [pace]
+        """
+        height, width = frames[0].shape[:2] if len(frames) else (0, 0)
+        super().__init__(width, height, fps, len(frames), paced, loop)
+        self.frames = frames
+        self.opened = len(frames) > 0
+
+    @staticmethod
+    def from_file(file_name: str, count: int = 0, **kwargs):
+        """
+        decode (first count, 0 is all) frames of a video file into a clip
+        """
+        stream = cv2.VideoCapture(os.fspath(file_name))
+        fps = stream.get(cv2.CAP_PROP_FPS) or 30
+        frames = []
+        while (not count or len(frames) < count) and (frame := stream.read()[1]) is not None:
+            frames.append(frame)
+        stream.release()
+        return vsclip(frames, kwargs.pop('fps', fps), **kwargs)
+
+    def _retrieve(self, i: int, out):
+        out[...] = self.frames[i]
+
+
+class vsimages(vssource):
+    """
+    Directory of images (sorted by name) as a stream, an image is read when its frame is retrieved.
+    """
+
+    def __init__(self, folder: str, pattern: str = '*', fps: float = 30, loop: bool = False, paced: bool = False):
+        """
+        Parameters
+        ----------
+        folder : str
+            image folder
+        pattern : str
+            glob pattern of image files, e.g. '*.png'
+        fps : float
+            frame rate
+        loop : bool
+            restart at end instead of ending
+        paced : bool
+            deliver frames at fps, see [pace]
+        """
+        import glob
+
+        self.files = sorted(f for f in glob.glob(os.path.join(folder, pattern)) if os.path.isfile(f))
+        first = cv2.imread(self.files[0]) if self.files else None
+        if first is None:
+            vssource.slogger.error(f'no image in {folder}/{pattern}!!!')
+        height, width = first.shape[:2] if first is not None else (0, 0)
+        super().__init__(width, height, fps, len(self.files), paced, loop)
+        self.opened = first is not None
+
+    def _retrieve(self, i: int, out):
+        image = cv2.imread(self.files[i])
+        if image is None or image.shape != out.shape:
+            vssource.slogger.error(f'cannot read {self.files[i]} as {out.shape}!!!')
+            out.fill(0)
+            return
+        out[...] = image
+
+
+class vschange:
+    """
+    Change detection to skip near-duplicate frames, see vslib.set_filter().
+
+    [signature]
+        luma of width x height pixels sampled on a grid (nearest, cv2.INTER_NEAREST), it touches width * height
+        pixels instead of the whole frame, so it costs about the same for any resolution. Changes smaller than
+        the grid step (frame size / signature size) can be missed, use a bigger signature for small objects.
+
+    [score]
+        mean absolute difference (0 ~ 255) between the signature of a frame and of the last emitted frame, a frame
+        is emitted when score >= threshold (slow drift adds up until it is emitted), or after max_skip skipped
+        frames in a row.
+    """
+
+    def __init__(self, threshold: float = 3.0, width: int = 64, height: int = 36, max_skip: int = 0):
+        """
+        Parameters
+        ----------
+        threshold : float
+            min score of an emitted frame
+        width : int
+            signature width
+        height : int
+            signature height
+        max_skip : int
+            emit a frame after max_skip skipped frames in a row, 0 is no limit
+        """
+        self.threshold = threshold
+        self.size = (width, height)
+        self.max_skip = max_skip
+        # signature of last emitted frame
+        self.reference = None
+        self.run = 0
+        # stats
+        self.frames = 0
+        self.emitted = 0
+        self.skipped = 0
+        self.score = 0.0
+        self.score_sum = 0.0
+        self.score_max = 0.0
+
+    def signature(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_NEAREST)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def check(self, frame):
+        """
+        score frame against the last emitted frame.
+
+        Returns
+        -------
+        bool
+            True if frame is emitted (changed), False if skipped
+        """
+        signature = self.signature(frame)
+        self.frames += 1
+        if self.reference is None:
+            self.score = 0.0
+            changed = True
+        else:
+            self.score = float(cv2.absdiff(signature, self.reference).mean())
+            self.score_sum += self.score
+            self.score_max = max(self.score_max, self.score)
+            changed = self.score >= self.threshold or (self.max_skip and self.run >= self.max_skip)
+        if changed:
+            self.reference = signature
+            self.emitted += 1
+            self.run = 0
+        else:
+            self.skipped += 1
+            self.run += 1
+        return bool(changed)
+
+    def reset(self):
+        """
+        emit next frame whatever its score
+        """
+        self.reference = None
+
+    def getstats(self):
+        """
+        Returns
+        -------
+        dict
+            frames (checked), emitted, skipped, score (last), score_avg, score_max
+        """
+        scored = self.frames - 1 if self.frames else 0
+        return {'frames': self.frames, 'emitted': self.emitted, 'skipped': self.skipped, 'score': self.score,
+                'score_avg': self.score_sum / scored if scored else 0.0, 'score_max': self.score_max}
+
 
 class vslib:
     """
     The library for camera video stream.
 
     reference: https://gist.github.com/allskyee/7749b9318e914ca45eb0a1000a81bf56
+
+    [ring mode]
+        slots > 0 preallocates slots frames, the capture thread decodes into them with stream.read(image=slot)
+        and borrow() lends the latest one as a view, no allocation or copy per frame on either side.
+        Capture never writes the latest slot or a borrowed (pinned) slot, pin and publish are ordered so
+        reader and writer do not need a lock (each side re-checks the other's flag after setting its own).
+
+    [sequence]
+        every captured frame gets seq (1, 2, ...) and capture time, read_next() waits for a frame newer than
+        the last one delivered. Delivered frames update dropped (captured but never delivered) and duplicated
+        (same frame delivered again) counters, they assume one consumer (see getstats()).
+
+    [prefetch]
+        for file sources, prefetch() decodes ahead on a background thread into depth preallocated slots and
+        read_prefetch() takes them in order, so decode overlaps the caller's per-frame work. The slot pool is
+        the backpressure: the decoder waits when every slot is queued or borrowed.
+
+    [seek]
+        seek_index() records frame times and keyframes of a file once (packets only, no decode) and caches them
+        in .{file name}.vsindex.json next to the file. A cv2 seek decodes forward from a keyframe before the
+        target anyway, so read_at(i) grabs forward (no retrieve) when the stream is already past that keyframe,
+        and seeks only when decoding forward would cost more.
+
+    [change]
+        set_filter(vschange()) makes read_next() and read_prefetch() skip frames whose luma signature did not change
+        (static scene), in copy mode a skipped frame is not even copied.
     """
 
-    def __init__(self, src=0, width: int = 0, height: int = 0):
+    def __init__(self, src=0, width: int = 0, height: int = 0, slots: int = 0):
+        """
+        Parameters
+        ----------
+        src : int or str or os.PathLike or vssource
+            camera index, video file/url, or a source with cv2.VideoCapture interface (vssynthetic, vsclip,
+            vsimages)
+        width : int
+            capture width (camera)
+        height : int
+            capture height (camera)
+        slots : int
+            number of preallocated frames for ring mode (borrow()), 0 is copy mode (read() only),
+            at least 3 (latest, being written, one borrowed)
+        """
         self.update_thread = None
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S.%f')
-        self.logger = loglib(f'{__name__}_time{timestamp}')
+        self.logger = loglib(__name__, context=f'vslib@{id(self):x}')
 
-        self.src = src
-        self.stream = cv2.VideoCapture(src)
+        self.src = os.fspath(src) if isinstance(src, os.PathLike) else src
+        self.stream = cv2.VideoCapture(self.src) if isinstance(self.src, (int, str)) else self.src
         if width and height:
             self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, width)
             self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
@@ -28,40 +455,278 @@ class vslib:
         self.started = False
         self.read_lock = Lock()
 
+        # sequence of latest frame and its capture time, notified on every new frame
+        self.seq = 1 if self.grabbed else 0
+        self.timestamp = time.monotonic()
+        self.new_frame = Condition(self.read_lock)
+        # consumer counters
+        self.read_seq = 0
+        self.dropped = 0
+        self.duplicated = 0
+        # ring mode frames dropped by capture because every slot was borrowed
+        self.capture_dropped = 0
+
+        # ring mode
+        self.slots = []
+        self.pins = []
+        self.slot_seq = []
+        self.slot_time = []
+        self.latest = -1
+        self.writing = -1
+        if slots:
+            if slots < 3:
+                self.logger.warning(f'slots {slots} < 3, use 3')
+                slots = 3
+            if self.frame is not None:
+                # first frame is slot 0
+                self.slots = [self.frame] + [np.empty_like(self.frame) for _ in range(slots - 1)]
+                # borrowers per slot, list append/remove are atomic so readers need no lock
+                self.pins = [[] for _ in range(slots)]
+                self.slot_seq = [0] * slots
+                self.slot_time = [0.0] * slots
+                self.slot_seq[0], self.slot_time[0] = self.seq, self.timestamp
+                self.latest = 0
+                self.frame = None
+            else:
+                self.logger.error('no first frame, ring mode is off!!!')
+
+        # prefetch mode
+        self.prefetch_thread = None
+        self.prefetching = False
+        self.prefetch_slots = []
+        self.prefetch_free = None
+        self.prefetch_ready = None
+        self.paced = False
+        # (monotonic, media time) of first delivered frame, for pacing
+        self.pace_origin = None
+
+        # seek index of file source, see seek_index()
+        self.index = None
+
+        # change filter of read_next()/read_prefetch(), see set_filter()
+        self.change = None
+
     # region [camera]
     def start(self):
         if self.started:
             self.logger.warning('already started!!!')
             return None
         self.started = True
-        self.update_thread = Thread(target=self.update, args=())
+        self.update_thread = Thread(target=self._update_ring if self.slots else self.update, args=())
         self.update_thread.start()
         return self
 
     def update(self):
         while self.started:
             (grabbed, frame) = self.stream.read()
-            self.read_lock.acquire()
-            self.grabbed, self.frame = grabbed, frame
-            self.read_lock.release()
+            timestamp = time.monotonic()
+            with self.new_frame:
+                self.grabbed = grabbed
+                # keep last frame when read fails (end of file), like ring mode
+                if grabbed:
+                    self.frame = frame
+                    self.seq += 1
+                    self.timestamp = timestamp
+                self.new_frame.notify_all()
 
     def read(self):
-        self.read_lock.acquire()
+        if self.slots:
+            # ring mode, copy of borrowed frame
+            borrowed = self.borrow()
+            if borrowed is None:
+                return None
+            with borrowed as frame:
+                return frame.copy()
+
+        with self.read_lock:
+            return self._read_copy().frame
+
+    def _read_copy(self):
+        """
+        copy current frame (copy mode), read_lock must be held
+        """
         frame = None
         if self.frame is not None:
             frame = self.frame.copy()
+            self._account(self.seq)
         else:
             self.logger.error('frame is None!!!')
-        self.read_lock.release()
-        return frame
+        return vsframe(frame, self.seq, self.timestamp)
+
+    def read_next(self, timeout: float = None, seq: int = None):
+        """
+        wait for a frame newer than the last delivered one.
+
+        Parameters
+        ----------
+        timeout : float
+            seconds to wait, None waits forever
+        seq : int
+            sequence number to be newer than, None is the last frame delivered by read()/borrow()/read_next()
+
+        Returns
+        -------
+        vsframe
+            new frame (borrowed in ring mode, release it), None if timeout or source ends
+        """
+        last = self.read_seq if seq is None else seq
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            with self.new_frame:
+                if not self.new_frame.wait_for(lambda: self._published() > last or not self.grabbed, remaining) \
+                        or self._published() <= last:
+                    return None
+                if not self.slots:
+                    # check before copy, a skipped frame is never copied
+                    if self.change is None or self.change.check(self.frame):
+                        return self._read_copy()
+                    self._account(self.seq)
+                    last = self.seq
+                    continue
+            borrowed = self.borrow()
+            if borrowed is None or self.change is None or self.change.check(borrowed.frame):
+                return borrowed
+            last = borrowed.seq
+            borrowed.release()
+
+    def _published(self):
+        """
+        seq of the frame read_next() can deliver, in ring mode frames dropped by capture (all slots borrowed)
+        are counted by seq but never stored, they show up as a gap (dropped) instead
+        """
+        return self.slot_seq[self.latest] if self.slots else self.seq
+
+    def set_filter(self, change: vschange = None):
+        """
+        skip frames without change in read_next() and read_prefetch() (skipped frames count as delivered).
+
+        Parameters
+        ----------
+        change : vschange
+            change filter, None turns filter off
+
+        Returns
+        -------
+        vslib
+            self
+        """
+        self.change = change
+        return self
+
+    def _account(self, seq: int):
+        """
+        update consumer counters with seq of delivered frame
+        """
+        if seq == self.read_seq:
+            self.duplicated += 1
+        elif seq > self.read_seq + 1:
+            self.dropped += seq - self.read_seq - 1
+        self.read_seq = seq
+
+    def getstats(self):
+        """
+        Returns
+        -------
+        dict
+            captured (frames), delivered (last seq delivered), dropped and duplicated (consumer),
+            capture_dropped (ring mode, all slots borrowed), skipped (no change, see set_filter())
+        """
+        return {'captured': self.seq, 'delivered': self.read_seq, 'dropped': self.dropped,
+                'duplicated': self.duplicated, 'capture_dropped': self.capture_dropped,
+                'skipped': self.change.skipped if self.change is not None else 0}
 
     def stop(self):
         self.started = False
         if self.update_thread and self.update_thread.is_alive():
             self.update_thread.join()
+        if self.prefetching:
+            self.prefetching = False
+            # wake decoder waiting for a free slot
+            self.prefetch_free.put(None)
+            self.prefetch_thread.join()
 
     # endregion [camera]
 
+    # region [ring]
+    def _next_slot(self):
+        """
+        pick a slot to write, not the latest and not borrowed, -1 if all are borrowed
+        """
+        count = len(self.slots)
+        for i in range(1, count + 1):
+            slot = (self.latest + i) % count
+            if slot == self.latest:
+                continue
+            # announce first, then check pins (borrow() pins first, then checks writing)
+            self.writing = slot
+            if not self.pins[slot]:
+                return slot
+            self.writing = -1
+        return -1
+
+    def _update_ring(self):
+        while self.started:
+            slot = self._next_slot()
+            if slot < 0:
+                # every slot is borrowed, drain the source and drop the frame
+                self.grabbed = self.stream.grab()
+                if self.grabbed:
+                    with self.new_frame:
+                        self.seq += 1
+                        self.capture_dropped += 1
+                continue
+            (grabbed, frame) = self.stream.read(image=self.slots[slot])
+            timestamp = time.monotonic()
+            with self.new_frame:
+                self.grabbed = grabbed
+                if grabbed:
+                    if frame is not self.slots[slot]:
+                        # size changed, cv2 allocated a new frame, keep it as the slot
+                        self.slots[slot] = frame
+                    self.seq += 1
+                    self.timestamp = timestamp
+                    # seq/time of slot before it is published
+                    self.slot_seq[slot], self.slot_time[slot] = self.seq, timestamp
+                    self.latest = slot
+                self.writing = -1
+                self.new_frame.notify_all()
+
+    def borrow(self):
+        """
+        borrow the latest frame without copy (ring mode).
+
+        Returns
+        -------
+        vsframe
+            borrowed frame, use "with vs.borrow() as frame:" or call release(), None if no frame
+        """
+        if not self.slots:
+            self.logger.error('borrow() needs ring mode (slots > 0)!!!')
+            return None
+
+        while True:
+            slot = self.latest
+            if slot < 0:
+                self.logger.error('frame is None!!!')
+                return None
+            frame = self.slots[slot].view()
+            frame.flags.writeable = False
+            borrowed = vsframe(frame, self.slot_seq[slot], self.slot_time[slot], slot, self._unpin)
+            self.pins[slot].append(borrowed)
+            # capture may have picked this slot before the pin was visible, then try the new latest
+            if self.writing != slot:
+                # seq/time may be of the frame before refill, read them again now the slot is pinned
+                borrowed.seq, borrowed.timestamp = self.slot_seq[slot], self.slot_time[slot]
+                self._account(borrowed.seq)
+                return borrowed
+            self.pins[slot].remove(borrowed)
+
+    def _unpin(self, borrowed: vsframe):
+        self.pins[borrowed.slot].remove(borrowed)
+
+    # endregion [ring]
+
     # region [video]
     def _read(self):
         """
@@ -70,8 +735,252 @@ class vslib:
         (self.grabbed, self.frame) = self.stream.read()
         return self.frame
 
+    def prefetch(self, depth: int = 4, paced: bool = False):
+        """
+        start decoding ahead on a background thread (file source), read frames with read_prefetch().
+
+        Parameters
+        ----------
+        depth : int
+            number of preallocated slots, decoder runs at most depth frames ahead of the reader,
+            at least 2 to overlap decode with work on a borrowed frame
+        paced : bool
+            read_prefetch() waits until each frame is due at source fps (media time), False is full decode speed
+
+        Returns
+        -------
+        vslib
+            self, None if fail
+        """
+        if self.started or self.prefetching:
+            self.logger.error('already started!!!')
+            return None
+        first = self.frame if self.frame is not None else (self.slots[self.latest] if self.slots else None)
+        if first is None:
+            self.logger.error('frame is None!!!')
+            return None
+
+        depth = max(depth, 1)
+        self.prefetch_slots = [np.empty_like(first) for _ in range(depth)]
+        self.prefetch_free = queue.Queue()
+        for slot in range(depth):
+            self.prefetch_free.put(slot)
+        self.prefetch_ready = queue.Queue()
+        # first frame was read by __init__, it is not a slot
+        self.prefetch_ready.put(vsframe(first, self.seq, self.stream.get(cv2.CAP_PROP_POS_MSEC) / 1000))
+        self.paced = paced
+        self.pace_origin = None
+
+        self.prefetching = True
+        self.prefetch_thread = Thread(target=self._prefetch, args=())
+        self.prefetch_thread.start()
+        return self
+
+    def _prefetch(self):
+        while self.prefetching:
+            # blocks while every slot is queued or borrowed
+            slot = self.prefetch_free.get()
+            if slot is None:
+                break
+            (grabbed, frame) = self.stream.read(image=self.prefetch_slots[slot])
+            if not grabbed:
+                # end of file
+                self.prefetch_ready.put(None)
+                break
+            if frame is not self.prefetch_slots[slot]:
+                self.prefetch_slots[slot] = frame
+            self.seq += 1
+            media = self.stream.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            self.prefetch_ready.put(vsframe(frame, self.seq, media, slot, self._unprefetch))
+        self.prefetching = False
+
+    def _unprefetch(self, borrowed: vsframe):
+        self.prefetch_free.put(borrowed.slot)
+
+    def read_prefetch(self, timeout: float = None):
+        """
+        next decoded frame in order (prefetch mode).
+
+        Parameters
+        ----------
+        timeout : float
+            seconds to wait for decoder, None waits forever
+
+        Returns
+        -------
+        vsframe
+            borrowed frame, release it to give the slot back to decoder, None if end of file or timeout
+            (grabbed is False at end of file)
+        """
+        if self.prefetch_ready is None:
+            self.logger.error('read_prefetch() needs prefetch()!!!')
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                borrowed = self.prefetch_ready.get(
+                    timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if borrowed is None:
+                # keep end mark for next call
+                self.prefetch_ready.put(None)
+                self.grabbed = False
+                return None
+            if self.change is None or self.change.check(borrowed.frame):
+                break
+            self._account(borrowed.seq)
+            borrowed.release()
+
+        if self.paced:
+            now = time.monotonic()
+            if self.pace_origin is None:
+                self.pace_origin = (now, borrowed.timestamp)
+            delay = self.pace_origin[0] + borrowed.timestamp - self.pace_origin[1] - now
+            if delay > 0:
+                time.sleep(delay)
+        self._account(borrowed.seq)
+        return borrowed
+
     # endregion [video]
 
+    # region [seek]
+    def seek_index(self, cache: bool = True):
+        """
+        get seek index of file source, built once (read packets without decode) and cached on disk.
+
+        Parameters
+        ----------
+        cache : bool
+            load/save .{file name}.vsindex.json next to the file, validated by file size and mtime
+
+        Returns
+        -------
+        dict
+            {'count': frames, 'times': [ms of each frame], 'keyframes': [frame index] or None (unknown,
+            seek to any frame)}, None if fail
+        """
+        import json
+
+        if self.index is not None:
+            return self.index
+        if not isinstance(self.src, str) or not os.path.isfile(self.src):
+            self.logger.error(f'seek index needs a video file, got {self.src}!!!')
+            return None
+
+        st = os.stat(self.src)
+        folder, name = os.path.split(os.path.abspath(self.src))
+        index_file = os.path.join(folder, f'.{name}.vsindex.json')
+        if cache and os.path.isfile(index_file):
+            try:
+                with open(index_file) as f:
+                    index = json.load(f)
+                if index.get('version') == SEEK_INDEX_VERSION and index.get('size') == st.st_size and \
+                        index.get('mtime') == st.st_mtime_ns:
+                    self.index = index
+                    return index
+            except (IOError, ValueError) as e:
+                self.logger.warning(f'ignore broken seek index ({e})')
+
+        # packets only: raw mode (CAP_PROP_FORMAT -1) grabs without decode and tells keyframes
+        stream = cv2.VideoCapture(self.src)
+        raw = stream.set(cv2.CAP_PROP_FORMAT, -1)
+        times, keyframes = [], []
+        while stream.grab():
+            if raw and stream.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(len(times))
+            times.append(stream.get(cv2.CAP_PROP_POS_MSEC))
+        stream.release()
+        if not times:
+            self.logger.error(f'no frame in {self.src}!!!')
+            return None
+        if not raw or not keyframes or keyframes[0] != 0:
+            # backend cannot tell keyframes, every seek goes to the frame itself
+            keyframes = None
+        self.index = {'version': SEEK_INDEX_VERSION, 'size': st.st_size, 'mtime': st.st_mtime_ns,
+                      'count': len(times), 'times': times, 'keyframes': keyframes}
+        self.logger.info(f'seek index: {len(times)} frames, '
+                         f'{len(keyframes) if keyframes else "unknown"} keyframes')
+
+        if cache:
+            try:
+                with open(f'{index_file}.tmp', 'w') as f:
+                    json.dump(self.index, f, separators=(',', ':'))
+                os.replace(f'{index_file}.tmp', index_file)
+            except IOError as e:
+                self.logger.warning(f'cannot save seek index ({e})')
+        return self.index
+
+    def frame_at(self, msec: float):
+        """
+        index of the frame shown at msec (file source), -1 if fail
+        """
+        import bisect
+
+        index = self.seek_index()
+        if index is None:
+            return -1
+        return max(0, bisect.bisect_right(index['times'], msec) - 1)
+
+    def read_at(self, i: int):
+        """
+        read frame i of file source (negative counts from end).
+
+        Returns
+        -------
+        np.ndarray
+            frame, None if fail
+        """
+        import bisect
+
+        index = self.seek_index()
+        if index is None:
+            return None
+        count = index['count']
+        if i < 0:
+            i += count
+        if not 0 <= i < count:
+            self.logger.error(f'frame {i} out of range ({count})!!!')
+            return None
+
+        # next frame the stream returns
+        pos = int(self.stream.get(cv2.CAP_PROP_POS_FRAMES))
+        # where a seek to i restarts decoding, decoding forward from pos is cheaper when pos is past it
+        restart = max(0, i - SEEK_FRAMES)
+        keyframes = index['keyframes']
+        if keyframes is not None:
+            restart = keyframes[bisect.bisect_right(keyframes, restart) - 1]
+        if not restart <= pos <= i:
+            self.stream.set(cv2.CAP_PROP_POS_FRAMES, i)
+            pos = i
+        # skipped frames are grabbed without retrieve (no color conversion)
+        for _ in range(i - pos):
+            if not self.stream.grab():
+                self.grabbed = False
+                self.logger.error(f'cannot grab frame {i}!!!')
+                return None
+        (self.grabbed, frame) = self.stream.read()
+        if not self.grabbed:
+            self.logger.error(f'cannot read frame {i}!!!')
+            return None
+        self.frame = frame
+        return frame
+
+    def iter_frames(self, start: int = 0, stop: int = None, step: int = 1):
+        """
+        iterate frames in range(start, stop, step) of file source, yield (index, frame)
+        """
+        index = self.seek_index()
+        if index is None:
+            return
+        for i in range(*slice(start, stop, step).indices(index['count'])):
+            frame = self.read_at(i)
+            if frame is None:
+                return
+            yield i, frame
+
+    # endregion [seek]
+
     def set(self, propid: int, value: int):
         self.stream.set(propId=propid, value=value)
 
@@ -80,6 +989,7 @@ class vslib:
 
     def release(self):
         self.stream.release()
+        self.logger.close()
 
     def getinfo(self):
         w = self.stream.get(cv2.CAP_PROP_FRAME_WIDTH)
@@ -100,6 +1010,703 @@ class vslib:
     # endregion [with]
 
 
+class vsgroup:
+    """
+    Synchronized capture of multiple sources (cameras, files), delivered as frame sets.
+
+    One capture thread grabs every source back to back, then retrieves (decodes) them, so grab times of a set
+    are as close as the sources allow. Each set is a list of vsframe (one per source, frame None when the
+    source failed) sharing the set sequence number, vsframe.timestamp is the grab time of that source
+    (None when the source failed or was not grabbed in this set).
+
+    [stats]
+        per source: health (consecutive failures < max_failures), fps, last grab time,
+        per set: skew (latest grab - earliest grab), sets over tolerance are counted as misaligned.
+        An unhealthy source is grabbed once per second until it recovers, also when every source is unhealthy
+        (e.g. all files ended), capture runs until stop(). A set is delivered when at least one source grabbed.
+    """
+
+    def __init__(self, sources: list, width: int = 0, height: int = 0, tolerance: float = 0.010,
+                 max_failures: int = 30):
+        """
+        Parameters
+        ----------
+        sources : list
+            camera index, video file/url, vssource or opened vslib per source
+        width : int
+            capture width (camera)
+        height : int
+            capture height (camera)
+        tolerance : float
+            max skew in seconds of an aligned set
+        max_failures : int
+            consecutive grab failures before a source is unhealthy
+        """
+        self.logger = loglib(__name__, context=f'vsgroup@{id(self):x}')
+
+        self.sources = [src if isinstance(src, vslib) else vslib(src, width, height) for src in sources]
+        self.tolerance = tolerance
+        self.max_failures = max_failures
+        self.started = False
+        self.update_thread = None
+
+        # latest set and its sequence, notified on every new set
+        self.frames = None
+        self.seq = 0
+        self.new_set = Condition()
+        self.read_seq = 0
+
+        # stats
+        self.start_time = 0.0
+        self.counts = [0] * len(self.sources)
+        self.failures = [0] * len(self.sources)
+        self.grab_times = [0.0] * len(self.sources)
+        self.retry_times = [0.0] * len(self.sources)
+        self.skew = 0.0
+        self.skew_max = 0.0
+        self.skew_sum = 0.0
+        self.misaligned = 0
+
+    def start(self):
+        if self.started:
+            self.logger.warning('already started!!!')
+            return None
+        self.started = True
+        self.start_time = time.monotonic()
+        self.update_thread = Thread(target=self.update, args=())
+        self.update_thread.start()
+        return self
+
+    def update(self):
+        streams = [vs.stream for vs in self.sources]
+        unhealthy = False
+        while self.started:
+            # grab all back to back, decode later, an unhealthy source only when its retry is due
+            grabbed = []
+            tried = []
+            now = time.monotonic()
+            for i, stream in enumerate(streams):
+                ok = False
+                due = self.failures[i] < self.max_failures or now - self.retry_times[i] >= 1.0
+                if due:
+                    self.retry_times[i] = now
+                    ok = stream.grab()
+                    self.grab_times[i] = time.monotonic()
+                grabbed.append(ok)
+                tried.append(due)
+
+            frames = []
+            for i, stream in enumerate(streams):
+                frame = None
+                if grabbed[i]:
+                    ok, frame = stream.retrieve()
+                    grabbed[i] = ok
+                if grabbed[i]:
+                    self.counts[i] += 1
+                    self.failures[i] = 0
+                else:
+                    frame = None
+                    if tried[i]:
+                        self.failures[i] += 1
+                frames.append(frame)
+
+            if not any(grabbed):
+                if all(failures >= self.max_failures for failures in self.failures):
+                    # keep retrying once per second until stop()/release()
+                    if not unhealthy:
+                        self.logger.error('all sources are unhealthy, retry every second!!!')
+                        unhealthy = True
+                    time.sleep(max(0.0, min(self.retry_times) + 1.0 - time.monotonic()))
+                continue
+            unhealthy = False
+
+            times = [t for t, ok in zip(self.grab_times, grabbed) if ok]
+            skew = max(times) - min(times) if times else 0.0
+            with self.new_set:
+                self.seq += 1
+                self.frames = [vsframe(frame, self.seq, t if ok else None)
+                               for frame, t, ok in zip(frames, self.grab_times, grabbed)]
+                self.skew = skew
+                self.skew_max = max(self.skew_max, skew)
+                self.skew_sum += skew
+                if skew > self.tolerance:
+                    self.misaligned += 1
+                self.new_set.notify_all()
+        with self.new_set:
+            self.new_set.notify_all()
+
+    def read_next(self, timeout: float = None):
+        """
+        wait for a set newer than the last delivered one.
+
+        Returns
+        -------
+        list
+            vsframe per source (frame None if the source failed), None if timeout or capture stopped
+        """
+        with self.new_set:
+            if not self.new_set.wait_for(lambda: self.seq > self.read_seq or not self.started, timeout) \
+                    or self.seq <= self.read_seq:
+                return None
+            self.read_seq = self.seq
+            return self.frames
+
+    def getstats(self):
+        """
+        Returns
+        -------
+        dict
+            sets, skew (last, max, avg in seconds), misaligned sets and per source
+            {src, healthy, frames, failures, fps}
+        """
+        elapsed = time.monotonic() - self.start_time if self.start_time else 0.0
+        return {
+            'sets': self.seq,
+            'skew': self.skew,
+            'skew_max': self.skew_max,
+            'skew_avg': self.skew_sum / self.seq if self.seq else 0.0,
+            'misaligned': self.misaligned,
+            'sources': [{'src': vs.src, 'healthy': failures < self.max_failures, 'frames': count,
+                         'failures': failures, 'fps': count / elapsed if elapsed else 0.0}
+                        for vs, count, failures in zip(self.sources, self.counts, self.failures)],
+        }
+
+    def stop(self):
+        self.started = False
+        if self.update_thread and self.update_thread.is_alive():
+            self.update_thread.join()
+
+    def is_opened(self):
+        return all(vs.is_opened() for vs in self.sources)
+
+    def release(self):
+        for vs in self.sources:
+            vs.release()
+        self.logger.close()
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        self.release()
+    # endregion [with]
+
+
+class vspublisher:
+    """
+    Publisher of frames to a multiprocessing.shared_memory ring, read by vssubscriber in other processes.
+
+    [layout]
+        64 bytes header, slots (seq, time) records, then slots frames (64 bytes aligned).
+        A slot is written like a seqlock: its seq is set to 0 before writing and to the frame seq after,
+        then the published seq is updated, so a subscriber can tell a frame was overwritten while it used it.
+
+    [close]
+        frames are views that keep the shared memory mapped, a shared memory closed while a frame of it is still
+        held is closed by a later close() (of any publisher/subscriber) once the frame is gone.
+    """
+    # shared memory whose close was deferred, see [close]
+    pending = []
+    pending_lock = Lock()
+
+    def __init__(self, width: int, height: int, channel: int = 3, slots: int = 8, name: str = None):
+        """
+        Parameters
+        ----------
+        width : int
+            frame width
+        height : int
+            frame height
+        channel : int
+            bytes per pixel (uint8 frames)
+        slots : int
+            frames in ring, a subscriber has slots - 1 frame periods before its frame is overwritten
+        name : str
+            shared memory name, None is a random name (see self.name)
+        """
+        from multiprocessing import shared_memory
+
+        self.logger = loglib(__name__, context=f'vspublisher@{id(self):x}')
+        self.shape = (height, width, channel) if channel > 1 else (height, width)
+        self.slots = slots
+        self.seq = 0
+        self.started = False
+        self.update_thread = None
+
+        frame_size = width * height * channel
+        self.data_offset = (SHM_HEADER_SIZE + slots * 16 + 63) // 64 * 64
+        self.stride = (frame_size + 63) // 64 * 64
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.data_offset + slots * self.stride)
+        self.name = self.shm.name
+        self.shm.buf[:SHM_HEADER_SIZE] = struct.pack(SHM_HEADER_FMT, SHM_MAGIC, SHM_VERSION, slots, width, height,
+                                                      channel, 0).ljust(SHM_HEADER_SIZE, b'\0')
+        self.published, self.meta, self.frames = vspublisher._views(self.shm, slots, self.shape, self.data_offset,
+                                                                    self.stride)
+
+    @staticmethod
+    def _views(shm, slots: int, shape: tuple, data_offset: int, stride: int):
+        """
+        (published seq, slot records, slot frames) as ndarray views of shared memory,
+        each view holds the buffer, so shm cannot be unmapped under a frame still in use
+        """
+        size = int(np.prod(shape))
+        published = np.frombuffer(shm.buf, dtype='<u8', count=1, offset=SHM_SEQ_OFFSET)
+        meta = np.frombuffer(shm.buf, dtype=[('seq', '<u8'), ('time', '<f8')], count=slots, offset=SHM_HEADER_SIZE)
+        frames = [np.frombuffer(shm.buf, dtype=np.uint8, count=size, offset=data_offset + i * stride).reshape(shape)
+                  for i in range(slots)]
+        return published, meta, frames
+
+    @staticmethod
+    def _close(shm):
+        """
+        close shm and retry deferred ones, see [close]
+
+        Returns
+        -------
+        bool
+            False if shm is deferred (frames of it still held)
+        """
+        with vspublisher.pending_lock:
+            pending, vspublisher.pending = vspublisher.pending + [shm], []
+            for item in pending:
+                try:
+                    item.close()
+                except BufferError:
+                    vspublisher.pending.append(item)
+            return shm not in vspublisher.pending
+
+    def _begin(self):
+        """
+        mark next slot as being written, return (seq, slot)
+        """
+        seq = self.seq + 1
+        slot = seq % self.slots
+        self.meta['seq'][slot] = 0
+        return seq, slot
+
+    def _end(self, seq: int, slot: int, timestamp: float):
+        self.meta['time'][slot] = timestamp
+        self.meta['seq'][slot] = seq
+        self.published[0] = seq
+        self.seq = seq
+
+    def publish(self, frame, timestamp: float = None):
+        """
+        copy frame into the ring.
+
+        Returns
+        -------
+        int
+            seq of published frame, -1 if fail
+        """
+        if frame is None or frame.shape != self.shape:
+            self.logger.error(f'frame shape {None if frame is None else frame.shape} != {self.shape}!!!')
+            return -1
+        seq, slot = self._begin()
+        self.frames[slot][...] = frame
+        self._end(seq, slot, time.monotonic() if timestamp is None else timestamp)
+        return seq
+
+    def start(self, vs: vslib):
+        """
+        capture from vs (not started) on a thread, decoding straight into shared memory slots (no copy)
+        """
+        if self.started:
+            self.logger.warning('already started!!!')
+            return None
+        # first frame was read by vslib()
+        if vs.frame is not None:
+            self.publish(vs.frame, vs.timestamp)
+        self.started = True
+        self.update_thread = Thread(target=self.update, args=(vs,))
+        self.update_thread.start()
+        return self
+
+    def update(self, vs: vslib):
+        while self.started:
+            seq, slot = self._begin()
+            (grabbed, frame) = vs.stream.read(image=self.frames[slot])
+            if not grabbed or frame is not self.frames[slot]:
+                # end of file, or frame size differs from ring, slot stays invalid (seq 0)
+                self.logger.error('capture fail or frame size changed, stop!!!')
+                self.started = False
+                break
+            self._end(seq, slot, time.monotonic())
+
+    def stop(self):
+        self.started = False
+        if self.update_thread and self.update_thread.is_alive():
+            self.update_thread.join()
+
+    def close(self):
+        """
+        stop and remove shared memory, subscribers keep their mapping until they close
+        """
+        self.stop()
+        if self.shm is not None:
+            self.published = self.meta = self.frames = None
+            if not vspublisher._close(self.shm):
+                self.logger.warning('frames still held, shared memory is closed after they are released')
+            self.shm.unlink()
+            self.shm = None
+        self.logger.close()
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    # endregion [with]
+
+
+class vssubscriber:
+    """
+    Subscriber of a vspublisher ring, frames are read-only ndarray views of shared memory (no copy).
+
+    A frame stays valid until the publisher laps the ring, check is_valid(frame) after using it (or copy it).
+    A frame held after close() keeps the shared memory mapped until it is released (see vspublisher [close]).
+    worker/workers split frames between subscribers (seq % workers == worker) to spread work across processes.
+    """
+    attach_lock = Lock()
+
+    def __init__(self, name: str, worker: int = 0, workers: int = 1):
+        """
+        Parameters
+        ----------
+        name : str
+            shared memory name of publisher (vspublisher.name)
+        worker : int
+            index of this subscriber in workers
+        workers : int
+            number of subscribers sharing the frames, 1 gets every frame
+        """
+        self.logger = loglib(__name__, context=f'vssubscriber@{id(self):x}')
+        self.worker = worker
+        self.workers = max(workers, 1)
+        self.read_seq = 0
+        self.dropped = 0
+        self.overwritten = 0
+        self.shm = None
+
+        try:
+            self.shm = vssubscriber._attach(name)
+        except (FileNotFoundError, ValueError) as e:
+            self.logger.error('Cannot attach shared memory ({})..'.format(e))
+            return
+        magic, version, self.slots, width, height, channel, _ = struct.unpack_from(SHM_HEADER_FMT, self.shm.buf)
+        if magic != SHM_MAGIC or version != SHM_VERSION:
+            self.logger.error(f'{name} is not a frame ring (v{SHM_VERSION})!!!')
+            self.close()
+            return
+        self.shape = (height, width, channel) if channel > 1 else (height, width)
+        data_offset = (SHM_HEADER_SIZE + self.slots * 16 + 63) // 64 * 64
+        stride = (width * height * channel + 63) // 64 * 64
+        self.published, self.meta, self.frames = vspublisher._views(self.shm, self.slots, self.shape, data_offset,
+                                                                    stride)
+        for frame in self.frames:
+            frame.flags.writeable = False
+
+    @staticmethod
+    def _attach(name: str):
+        """
+        attach shared memory without resource tracking, a tracked attach is unlinked when this process exits
+        (python < 3.13 has no track=False, so register is skipped for this name only while attaching, shared
+        memory created meanwhile by other threads is still tracked; unregister after attaching would also drop
+        the registration of a publisher in this process)
+        """
+        from multiprocessing import resource_tracker, shared_memory
+
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            pass
+        with vssubscriber.attach_lock:
+            register = resource_tracker.register
+            # posix names are registered with leading '/'
+            names = (name, '/' + name)
+
+            def register_others(resource: str, rtype: str):
+                if rtype != 'shared_memory' or resource not in names:
+                    register(resource, rtype)
+
+            resource_tracker.register = register_others
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+    def is_opened(self):
+        return self.shm is not None
+
+    def read_next(self, timeout: float = None, poll: float = 0.001):
+        """
+        wait for the next frame of this worker after the last one read.
+
+        Parameters
+        ----------
+        timeout : float
+            seconds to wait, None waits forever
+        poll : float
+            seconds between checks of published seq
+
+        Returns
+        -------
+        vsframe
+            read-only view with seq/timestamp/slot, None if timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            published = int(self.published[0])
+            # next seq of this worker
+            seq = self.read_seq + 1
+            seq += (self.worker - seq) % self.workers
+            if seq <= published:
+                oldest = max(1, published - self.slots + 2)
+                if seq < oldest:
+                    # lapped, skip to oldest frame of this worker still in ring
+                    skip = oldest + (self.worker - oldest) % self.workers
+                    self.dropped += (skip - seq) // self.workers
+                    seq = skip
+                if seq <= published:
+                    slot = seq % self.slots
+                    timestamp = float(self.meta['time'][slot])
+                    if int(self.meta['seq'][slot]) == seq:
+                        self.read_seq = seq
+                        return vsframe(self.frames[slot], seq, timestamp, slot)
+                    # overwritten between checks, try again with new published seq
+                    self.overwritten += 1
+                    self.read_seq = seq
+                    continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def is_valid(self, frame: vsframe):
+        """
+        whether frame was not overwritten by publisher (so far)
+        """
+        return int(self.meta['seq'][frame.slot]) == frame.seq
+
+    def close(self):
+        """
+        detach shared memory, deferred while frames of it are still held (see vspublisher [close])
+        """
+        if self.shm is not None:
+            self.published = self.meta = self.frames = None
+            if not vspublisher._close(self.shm):
+                self.logger.warning('frames still held, shared memory is closed after they are released')
+            self.shm = None
+        self.logger.close()
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    # endregion [with]
+
+
+class vsrecorder:
+    """
+    Background video recorder, write() queues the frame and returns at once, cv2.VideoWriter encodes on its own
+    thread (or process), so capture cadence does not depend on encode speed.
+
+    [queue]
+        bounded, a frame written while the queue is full is dropped (write() returns False) instead of blocking
+        the caller, see getstats() for queue depth and dropped frames. Thread mode queues a copy of the frame,
+        process mode queues it pickled (one copy) and a sender thread pipes it to the encoder process.
+
+    [segment]
+        segment_seconds (frames / fps) or segment_bytes (file size) starts a new file {name}_0000{ext},
+        {name}_0001{ext}, ..., without segmenting frames go to file_name. File size is a running count of frame
+        bytes times the compression ratio of the last closed segment (the first one is cut by frame bytes).
+    """
+    slogger = loglib(__name__)
+
+    def __init__(self, file_name: str, fps: float = 30, fourcc: str = 'MJPG', queue_size: int = 8,
+                 segment_seconds: float = 0, segment_bytes: int = 0, mode: str = 'thread'):
+        """
+        Parameters
+        ----------
+        file_name : str
+            video file name
+        fps : float
+            frame rate of video (e.g. vslib.getinfo()[2])
+        fourcc : str
+            codec fourcc
+        queue_size : int
+            max frames waiting for encode
+        segment_seconds : float
+            segment duration, 0 is no limit
+        segment_bytes : int
+            segment file size, 0 is no limit
+        mode : str
+            'thread' or 'process' (frames are pickled to an encoder process, encode does not hold the GIL
+            of capture process)
+        """
+        import multiprocessing
+
+        self.logger = loglib(__name__, context=f'vsrecorder@{id(self):x}')
+        self.file_name = file_name
+        self.mode = mode
+        self.queued = 0
+        self.dropped = 0
+        self.queue_max = 0
+        self.segments = []
+        self.sender = None
+
+        ctx = multiprocessing.get_context('spawn')
+        # written frames, updated by encoder
+        self.written = ctx.Value('q', 0, lock=False)
+        segment_frames = int(segment_seconds * fps) if segment_seconds else 0
+        # frames waiting, a queue.Queue in both modes (qsize() works on every platform)
+        self.frames = queue.Queue(maxsize=queue_size)
+        if mode == 'process':
+            reader, writer = ctx.Pipe(duplex=False)
+            self.segment_queue = ctx.Queue()
+            self.sender = Thread(target=vsrecorder._send, args=(self.frames, writer), daemon=True)
+            self.sender.start()
+            source, worker = reader, ctx.Process
+        else:
+            self.segment_queue = queue.Queue()
+            source, worker = self.frames, Thread
+        self.encoder = worker(target=vsrecorder._encode, args=(source, self.segment_queue, self.written, file_name,
+                                                               fps, fourcc, segment_frames, segment_bytes),
+                              daemon=True)
+        self.encoder.start()
+
+    @staticmethod
+    def _send(frames: queue.Queue, conn):
+        """
+        sender of process mode, pipes pickled frames to encoder until None
+        """
+        import pickle
+
+        while (data := frames.get()) is not None:
+            conn.send_bytes(data)
+        conn.send_bytes(pickle.dumps(None))
+        conn.close()
+
+    @staticmethod
+    def _encode(frames, segment_queue, written, file_name: str, fps: float, fourcc: str, segment_frames: int,
+                segment_bytes: int):
+        """
+        encoder loop, writes frames (queue.Queue, or pipe of pickled frames) until None, puts every segment
+        file name to segment_queue
+        """
+        import pickle
+
+        get = frames.get if isinstance(frames, queue.Queue) else lambda: pickle.loads(frames.recv_bytes())
+        root, ext = os.path.splitext(file_name)
+        segmented = segment_frames or segment_bytes
+        writer, name, segment, count = None, file_name, -1, 0
+        # frame bytes of segment and file bytes per frame byte of last closed segment, see [segment]
+        size, ratio = 0, 1.0
+        while (frame := get()) is not None:
+            if writer is None or (segment_frames and count >= segment_frames) or \
+                    (segment_bytes and size * ratio >= segment_bytes):
+                if writer is not None:
+                    writer.release()
+                    if segment_bytes:
+                        ratio = os.path.getsize(name) / size
+                segment += 1
+                name = f'{root}_{segment:04}{ext}' if segmented else file_name
+                writer = cv2.VideoWriter(name, cv2.VideoWriter_fourcc(*fourcc), fps,
+                                         (frame.shape[1], frame.shape[0]), frame.ndim == 3)
+                if not writer.isOpened():
+                    vsrecorder.slogger.error(f'cannot open writer {name} ({fourcc})!!!')
+                    writer = None
+                    break
+                segment_queue.put(name)
+                count, size = 0, 0
+            writer.write(frame)
+            count += 1
+            size += frame.nbytes
+            written.value += 1
+        if writer is not None:
+            writer.release()
+        # drain until end mark after a writer error, so write() and close() never block
+        while frame is not None:
+            frame = get()
+
+    def write(self, frame):
+        """
+        queue frame for encoding (copied or pickled, see [queue]), never blocks.
+
+        Parameters
+        ----------
+        frame : np.ndarray or vsframe
+            frame (a vsframe is not released)
+
+        Returns
+        -------
+        bool
+            True if queued, False if dropped (queue full or closed)
+        """
+        import pickle
+
+        if self.encoder is None:
+            self.logger.error('recorder is closed!!!')
+            return False
+        if isinstance(frame, vsframe):
+            frame = frame.frame
+        if frame is None:
+            return False
+        if self.frames.full():
+            # checked first, a dropped frame is not copied
+            self.dropped += 1
+            return False
+        try:
+            self.frames.put_nowait(pickle.dumps(frame, pickle.HIGHEST_PROTOCOL) if self.sender else frame.copy())
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.queued += 1
+        self.queue_max = max(self.queue_max, self.frames.qsize())
+        return True
+
+    def getstats(self):
+        """
+        Returns
+        -------
+        dict
+            queued, written, dropped (queue full), queue (frames waiting), queue_max, segments (file names)
+        """
+        while True:
+            try:
+                self.segments.append(self.segment_queue.get_nowait())
+            except queue.Empty:
+                break
+        return {'queued': self.queued, 'written': self.written.value, 'dropped': self.dropped,
+                'queue': self.frames.qsize() if self.encoder is not None else 0, 'queue_max': self.queue_max,
+                'segments': list(self.segments)}
+
+    def close(self):
+        """
+        encode queued frames and close file
+        """
+        if self.encoder is not None:
+            self.frames.put(None)
+            if self.sender is not None:
+                self.sender.join()
+                self.sender = None
+            self.encoder.join()
+            self.encoder = None
+        self.logger.close()
+
+    # region [with]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    # endregion [with]
+
+
 if __name__ == "__main__":
     """
     For console test
@@ -154,7 +1761,7 @@ if __name__ == "__main__":
             print(f'video duration: {delay * fcnt} ms')
             while vs.grabbed:
                 # NOTE!!!set pos_frames will take around 70~140ms
-                # set frame position
+                # set frame position (read_at(i) / iter_frames(step=n) avoid seeks when decoding forward is cheaper)
                 # vs.set(cv2.CAP_PROP_POS_FRAMES, i)
 
                 # get frame (calculate time diff)
@@ -170,3 +1777,25 @@ if __name__ == "__main__":
                 if cv2.waitKey(delay) == 27:
                     break
             cv2.destroyAllWindows()
+
+    # video, decode ahead on background thread and play at source fps
+    with vslib('asset/4K.mp4') as vs:
+        if not vs.is_opened():
+            print(f'open source {vs.src} fail!!!')
+        else:
+            vs.prefetch(depth=4, paced=True)
+            while True:
+                # get frame (calculate time diff, includes waiting for frame due time)
+                time_start = datetime.datetime.now()
+                borrowed = vs.read_prefetch()
+                time_end = datetime.datetime.now()
+                print(f'vs.read_prefetch() time: {(time_end - time_start).total_seconds() * 1000 : 0.3f} ms')
+                if borrowed is None:
+                    break
+                with borrowed as frame:
+                    # display
+                    cv2.imshow('video', frame)
+                # wait for ESC key
+                if cv2.waitKey(1) == 27:
+                    break
+            cv2.destroyAllWindows()